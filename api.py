@@ -2,19 +2,50 @@
 # -*- coding: utf-8 -*-
 
 import json
+import os
 import urllib.parse
 import math
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
-# Простое хранилище
-players_db = {}
-rooms_db = {}
+from routes import RouteTable
+from shared_store import open_store
+
+# Сколько секунд держать простаивающее keep-alive соединение
+KEEPALIVE_TIMEOUT = float(os.getenv("KEEPALIVE_TIMEOUT", "15"))
+
+
+def _on_reload():
+    """Другой процесс изменил состояние: обновляем счётчики и связи участников с игроками"""
+    global room_counter, tournament_counter, current_tournament
+    room_counter = counters.get("room_counter", 1)
+    tournament_counter = counters.get("tournament_counter", 0)
+    current_tournament = counters.get("current_tournament")
+    for room in rooms_db.values():
+        for member in room['members']:
+            member['player'] = players_db.get(member['player']['telegram_id'], member['player'])
+
+
+def _save_counters():
+    counters.update(
+        room_counter=room_counter,
+        tournament_counter=tournament_counter,
+        current_tournament=current_tournament,
+    )
+    for name in ("room_counter", "tournament_counter", "current_tournament"):
+        store.mark("counters", name)
+
+
+# Хранилище (в памяти процесса или общее для всех воркеров, см. shared_store.py)
+store = open_store(_on_reload)
+players_db = store.table("players")
+rooms_db = store.table("rooms")
+counters = store.table("counters")
 room_counter = 1
 
 # Данные турниров
-tournaments_db = {}
-tournament_games = {}
+tournaments_db = store.table("tournaments")
+tournament_games = store.table("tournament_games")
 tournament_counter = 0
 current_tournament = None
 
@@ -129,79 +160,33 @@ def calculate_rating_changes(room, score_data):
     
     return changes
 
+ROUTES = RouteTable()
+
+
 class handler(BaseHTTPRequestHandler):
+    # Постоянные соединения: опросы Mini App идут по одному TCP-соединению
+    protocol_version = 'HTTP/1.1'
+    # Простаивающее соединение закрывается, чтобы не держать поток
+    timeout = KEEPALIVE_TIMEOUT
+    # Заголовки и тело уходят разными записями: без TCP_NODELAY второй пакет
+    # ждёт отложенного ACK клиента (~40 мс на каждый опрос)
+    disable_nagle_algorithm = True
+    
     def do_GET(self):
         """Обработка GET запросов"""
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
-        path = self.path.split('?')[0]
-        
-        if path == '/':
-            response = {
-                "message": "Badminton Rating API",
-                "status": "active",
-                "database": "memory",
-                "players": len(players_db),
-                "rooms": len(rooms_db)
-            }
-        elif path == '/rooms/':
-            response = list(rooms_db.values())
-        elif path.startswith('/rooms/') and path != '/rooms/':
-            room_id = int(path.split('/')[-1])
-            if room_id in rooms_db:
-                response = rooms_db[room_id]
-            else:
-                self.send_response(404)
-                response = {"error": "Комната не найдена"}
-        elif path.startswith('/players/'):
-            telegram_id = int(path.split('/')[-1])
-            if telegram_id in players_db:
-                response = players_db[telegram_id]
-            else:
-                response = {
-                    "id": telegram_id,
-                    "telegram_id": telegram_id,
-                    "first_name": "Неизвестный",
-                    "last_name": "Игрок",
-                    "username": None,
-                    "rating": 1500
-                }
-        elif path.startswith('/tournament/'):
-            # Получение данных турнира
-            tournament_id = int(path.split('/')[-1])
-            if tournament_id not in tournaments_db:
-                self.send_response(404)
-                response = {"error": "Турнир не найден"}
-            else:
-                tournament = tournaments_db[tournament_id]
-                games = tournament_games.get(tournament_id, [])
-                
-                response = {
-                    "tournament_id": tournament_id,
-                    "tournament": tournament,
-                    "games": games,
-                    "message": f"Данные турнира #{tournament_id}"
-                }
-        else:
-            self.send_response(404)
-            response = {"error": "Endpoint not found"}
-        
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        self._dispatch('GET', store.read)
     
     def do_POST(self):
         """Обработка POST запросов"""
-        global room_counter, tournament_counter, current_tournament
-        
-        # CORS заголовки
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+        self._dispatch('POST', store.write)
+    
+    def _dispatch(self, method, access):
+        """Находит маршрут в таблице ROUTES и вызывает его обработчик"""
+        # Маршрут может поменять статус; ответ буферизуется и отправляется целиком.
+        # Хранилище (в SQLiteStore — транзакция BEGIN IMMEDIATE) занято только
+        # на время маршрута и сериализации: тело читается до него, ответ
+        # пишется в сокет после, медленный клиент не держит остальных
+        self.status_code = 200
         
         try:
             content_length_str = self.headers.get('Content-Length')
@@ -213,255 +198,330 @@ class handler(BaseHTTPRequestHandler):
                 data = {}
             
             path = self.path.split('?')[0]
-            print(f"🔍 POST запрос: {path}, data: {data}")
+            if method == 'POST':
+                print(f"🔍 POST запрос: {path}, data: {data}")
             
-            if path == '/players/':
-                # Создание/обновление игрока
-                if 'telegram_id' not in data:
-                    self.send_response(400)
-                    response = {"error": "telegram_id required"}
+            with access():
+                found = ROUTES.match(method, path)
+                if found is None:
+                    self.status_code = 404
+                    response = {"error": "Endpoint not found"}
                 else:
-                    telegram_id = data['telegram_id']
-                    player = {
-                        "id": telegram_id,
-                        "telegram_id": telegram_id,
-                        "first_name": data['first_name'],
-                        "last_name": data.get('last_name'),
-                        "username": data.get('username'),
-                        "rating": 1500
-                    }
-                    players_db[telegram_id] = player
-                    response = player
-                
-            elif path == '/rooms/':
-                # Создание комнаты
-                if 'creator_telegram_id' not in data:
-                    self.send_response(400)
-                    response = {"error": "creator_telegram_id required"}
-                else:
-                    creator_id = data['creator_telegram_id']
-                    
-                    # ПРОВЕРЯЕМ НЕ СОЗДАЛ ЛИ УЖЕ КОМНАТУ
-                    existing_room = None
-                    for room_id, room in rooms_db.items():
-                        if room['creator_id'] == creator_id:
-                            existing_room = room_id
-                            break
-                    
-                    if existing_room:
-                        self.send_response(400)
-                        response = {"error": f"Вы уже создали комнату #{existing_room}. Можно создать только одну комнату."}
-                    else:
-                        # Создаем игрока если его нет
-                        if creator_id not in players_db:
-                            players_db[creator_id] = {
-                                "id": creator_id,
-                                "telegram_id": creator_id,
-                                "first_name": "Игрок",
-                                "last_name": f"{creator_id}",
-                                "username": None,
-                                "rating": 1500
-                            }
-                    
-                        creator = players_db[creator_id]
-                        creator_full_name = f"{creator['first_name']} {creator.get('last_name', '')}".strip()
-                        
-                        # Создаем комнату
-                        new_room = {
-                            "id": room_counter,
-                            "name": data['name'],
-                            "creator_id": creator_id,
-                            "creator_full_name": creator_full_name,
-                            "max_players": data.get('max_players', 4),
-                            "member_count": 1,
-                            "is_active": True,
-                            "created_at": datetime.now().isoformat(),
-                            "members": [
-                                {
-                                    "id": 1,
-                                    "player": creator,
-                                    "is_leader": True,
-                                    "joined_at": datetime.now().isoformat()
-                                }
-                            ]
-                        }
-                        
-                        rooms_db[room_counter] = new_room
-                        room_counter += 1
-                        response = new_room
-                
-            elif '/join' in path:
-                # Присоединение к комнате
-                room_id = int(path.split('/')[2])
-                if room_id not in rooms_db:
-                    self.send_response(404)
-                    response = {"error": "Комната не найдена"}
-                else:
-                    room = rooms_db[room_id]
-                    
-                    # Проверяем не полная ли комната
-                    if room['member_count'] >= room['max_players']:
-                        self.send_response(400)
-                        response = {"error": "Комната заполнена"}
-                    else:
-                        # Создаем игрока если его нет
-                        telegram_id = data['telegram_id']
-                        if telegram_id not in players_db:
-                            players_db[telegram_id] = {
-                                "id": telegram_id,
-                                "telegram_id": telegram_id,
-                                "first_name": data['first_name'],
-                                "last_name": data.get('last_name', ''),
-                                "username": data.get('username'),
-                                "rating": 1500
-                            }
-                        
-                        player = players_db[telegram_id]
-                        
-                        # Добавляем игрока в комнату
-                        new_member = {
-                            "id": room['member_count'] + 1,
-                            "player": player,
-                            "is_leader": False,
-                            "joined_at": datetime.now().isoformat()
-                        }
-                        
-                        room['members'].append(new_member)
-                        room['member_count'] += 1
-                        
-                        response = {
-                            "message": "Успешно присоединились к комнате",
-                            "room": room
-                        }
-                        
-            elif '/leave' in path:
-                # Выход из комнаты
-                room_id = int(path.split('/')[2])
-                if room_id not in rooms_db:
-                    self.send_response(404)
-                    response = {"error": "Комната не найдена"}
-                else:
-                    room = rooms_db[room_id]
-                    telegram_id = data['telegram_id']
-                    
-                    # Удаляем игрока из комнаты
-                    room['members'] = [m for m in room['members'] if m['player']['telegram_id'] != telegram_id]
-                    room['member_count'] = len(room['members'])
-                    
-                    # Если комната пустая, удаляем её
-                    if room['member_count'] == 0:
-                        del rooms_db[room_id]
-                        response = {
-                            "message": "Комната расформирована",
-                            "room_disbanded": True
-                        }
-                    else:
-                        response = {
-                            "message": "Вы покинули комнату",
-                            "room": room,
-                            "room_disbanded": False
-                        }
-                        
-            elif '/finish-game' in path:
-                # Завершение игры
-                room_id = int(path.split('/')[2])
-                if room_id not in rooms_db:
-                    self.send_response(404)
-                    response = {"error": "Комната не найдена"}
-                else:
-                    room = rooms_db[room_id]
-                    
-                    # Вычисляем изменения рейтинга
-                    rating_changes = calculate_rating_changes(room, data)
-                    
-                    # Сохраняем игру в турнир если он активен
-                    if current_tournament:
-                        game_data = {
-                            "room_id": room_id,
-                            "team1": data['team1'],
-                            "team2": data['team2'],
-                            "score1": data['score1'],
-                            "score2": data['score2'],
-                            "rating_changes": rating_changes,
-                            "timestamp": datetime.now().isoformat()
-                        }
-                        tournament_games[current_tournament].append(game_data)
-                    
-                    response = {
-                        "message": "Игра завершена",
-                        "room": room,
-                        "rating_changes": rating_changes
-                    }
-                    
-            elif path == '/tournament/start':
-                # Начать турнир
-                tournament_counter += 1
-                current_tournament = tournament_counter
-                
-                tournaments_db[current_tournament] = {
-                    "id": current_tournament,
-                    "start_time": datetime.now().isoformat(),
-                    "status": "active"
-                }
-                
-                tournament_games[current_tournament] = []
-                
-                response = {
-                    "message": f"Турнир #{current_tournament} начат!",
-                    "tournament_id": current_tournament
-                }
-                
-            elif path == '/tournament/end':
-                # Завершить турнир
-                if current_tournament is None:
-                    response = {"error": "Нет активного турнира"}
-                else:
-                    tournament_id = current_tournament
-                    tournaments_db[tournament_id]["status"] = "finished"
-                    tournaments_db[tournament_id]["end_time"] = datetime.now().isoformat()
-                    
-                    current_tournament = None
-                    
-                    response = {
-                        "message": f"Турнир #{tournament_id} завершен!",
-                        "tournament_id": tournament_id
-                    }
-                    
-            elif path.startswith('/tournament/'):
-                # Получение данных турнира
-                tournament_id = int(path.split('/')[-1])
-                if tournament_id not in tournaments_db:
-                    response = {"error": "Турнир не найден"}
-                else:
-                    tournament = tournaments_db[tournament_id]
-                    games = tournament_games.get(tournament_id, [])
-                    
-                    response = {
-                        "tournament_id": tournament_id,
-                        "tournament": tournament,
-                        "games": games,
-                        "message": f"Данные турнира #{tournament_id}"
-                    }
-                    
-            else:
-                self.send_response(404)
-                response = {"error": "Endpoint not found"}
+                    route, params = found
+                    response = route(self, data, **params)
+                body = json.dumps(response, ensure_ascii=False).encode('utf-8')
                 
         except Exception as e:
-            self.send_response(500)
-            response = {"error": str(e)}
+            self.status_code = 500
+            body = json.dumps({"error": str(e)}, ensure_ascii=False).encode('utf-8')
         
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        self._send(self.status_code, body)
     
-    def do_OPTIONS(self):
-        """Обработка OPTIONS запросов для CORS"""
-        self.send_response(200)
+    def _send(self, status, body=b''):
+        """Статус, CORS заголовки и Content-Length — соединение остаётся открытым"""
+        self.send_response(status)
+        if body:
+            self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
+        self.wfile.write(body)
+    
+    @ROUTES.get('/')
+    def get_root(self, data):
+        return {
+            "message": "Badminton Rating API",
+            "status": "active",
+            "database": "memory",
+            "players": len(players_db),
+            "rooms": len(rooms_db)
+        }
+    
+    @ROUTES.get('/rooms/')
+    def get_rooms(self, data):
+        return list(rooms_db.values())
+    
+    @ROUTES.get('/rooms/{room_id:int}')
+    def get_room(self, data, room_id):
+        if room_id in rooms_db:
+            return rooms_db[room_id]
+        self.status_code = 404
+        return {"error": "Комната не найдена"}
+    
+    @ROUTES.get('/players/{telegram_id:int}')
+    def get_player(self, data, telegram_id):
+        if telegram_id in players_db:
+            return players_db[telegram_id]
+        return {
+            "id": telegram_id,
+            "telegram_id": telegram_id,
+            "first_name": "Неизвестный",
+            "last_name": "Игрок",
+            "username": None,
+            "rating": 1500
+        }
+    
+    @ROUTES.get('/tournament/{tournament_id:int}')
+    @ROUTES.post('/tournament/{tournament_id:int}')
+    def get_tournament(self, data, tournament_id):
+        # Получение данных турнира
+        if tournament_id not in tournaments_db:
+            self.status_code = 404
+            return {"error": "Турнир не найден"}
+        
+        tournament = tournaments_db[tournament_id]
+        games = tournament_games.get(tournament_id, [])
+        
+        return {
+            "tournament_id": tournament_id,
+            "tournament": tournament,
+            "games": games,
+            "message": f"Данные турнира #{tournament_id}"
+        }
+    
+    @ROUTES.post('/players/')
+    def create_player(self, data):
+        # Создание/обновление игрока
+        if 'telegram_id' not in data:
+            self.status_code = 400
+            return {"error": "telegram_id required"}
+        
+        telegram_id = data['telegram_id']
+        player = {
+            "id": telegram_id,
+            "telegram_id": telegram_id,
+            "first_name": data['first_name'],
+            "last_name": data.get('last_name'),
+            "username": data.get('username'),
+            "rating": 1500
+        }
+        players_db[telegram_id] = player
+        store.mark("players", telegram_id)
+        return player
+    
+    @ROUTES.post('/rooms/')
+    def create_room(self, data):
+        # Создание комнаты
+        global room_counter
+        
+        if 'creator_telegram_id' not in data:
+            self.status_code = 400
+            return {"error": "creator_telegram_id required"}
+        
+        creator_id = data['creator_telegram_id']
+        
+        # ПРОВЕРЯЕМ НЕ СОЗДАЛ ЛИ УЖЕ КОМНАТУ
+        existing_room = None
+        for room_id, room in rooms_db.items():
+            if room['creator_id'] == creator_id:
+                existing_room = room_id
+                break
+        
+        if existing_room:
+            self.status_code = 400
+            return {"error": f"Вы уже создали комнату #{existing_room}. Можно создать только одну комнату."}
+        
+        # Создаем игрока если его нет
+        if creator_id not in players_db:
+            players_db[creator_id] = {
+                "id": creator_id,
+                "telegram_id": creator_id,
+                "first_name": "Игрок",
+                "last_name": f"{creator_id}",
+                "username": None,
+                "rating": 1500
+            }
+        
+        creator = players_db[creator_id]
+        creator_full_name = f"{creator['first_name']} {creator.get('last_name', '')}".strip()
+        
+        # Создаем комнату
+        new_room = {
+            "id": room_counter,
+            "name": data['name'],
+            "creator_id": creator_id,
+            "creator_full_name": creator_full_name,
+            "max_players": data.get('max_players', 4),
+            "member_count": 1,
+            "is_active": True,
+            "created_at": datetime.now().isoformat(),
+            "members": [
+                {
+                    "id": 1,
+                    "player": creator,
+                    "is_leader": True,
+                    "joined_at": datetime.now().isoformat()
+                }
+            ]
+        }
+        
+        rooms_db[room_counter] = new_room
+        store.mark("players", creator_id)
+        store.mark("rooms", room_counter)
+        room_counter += 1
+        _save_counters()
+        return new_room
+    
+    @ROUTES.post('/rooms/{room_id:int}/join')
+    def join_room(self, data, room_id):
+        # Присоединение к комнате
+        if room_id not in rooms_db:
+            self.status_code = 404
+            return {"error": "Комната не найдена"}
+        
+        room = rooms_db[room_id]
+        
+        # Проверяем не полная ли комната
+        if room['member_count'] >= room['max_players']:
+            self.status_code = 400
+            return {"error": "Комната заполнена"}
+        
+        # Создаем игрока если его нет
+        telegram_id = data['telegram_id']
+        if telegram_id not in players_db:
+            players_db[telegram_id] = {
+                "id": telegram_id,
+                "telegram_id": telegram_id,
+                "first_name": data['first_name'],
+                "last_name": data.get('last_name', ''),
+                "username": data.get('username'),
+                "rating": 1500
+            }
+        
+        player = players_db[telegram_id]
+        
+        # Добавляем игрока в комнату
+        new_member = {
+            "id": room['member_count'] + 1,
+            "player": player,
+            "is_leader": False,
+            "joined_at": datetime.now().isoformat()
+        }
+        
+        room['members'].append(new_member)
+        room['member_count'] += 1
+        store.mark("players", telegram_id)
+        store.mark("rooms", room_id)
+        
+        return {
+            "message": "Успешно присоединились к комнате",
+            "room": room
+        }
+    
+    @ROUTES.post('/rooms/{room_id:int}/leave')
+    def leave_room(self, data, room_id):
+        # Выход из комнаты
+        if room_id not in rooms_db:
+            self.status_code = 404
+            return {"error": "Комната не найдена"}
+        
+        room = rooms_db[room_id]
+        telegram_id = data['telegram_id']
+        
+        # Удаляем игрока из комнаты
+        room['members'] = [m for m in room['members'] if m['player']['telegram_id'] != telegram_id]
+        room['member_count'] = len(room['members'])
+        store.mark("rooms", room_id)
+        
+        # Если комната пустая, удаляем её
+        if room['member_count'] == 0:
+            del rooms_db[room_id]
+            return {
+                "message": "Комната расформирована",
+                "room_disbanded": True
+            }
+        return {
+            "message": "Вы покинули комнату",
+            "room": room,
+            "room_disbanded": False
+        }
+    
+    @ROUTES.post('/rooms/{room_id:int}/finish-game')
+    def finish_game(self, data, room_id):
+        # Завершение игры
+        if room_id not in rooms_db:
+            self.status_code = 404
+            return {"error": "Комната не найдена"}
+        
+        room = rooms_db[room_id]
+        
+        # Вычисляем изменения рейтинга
+        rating_changes = calculate_rating_changes(room, data)
+        for changed_id in rating_changes:
+            store.mark("players", changed_id)
+        
+        # Сохраняем игру в турнир если он активен
+        if current_tournament:
+            game_data = {
+                "room_id": room_id,
+                "team1": data['team1'],
+                "team2": data['team2'],
+                "score1": data['score1'],
+                "score2": data['score2'],
+                "rating_changes": rating_changes,
+                "timestamp": datetime.now().isoformat()
+            }
+            tournament_games[current_tournament].append(game_data)
+            store.mark("tournament_games", current_tournament)
+        
+        return {
+            "message": "Игра завершена",
+            "room": room,
+            "rating_changes": rating_changes
+        }
+    
+    @ROUTES.post('/tournament/start')
+    def start_tournament(self, data):
+        # Начать турнир
+        global tournament_counter, current_tournament
+        
+        tournament_counter += 1
+        current_tournament = tournament_counter
+        
+        tournaments_db[current_tournament] = {
+            "id": current_tournament,
+            "start_time": datetime.now().isoformat(),
+            "status": "active"
+        }
+        
+        tournament_games[current_tournament] = []
+        store.mark("tournaments", current_tournament)
+        store.mark("tournament_games", current_tournament)
+        _save_counters()
+        
+        return {
+            "message": f"Турнир #{current_tournament} начат!",
+            "tournament_id": current_tournament
+        }
+    
+    @ROUTES.post('/tournament/end')
+    def end_tournament(self, data):
+        # Завершить турнир
+        global current_tournament
+        
+        if current_tournament is None:
+            return {"error": "Нет активного турнира"}
+        
+        tournament_id = current_tournament
+        tournaments_db[tournament_id]["status"] = "finished"
+        tournaments_db[tournament_id]["end_time"] = datetime.now().isoformat()
+        
+        current_tournament = None
+        store.mark("tournaments", tournament_id)
+        _save_counters()
+        
+        return {
+            "message": f"Турнир #{tournament_id} завершен!",
+            "tournament_id": tournament_id
+        }
+    
+    def do_OPTIONS(self):
+        """Обработка OPTIONS запросов для CORS"""
+        self._send(200)
 
 if __name__ == '__main__':
-    server = HTTPServer(('0.0.0.0', 8000), handler)
+    server = ThreadingHTTPServer(('0.0.0.0', 8000), handler)
     print('🚀 API сервер запущен на http://0.0.0.0:8000')
     server.serve_forever()
@@ -1,20 +1,265 @@
-from http.server import BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import json
+import os
+import sys
+import threading
+import time
 import urllib.parse
 import math
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 
-# Простое хранилище
-players_db = {}
-rooms_db = {}
+# Общие модули лежат в корне проекта
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT_DIR not in sys.path:
+    sys.path.insert(0, _ROOT_DIR)
+
+from memory_journal import MemoryJournal
+from memory_records import Member, Player, Room, unknown_player
+from routes import RouteTable
+from tournament_log import TournamentLog, valid_game
+
+# Каталог для снимка и журнала изменений (пусто — хранить только в памяти)
+MEMORY_STORE_DIR = os.getenv("MEMORY_STORE_DIR", "")
+MEMORY_SNAPSHOT_EVERY = int(os.getenv("MEMORY_SNAPSHOT_EVERY", "10000"))
+
+# Сколько секунд держать простаивающее keep-alive соединение
+KEEPALIVE_TIMEOUT = float(os.getenv("KEEPALIVE_TIMEOUT", "15"))
+
+# Размер страницы журнала игр турнира
+TOURNAMENT_PAGE_SIZE = int(os.getenv("TOURNAMENT_PAGE_SIZE", "100"))
+TOURNAMENT_PAGE_MAX = 1000
+
+# Простое хранилище (записи из memory_records.py; участники ссылаются на игроков по id)
+players_db = {}        # telegram_id -> Player
+rooms_db = {}          # room_id -> Room
 room_counter = 1
 
+# Вторичные индексы поверх rooms_db (поддерживаются при каждом изменении)
+room_by_creator = {}   # creator telegram_id -> room_id
+rooms_by_member = {}   # telegram_id -> set(room_id)
+open_rooms = {}        # room_id -> room (активные комнаты в порядке создания)
+
+# Закодированный JSON каждой комнаты; сбрасывается при изменении комнаты
+# или её участников. Список комнат склеивается из готовых фрагментов.
+_room_json = {}        # room_id -> bytes
+_room_versions = {}    # room_id -> номер изменения (защита от устаревшей записи в кэш)
+
 # Данные турниров
 tournaments_db = {}
-tournament_games = {}
+tournament_games = {}  # tournament_id -> TournamentLog
 tournament_counter = 0
 current_tournament = None
 
+# Блокировки для многопоточного сервера: запросы к конкретной комнате
+# (/rooms/<id>/...) берут свою полосу, остальные — общую блокировку.
+# Индексы защищены отдельной короткой блокировкой.
+# Порядок захвата: полоса комнаты → _store_lock → _index_lock. Рейтинги
+# игроков и текущий турнир общие для всех комнат, поэтому finish_game
+# меняет их под _store_lock.
+ROOM_LOCK_STRIPES = 64
+_room_locks = [threading.RLock() for _ in range(ROOM_LOCK_STRIPES)]
+_store_lock = threading.RLock()
+_index_lock = threading.RLock()
+
+
+def _lock_for_path(path):
+    """Блокировка, под которой выполняется запрос к path"""
+    parts = path.strip('/').split('/')
+    if len(parts) >= 2 and parts[0] == 'rooms' and parts[1].isdigit():
+        return _room_locks[int(parts[1]) % ROOM_LOCK_STRIPES]
+    return _store_lock
+
+
+def _index_room(room):
+    """Регистрирует новую комнату во всех индексах"""
+    room_id = room.id
+    with _index_lock:
+        room_by_creator[room.creator_id] = room_id
+        if room.is_active:
+            open_rooms[room_id] = room
+        for member in room.members:
+            rooms_by_member.setdefault(member.player_id, set()).add(room_id)
+
+
+def _unindex_room(room_id):
+    """Удаляет комнату из rooms_db и всех индексов"""
+    with _index_lock:
+        room = rooms_db.pop(room_id, None)
+        if room is None:
+            return None
+        if room_by_creator.get(room.creator_id) == room_id:
+            del room_by_creator[room.creator_id]
+        open_rooms.pop(room_id, None)
+        _room_json.pop(room_id, None)
+        _room_versions.pop(room_id, None)
+        for member in room.members:
+            _unindex_member(room_id, member.player_id)
+        return room
+
+
+def _index_member(room_id, telegram_id):
+    with _index_lock:
+        rooms_by_member.setdefault(telegram_id, set()).add(room_id)
+
+
+def _unindex_member(room_id, telegram_id):
+    with _index_lock:
+        member_rooms = rooms_by_member.get(telegram_id)
+        if member_rooms is not None:
+            member_rooms.discard(room_id)
+            if not member_rooms:
+                del rooms_by_member[telegram_id]
+
+
+def _is_member(room_id, telegram_id):
+    return room_id in rooms_by_member.get(telegram_id, ())
+
+
+def _room_bytes(room):
+    """JSON комнаты из кэша (кодируется только после изменения)"""
+    room_id = room.id
+    encoded = _room_json.get(room_id)
+    if encoded is not None:
+        return encoded
+    version = _room_versions.get(room_id, 0)
+    encoded = json.dumps(room.to_dict(players_db), ensure_ascii=False).encode('utf-8')
+    with _index_lock:
+        # Комнату изменили, пока мы кодировали, — такой фрагмент не кэшируем
+        if _room_versions.get(room_id, 0) == version and room_id in rooms_db:
+            _room_json[room_id] = encoded
+    return encoded
+
+
+def _invalidate_room(room_id):
+    with _index_lock:
+        _room_versions[room_id] = _room_versions.get(room_id, 0) + 1
+        _room_json.pop(room_id, None)
+
+
+def _invalidate_player(telegram_id):
+    """Данные игрока изменились — сбрасываем JSON всех его комнат"""
+    with _index_lock:
+        room_ids = list(rooms_by_member.get(telegram_id, ()))
+    for room_id in room_ids:
+        _invalidate_room(room_id)
+
+
+# ---- Сохранение состояния: снимок + журнал изменений ----
+
+journal = None
+
+
+@contextmanager
+def _freeze_all():
+    """Останавливает все изменения хранилища (на время снятия снимка)"""
+    with ExitStack() as stack:
+        for lock in _room_locks:
+            stack.enter_context(lock)
+        stack.enter_context(_store_lock)
+        yield
+
+
+def _counters():
+    return {
+        "room_counter": room_counter,
+        "tournament_counter": tournament_counter,
+        "current_tournament": current_tournament,
+    }
+
+
+def _snapshot_state():
+    return {
+        "players": [player.to_state() for player in players_db.values()],
+        "rooms": [room.to_state() for room in rooms_db.values()],
+        "tournaments": list(tournaments_db.values()),
+        "tournament_games": [[tournament_id, log.to_state()] for tournament_id, log in tournament_games.items()],
+        "counters": _counters(),
+    }
+
+
+def _journal(*op):
+    """Записывает изменение в журнал (вызывается под блокировкой запроса)"""
+    if journal is None:
+        return
+    if journal.append(list(op)):
+        # Снимок пишем в фоне: он ждёт освобождения всех блокировок
+        threading.Thread(
+            target=journal.compact, args=(_snapshot_state, _freeze_all), daemon=True
+        ).start()
+
+
+def _set_counters(counters):
+    global room_counter, tournament_counter, current_tournament
+    room_counter = counters["room_counter"]
+    tournament_counter = counters["tournament_counter"]
+    current_tournament = counters["current_tournament"]
+
+
+def _restore_state(state):
+    players_db.clear()
+    players_db.update((player[0], Player.from_state(player)) for player in state["players"])
+    rooms_db.clear()
+    rooms_db.update((room[0], Room.from_state(room)) for room in state["rooms"])
+    tournaments_db.clear()
+    tournaments_db.update((tournament["id"], tournament) for tournament in state["tournaments"])
+    tournament_games.clear()
+    tournament_games.update(
+        (tournament_id, TournamentLog.from_state(log, tournament_id)) for tournament_id, log in state["tournament_games"]
+    )
+    _set_counters(state["counters"])
+
+
+def _apply_op(op):
+    kind = op[0]
+    if kind == "player":
+        players_db[op[1][0]] = Player.from_state(op[1])
+    elif kind == "room":
+        rooms_db[op[1][0]] = Room.from_state(op[1])
+    elif kind == "room_del":
+        rooms_db.pop(op[1], None)
+    elif kind == "tournament":
+        tournaments_db[op[1]["id"]] = op[1]
+        tournament_games.setdefault(op[1]["id"], TournamentLog(op[1]["id"]))
+    elif kind == "game":
+        tournament_id, room_id, timestamp, team1, team2, score1, score2, ratings = op[1:]
+        tournament_games.setdefault(tournament_id, TournamentLog(tournament_id)).append(
+            room_id, timestamp, team1, team2, score1, score2,
+            {player_id: (old_rating, new_rating) for player_id, old_rating, new_rating in ratings},
+        )
+    elif kind == "counters":
+        _set_counters(op[1])
+
+
+def _rebuild_indexes():
+    """Строит индексы комнат заново"""
+    room_by_creator.clear()
+    rooms_by_member.clear()
+    open_rooms.clear()
+    _room_json.clear()
+    for room in rooms_db.values():
+        _index_room(room)
+
+
+def init_persistence(directory):
+    """Загружает снимок и хвост журнала, дальше пишет изменения в directory"""
+    global journal
+    started = time.perf_counter()
+    store = MemoryJournal(directory, compact_every=MEMORY_SNAPSHOT_EVERY)
+    state, ops = store.load()
+    with _freeze_all():
+        if state is not None:
+            _restore_state(state)
+        for op in ops:
+            _apply_op(op)
+        _rebuild_indexes()
+        journal = store
+    print(
+        f"💾 Состояние загружено из {directory}: {len(players_db)} игроков, "
+        f"{len(rooms_db)} комнат, {len(ops)} операций журнала за {time.perf_counter() - started:.3f} с"
+    )
+    return store
+
 # Система рейтинга Glicko-2 для бадминтона
 class Glicko2Rating:
     def __init__(self, rating=1500, rd=350, vol=0.06):
@@ -108,7 +353,7 @@ def calculate_team_rating(players, is_winner):
         return 1500
     
     # Средний рейтинг команды
-    avg_rating = sum(p['rating'] for p in players) / 2
+    avg_rating = sum(p.rating for p in players) / 2
     
     # Бонус за командную игру (5% от среднего рейтинга)
     team_bonus = avg_rating * 0.05
@@ -144,7 +389,7 @@ def calculate_rating_changes(room_data, score_data):
         team1_rating = calculate_team_rating(team1_players, team1_won)
         
         for player in team1_players:
-            glicko = Glicko2Rating(player['rating'], 350, 0.06)
+            glicko = Glicko2Rating(player.rating, 350, 0.06)
             
             # Создаем результаты против команды 2
             results = []
@@ -154,10 +399,10 @@ def calculate_rating_changes(room_data, score_data):
                 results.append((team2_rating, 350, score))
             
             new_rating, new_rd, new_vol = glicko.update_rating(results)
-            old_rating = player['rating']
+            old_rating = player.rating
             rating_change = new_rating - old_rating
             
-            changes[player['telegram_id']] = {
+            changes[player.telegram_id] = {
                 'old_rating': old_rating,
                 'new_rating': new_rating,
                 'rating_change': rating_change,
@@ -166,14 +411,14 @@ def calculate_rating_changes(room_data, score_data):
             }
             
             # Обновляем рейтинг в базе
-            player['rating'] = new_rating
+            player.rating = new_rating
     
     # Обрабатываем команду 2
     if team2_players:
         team2_rating = calculate_team_rating(team2_players, team2_won)
         
         for player in team2_players:
-            glicko = Glicko2Rating(player['rating'], 350, 0.06)
+            glicko = Glicko2Rating(player.rating, 350, 0.06)
             
             # Создаем результаты против команды 1
             results = []
@@ -183,10 +428,10 @@ def calculate_rating_changes(room_data, score_data):
                 results.append((team1_rating, 350, score))
             
             new_rating, new_rd, new_vol = glicko.update_rating(results)
-            old_rating = player['rating']
+            old_rating = player.rating
             rating_change = new_rating - old_rating
             
-            changes[player['telegram_id']] = {
+            changes[player.telegram_id] = {
                 'old_rating': old_rating,
                 'new_rating': new_rating,
                 'rating_change': rating_change,
@@ -195,89 +440,27 @@ def calculate_rating_changes(room_data, score_data):
             }
             
             # Обновляем рейтинг в базе
-            player['rating'] = new_rating
+            player.rating = new_rating
     
     return changes
 
+ROUTES = RouteTable()
+
+
 class handler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        """Обработка GET запросов"""
-        path = self.path.split('?')[0]
-        
-        # CORS заголовки
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-        
-        try:
-            if path == '/':
-                response = {
-                    "message": "🏸 Badminton Rating API",
-                    "version": "1.0.0",
-                    "status": "active",
-                    "database": "memory",
-                    "players": len(players_db),
-                    "rooms": len(rooms_db)
-                }
-                
-            elif path == '/health':
-                response = {
-                    "status": "healthy",
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-            elif path == '/rooms/':
-                # Возвращаем все комнаты
-                active_rooms = [room for room in rooms_db.values() if room.get("is_active", True)]
-                response = active_rooms
-                
-            elif path.startswith('/rooms/') and path != '/rooms/':
-                # Получение конкретной комнаты
-                room_id = int(path.split('/')[-1])
-                if room_id in rooms_db:
-                    response = rooms_db[room_id]
-                else:
-                    self.send_response(404)
-                    response = {"error": "Комната не найдена"}
-                    
-            elif path.startswith('/players/'):
-                # Получение игрока
-                telegram_id = int(path.split('/')[-1])
-                if telegram_id in players_db:
-                    response = players_db[telegram_id]
-                else:
-                    response = {
-                        "id": telegram_id,
-                        "telegram_id": telegram_id,
-                        "first_name": "Неизвестный",
-                        "last_name": "Игрок",
-                        "username": None,
-                        "rating": 1500
-                    }
-            else:
-                self.send_response(404)
-                response = {"error": "Endpoint not found"}
-                
-        except Exception as e:
-            self.send_response(500)
-            response = {"error": str(e)}
-        
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+    # Постоянные соединения: опросы Mini App идут по одному TCP-соединению
+    protocol_version = 'HTTP/1.1'
+    # Простаивающее соединение закрывается, чтобы не держать поток
+    timeout = KEEPALIVE_TIMEOUT
+    # Заголовки и тело уходят разными записями: без TCP_NODELAY второй пакет
+    # ждёт отложенного ACK клиента (~40 мс на каждый опрос)
+    disable_nagle_algorithm = True
     
-    def do_POST(self):
-        """Обработка POST запросов"""
-        global room_counter
-        
-        # CORS заголовки
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+    def _dispatch(self, method):
+        """Находит маршрут в таблице ROUTES и вызывает его обработчик"""
+        body = None
+        # Маршрут может поменять статус; ответ буферизуется и отправляется целиком
+        self.status_code = 200
         
         try:
             content_length_str = self.headers.get('Content-Length')
@@ -289,300 +472,355 @@ class handler(BaseHTTPRequestHandler):
                 data = {}
             
             path = self.path.split('?')[0]
-            print(f"🔍 POST запрос: {path}, data: {data}")
+            if method == 'POST':
+                print(f"🔍 POST запрос: {path}, data: {data}")
             
-            if path == '/players/':
-                # Создание/обновление игрока
-                if 'telegram_id' not in data:
-                    self.send_response(400)
-                    response = {"error": "telegram_id required"}
-                else:
-                    telegram_id = data['telegram_id']
-                    player = {
-                        "id": telegram_id,
-                        "telegram_id": telegram_id,
-                        "first_name": data['first_name'],
-                        "last_name": data.get('last_name'),
-                        "username": data.get('username'),
-                        "rating": 1500
-                    }
-                    players_db[telegram_id] = player
-                    response = player
-                
-            elif path == '/rooms/':
-                # Создание комнаты
-                if 'creator_telegram_id' not in data:
-                    self.send_response(400)
-                    response = {"error": "creator_telegram_id required"}
-                else:
-                    creator_id = data['creator_telegram_id']
-                    
-                    # ПРОВЕРЯЕМ НЕ СОЗДАЛ ЛИ УЖЕ КОМНАТУ
-                    existing_room = None
-                    for room_id, room in rooms_db.items():
-                        if room['creator_id'] == creator_id:
-                            existing_room = room_id
-                            break
-                    
-                    if existing_room:
-                        self.send_response(400)
-                        response = {"error": f"Вы уже создали комнату #{existing_room}. Можно создать только одну комнату."}
-                    else:
-                        # Создаем игрока если его нет
-                        if creator_id not in players_db:
-                            players_db[creator_id] = {
-                                "id": creator_id,
-                                "telegram_id": creator_id,
-                                "first_name": "Игрок",
-                                "last_name": f"{creator_id}",
-                                "username": None,
-                                "rating": 1500
-                            }
-                    
-                        creator = players_db[creator_id]
-                        creator_full_name = f"{creator['first_name']} {creator.get('last_name', '')}".strip()
-                        
-                        # Создаем комнату
-                        new_room = {
-                            "id": room_counter,
-                            "name": data['name'],
-                            "creator_id": creator_id,
-                            "creator_full_name": creator_full_name,
-                            "max_players": data.get('max_players', 4),
-                            "member_count": 1,
-                            "is_active": True,
-                            "created_at": datetime.now().isoformat(),
-                            "members": [
-                                {
-                                    "id": 1,
-                                    "player": creator,
-                                    "is_leader": True,
-                                    "joined_at": datetime.now().isoformat()
-                                }
-                            ]
-                        }
-                        
-                        rooms_db[room_counter] = new_room
-                        room_counter += 1
-                        response = new_room
-                
-            elif path.startswith('/rooms/') and path.endswith('/join'):
-                # Присоединение к комнате
-                room_id = int(path.split('/')[-2])
-                telegram_id = data['telegram_id']
-                first_name = data.get('first_name', 'Игрок')
-                last_name = data.get('last_name', '')
-                username = data.get('username')
-                
-                if room_id not in rooms_db:
-                    self.send_response(404)
-                    response = {"error": "Комната не найдена"}
-                else:
-                    room = rooms_db[room_id]
-                    
-                    # Проверяем не присоединился ли уже
-                    already_joined = any(member['player']['telegram_id'] == telegram_id for member in room['members'])
-                    
-                    if already_joined:
-                        response = {"message": "Вы уже в комнате", "room": room}
-                    elif len(room['members']) >= room['max_players']:
-                        self.send_response(400)
-                        response = {"error": "Комната заполнена"}
-                    else:
-                        # Создаем/обновляем игрока
-                        if telegram_id not in players_db:
-                            players_db[telegram_id] = {
-                                "id": telegram_id,
-                                "telegram_id": telegram_id,
-                                "first_name": first_name,
-                                "last_name": last_name,
-                                "username": username,
-                                "rating": 1500
-                            }
-                        else:
-                            # Обновляем данные игрока
-                            players_db[telegram_id].update({
-                                "first_name": first_name,
-                                "last_name": last_name,
-                                "username": username
-                            })
-                        
-                        player = players_db[telegram_id]
-                        
-                        # Добавляем игрока в комнату
-                        new_member = {
-                            "id": len(room['members']) + 1,
-                            "player": player,
-                            "is_leader": False,
-                            "joined_at": datetime.now().isoformat()
-                        }
-                        
-                        room['members'].append(new_member)
-                        room['member_count'] = len(room['members'])
-                        
-                        # Обновляем комнату в базе
-                        rooms_db[room_id] = room
-                        
-                        response = {
-                            "message": "Успешно присоединились к комнате",
-                            "room": room,
-                            "member": new_member
-                        }
-                        
-            elif path.startswith('/rooms/') and path.endswith('/leave'):
-                # Выход из комнаты
-                room_id = int(path.split('/')[-2])
-                telegram_id = data['telegram_id']
-                
-                if room_id not in rooms_db:
-                    self.send_response(404)
-                    response = {"error": "Комната не найдена"}
-                else:
-                    room = rooms_db[room_id]
-                    
-                    # Находим участника для удаления
-                    member_to_remove = None
-                    for i, member in enumerate(room['members']):
-                        if member['player']['telegram_id'] == telegram_id:
-                            member_to_remove = i
-                            break
-                    
-                    if member_to_remove is not None:
-                        # Удаляем участника
-                        removed_member = room['members'].pop(member_to_remove)
-                        room['member_count'] = len(room['members'])
-                        
-                        # ЕСЛИ СОЗДАТЕЛЬ ПОКИДАЕТ КОМНАТУ - РАСФОРМИРОВЫВАЕМ ПОЛНОСТЬЮ
-                        if room['creator_id'] == telegram_id:
-                            # Создаем список участников для уведомления
-                            remaining_members = [member['player']['telegram_id'] for member in room['members']]
-                            
-                            # Удаляем комнату полностью
-                            del rooms_db[room_id]
-                            
-                            response = {
-                                "message": "Комната расформирована",
-                                "room_disbanded": True,
-                                "affected_members": remaining_members
-                            }
-                        elif len(room['members']) == 0:
-                            # Если комната пуста - удаляем её
-                            del rooms_db[room_id]
-                            response = {"message": "Вы покинули комнату. Комната удалена."}
-                        else:
-                            # Обычный выход участника
-                            rooms_db[room_id] = room
-                            response = {
-                                "message": "Вы покинули комнату",
-                                "room": room,
-                                "removed_member": removed_member
-                            }
-                    else:
-                        self.send_response(400)
-                        response = {"error": "Вы не состоите в этой комнате"}
-                
-            else:
-                self.send_response(404)
+            found = ROUTES.match(method, path)
+            if found is None:
+                self.status_code = 404
                 response = {"error": "Endpoint not found"}
+            else:
+                route, params = found
+                with _lock_for_path(path):
+                    response = route(self, data, **params)
+            if isinstance(response, bytes):
+                # Уже закодированный JSON (кэш комнат)
+                body = response
                 
         except Exception as e:
-            self.send_response(500)
+            self.status_code = 500
             response = {"error": str(e)}
+            body = None
         
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        if body is None:
+            body = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        self._send(self.status_code, body)
     
-    def do_DELETE(self):
-        """Обработка DELETE запросов"""
-        # CORS заголовки
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+    def _send(self, status, body=b''):
+        """Статус, CORS заголовки и Content-Length — соединение остаётся открытым"""
+        self.send_response(status)
+        if body:
+            self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        """Обработка GET запросов"""
+        self._dispatch('GET')
+    
+    def do_POST(self):
+        """Обработка POST запросов"""
+        self._dispatch('POST')
+    
+    def do_DELETE(self):
+        """Обработка DELETE запросов"""
+        self._dispatch('DELETE')
+    
+    @ROUTES.get('/')
+    def get_root(self, data):
+        return {
+            "message": "🏸 Badminton Rating API",
+            "version": "1.0.0",
+            "status": "active",
+            "database": "memory",
+            "players": len(players_db),
+            "rooms": len(rooms_db)
+        }
+    
+    @ROUTES.get('/health')
+    def get_health(self, data):
+        return {
+            "status": "healthy",
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    @ROUTES.get('/rooms/')
+    def get_rooms(self, data):
+        # Возвращаем все активные комнаты
+        return b'[' + b', '.join([_room_bytes(room) for room in list(open_rooms.values())]) + b']'
+    
+    @ROUTES.get('/rooms/{room_id:int}')
+    def get_room(self, data, room_id):
+        # Получение конкретной комнаты
+        if room_id in rooms_db:
+            return _room_bytes(rooms_db[room_id])
+        self.status_code = 404
+        return {"error": "Комната не найдена"}
+    
+    @ROUTES.get('/players/{telegram_id:int}')
+    def get_player(self, data, telegram_id):
+        # Получение игрока
+        player = players_db.get(telegram_id) or unknown_player(telegram_id)
+        return player.to_dict()
+    
+    @ROUTES.post('/players/')
+    def create_player(self, data):
+        # Создание/обновление игрока
+        if 'telegram_id' not in data:
+            self.status_code = 400
+            return {"error": "telegram_id required"}
+        
+        telegram_id = data['telegram_id']
+        player = Player(
+            telegram_id,
+            data['first_name'],
+            data.get('last_name'),
+            data.get('username'),
+        )
+        players_db[telegram_id] = player
+        _invalidate_player(telegram_id)
+        _journal("player", player.to_state())
+        return player.to_dict()
+    
+    @ROUTES.post('/rooms/')
+    def create_room(self, data):
+        # Создание комнаты
+        global room_counter
         
-        try:
-            path = self.path.split('?')[0]
+        if 'creator_telegram_id' not in data:
+            self.status_code = 400
+            return {"error": "creator_telegram_id required"}
+        
+        creator_id = data['creator_telegram_id']
+        
+        # ПРОВЕРЯЕМ НЕ СОЗДАЛ ЛИ УЖЕ КОМНАТУ
+        existing_room = room_by_creator.get(creator_id)
+        
+        if existing_room:
+            self.status_code = 400
+            return {"error": f"Вы уже создали комнату #{existing_room}. Можно создать только одну комнату."}
+        
+        # Создаем игрока если его нет
+        if creator_id not in players_db:
+            players_db[creator_id] = Player(creator_id, "Игрок", f"{creator_id}")
+        
+        creator = players_db[creator_id]
+        
+        # Создаем комнату
+        new_room = Room(
+            room_counter,
+            data['name'],
+            creator_id,
+            creator.full_name,
+            data.get('max_players', 4),
+            datetime.now().isoformat(),
+            [Member(1, creator_id, True, datetime.now().isoformat())],
+        )
+        
+        rooms_db[room_counter] = new_room
+        _index_room(new_room)
+        room_counter += 1
+        _journal("player", creator.to_state())
+        _journal("room", new_room.to_state())
+        _journal("counters", _counters())
+        return new_room.to_dict(players_db)
+    
+    @ROUTES.post('/rooms/{room_id:int}/join')
+    def join_room(self, data, room_id):
+        # Присоединение к комнате
+        telegram_id = data['telegram_id']
+        first_name = data.get('first_name', 'Игрок')
+        last_name = data.get('last_name', '')
+        username = data.get('username')
+        
+        if room_id not in rooms_db:
+            self.status_code = 404
+            return {"error": "Комната не найдена"}
+        
+        room = rooms_db[room_id]
+        
+        # Проверяем не присоединился ли уже
+        if _is_member(room_id, telegram_id):
+            return {"message": "Вы уже в комнате", "room": room.to_dict(players_db)}
+        if len(room.members) >= room.max_players:
+            self.status_code = 400
+            return {"error": "Комната заполнена"}
+        
+        # Создаем/обновляем игрока
+        if telegram_id not in players_db:
+            players_db[telegram_id] = Player(telegram_id, first_name, last_name, username)
+        else:
+            # Обновляем данные игрока
+            player = players_db[telegram_id]
+            player.first_name = first_name
+            player.last_name = last_name
+            player.username = username
+            _invalidate_player(telegram_id)
+        
+        player = players_db[telegram_id]
+        
+        # Добавляем игрока в комнату
+        new_member = Member(len(room.members) + 1, telegram_id, False, datetime.now().isoformat())
+        
+        room.members.append(new_member)
+        _index_member(room_id, telegram_id)
+        _invalidate_room(room_id)
+        _journal("player", player.to_state())
+        _journal("room", room.to_state())
+        
+        return {
+            "message": "Успешно присоединились к комнате",
+            "room": room.to_dict(players_db),
+            "member": new_member.to_dict(players_db)
+        }
+    
+    @ROUTES.post('/rooms/{room_id:int}/leave')
+    def leave_room(self, data, room_id):
+        # Выход из комнаты
+        telegram_id = data['telegram_id']
+        
+        if room_id not in rooms_db:
+            self.status_code = 404
+            return {"error": "Комната не найдена"}
+        
+        room = rooms_db[room_id]
+        
+        if not _is_member(room_id, telegram_id):
+            self.status_code = 400
+            return {"error": "Вы не состоите в этой комнате"}
+        
+        # Удаляем участника (в комнате не больше max_players записей)
+        member_to_remove = next(
+            i for i, member in enumerate(room.members)
+            if member.player_id == telegram_id
+        )
+        removed_member = room.members.pop(member_to_remove)
+        _unindex_member(room_id, telegram_id)
+        _invalidate_room(room_id)
+        
+        # ЕСЛИ СОЗДАТЕЛЬ ПОКИДАЕТ КОМНАТУ - РАСФОРМИРОВЫВАЕМ ПОЛНОСТЬЮ
+        if room.creator_id == telegram_id:
+            # Создаем список участников для уведомления
+            remaining_members = [member.player_id for member in room.members]
             
-            if path.startswith('/rooms/') and path != '/rooms/':
-                room_id = int(path.split('/')[-1])
-                if room_id in rooms_db:
-                    del rooms_db[room_id]
-                    response = {"message": "Комната успешно удалена"}
-                else:
-                    self.send_response(404)
-                    response = {"error": "Комната не найдена"}
-                    
-            elif path.startswith('/rooms/') and path.endswith('/finish-game'):
-                # Завершение игры и подсчет рейтинга
-                room_id = int(path.split('/')[-2])
-                
-                if room_id not in rooms_db:
-                    self.send_response(404)
-                    response = {"error": "Комната не найдена"}
-                else:
-                    room = rooms_db[room_id]
-                    
-                    # Проверяем что в комнате 2 или 4 игрока
-                    if len(room['members']) not in [2, 4]:
-                        self.send_response(400)
-                        response = {"error": "Для завершения игры нужно 2 или 4 игрока"}
-                    else:
-                        # Получаем данные счета
-                        score_data = data
-                        
-                        # Вычисляем изменения рейтинга
-                        rating_changes = calculate_rating_changes(room, score_data)
-                        
-                        # Обновляем комнату - игра завершена
-                        room['game_finished'] = True
-                        room['final_score'] = {
-                            'team1': score_data['score1'],
-                            'team2': score_data['score2']
-                        }
-                        room['rating_changes'] = rating_changes
-                        room['finished_at'] = datetime.now().isoformat()
-                        
-                        # Записываем игру в турнир, если он активен
-                        if current_tournament is not None:
-                            game_data = {
-                                "tournament_id": current_tournament,
-                                "room_id": room_id,
-                                "timestamp": datetime.now().isoformat(),
-                                "team1": score_data['team1'],
-                                "team2": score_data['team2'],
-                                "score1": score_data['score1'],
-                                "score2": score_data['score2'],
-                                "rating_changes": rating_changes
-                            }
-                            tournament_games[current_tournament].append(game_data)
-                        
-                        response = {
-                            "message": "Игра завершена!",
-                            "room": room,
-                            "rating_changes": rating_changes
-                        }
-                        
-            elif path == '/tournament/start':
-                # Начать турнир
-                response = self.start_tournament()
-            elif path == '/tournament/end':
-                # Завершить турнир
-                response = self.end_tournament()
-            elif path.startswith('/tournament/'):
-                # Получение данных турнира
-                tournament_id = int(path.split('/')[-1])
-                response = self.get_tournament_data(tournament_id)
-                        
-            else:
-                self.send_response(404)
-                response = {"error": "Endpoint not found"}
-                
-        except Exception as e:
-            self.send_response(500)
-            response = {"error": str(e)}
+            # Удаляем комнату полностью
+            _unindex_room(room_id)
+            _journal("room_del", room_id)
+            
+            return {
+                "message": "Комната расформирована",
+                "room_disbanded": True,
+                "affected_members": remaining_members
+            }
+        if len(room.members) == 0:
+            # Если комната пуста - удаляем её
+            _unindex_room(room_id)
+            _journal("room_del", room_id)
+            return {"message": "Вы покинули комнату. Комната удалена."}
+        
+        _journal("room", room.to_state())
+        # Обычный выход участника
+        return {
+            "message": "Вы покинули комнату",
+            "room": room.to_dict(players_db),
+            "removed_member": removed_member.to_dict(players_db)
+        }
+    
+    @ROUTES.delete('/rooms/{room_id:int}')
+    def delete_room(self, data, room_id):
+        if room_id in rooms_db:
+            _unindex_room(room_id)
+            _journal("room_del", room_id)
+            return {"message": "Комната успешно удалена"}
+        self.status_code = 404
+        return {"error": "Комната не найдена"}
+    
+    @ROUTES.delete('/rooms/{room_id:int}/finish-game')
+    def finish_game(self, data, room_id):
+        # Завершение игры и подсчет рейтинга. В цепочке if/elif эту ветку
+        # перекрывала проверка удаления комнаты (int('finish-game') -> 500);
+        # в таблице маршрут свой, и игры турнира записываются здесь
+        if room_id not in rooms_db:
+            self.status_code = 404
+            return {"error": "Комната не найдена"}
+        
+        room = rooms_db[room_id]
+        
+        # Проверяем что в комнате 2 или 4 игрока
+        if len(room.members) not in [2, 4]:
+            self.status_code = 400
+            return {"error": "Для завершения игры нужно 2 или 4 игрока"}
+        
+        # Получаем данные счета
+        score_data = data
+        
+        # Проверяем счёт до изменения рейтингов: журнал турнира хранит целые числа
+        if not valid_game(score_data.get('team1'), score_data.get('team2'),
+                          score_data.get('score1'), score_data.get('score2')):
+            self.status_code = 400
+            return {"error": "Счёт и составы команд должны быть целыми числами"}
+        
+        # Рейтинги игроков и текущий турнир общие для всех комнат:
+        # полосы комнаты мало, меняем их под общей блокировкой
+        with _store_lock:
+            tournament_id = current_tournament
+            
+            # Вычисляем изменения рейтинга
+            rating_changes = calculate_rating_changes(room, score_data)
+            
+            # Обновляем комнату - игра завершена
+            room.result = {
+                'game_finished': True,
+                'final_score': {
+                    'team1': score_data['score1'],
+                    'team2': score_data['score2']
+                },
+                'rating_changes': rating_changes,
+                'finished_at': datetime.now().isoformat()
+            }
+            for changed_id in rating_changes:
+                _invalidate_player(changed_id)
+                _journal("player", players_db[changed_id].to_state())
+            _invalidate_room(room_id)
+            _journal("room", room.to_state())
+            
+            # Записываем игру в турнир, если он активен
+            if tournament_id is not None:
+                timestamp = datetime.now().isoformat()
+                ratings = [
+                    [player_id, change['old_rating'], change['new_rating']]
+                    for player_id, change in rating_changes.items()
+                ]
+                tournament_games.setdefault(tournament_id, TournamentLog(tournament_id)).append(
+                    room_id, timestamp, score_data['team1'], score_data['team2'],
+                    score_data['score1'], score_data['score2'],
+                    {player_id: (old, new) for player_id, old, new in ratings},
+                )
+                _journal(
+                    "game", tournament_id, room_id, timestamp,
+                    score_data['team1'], score_data['team2'],
+                    score_data['score1'], score_data['score2'], ratings,
+                )
         
-        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        return {
+            "message": "Игра завершена!",
+            "room": room.to_dict(players_db),
+            "rating_changes": rating_changes
+        }
+    
+    @ROUTES.delete('/tournament/start')
+    def start_tournament_route(self, data):
+        # Начать турнир
+        return self.start_tournament()
+    
+    @ROUTES.delete('/tournament/end')
+    def end_tournament_route(self, data):
+        # Завершить турнир
+        return self.end_tournament()
+    
+    @ROUTES.delete('/tournament/{tournament_id:int}')
+    def tournament_data_route(self, data, tournament_id):
+        # Получение данных турнира
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        return self.get_tournament_data(
+            tournament_id,
+            offset=int(query.get('offset', ['0'])[0]),
+            limit=int(query.get('limit', [str(TOURNAMENT_PAGE_SIZE)])[0]),
+        )
     
     def start_tournament(self):
         """Начать турнир"""
@@ -597,7 +835,9 @@ class handler(BaseHTTPRequestHandler):
             "status": "active"
         }
         
-        tournament_games[current_tournament] = []
+        tournament_games[current_tournament] = TournamentLog(current_tournament)
+        _journal("tournament", tournaments_db[current_tournament])
+        _journal("counters", _counters())
         
         return {
             "message": f"Турнир #{current_tournament} начат!",
@@ -616,37 +856,57 @@ class handler(BaseHTTPRequestHandler):
         tournaments_db[tournament_id]["end_time"] = datetime.now().isoformat()
         
         current_tournament = None
+        _journal("tournament", tournaments_db[tournament_id])
+        _journal("counters", _counters())
         
         return {
             "message": f"Турнир #{tournament_id} завершен!",
             "tournament_id": tournament_id
         }
     
-    def get_tournament_data(self, tournament_id):
-        """Получить данные турнира"""
+    def get_tournament_data(self, tournament_id, offset=0, limit=TOURNAMENT_PAGE_SIZE):
+        """Получить данные турнира: итоги игроков и страницу журнала игр"""
         if tournament_id not in tournaments_db:
             return {"error": "Турнир не найден"}
         
         tournament = tournaments_db[tournament_id]
-        games = tournament_games.get(tournament_id, [])
+        log = tournament_games.get(tournament_id)
+        if log is None:
+            log = TournamentLog(tournament_id)
+        offset = max(offset, 0)
+        limit = min(max(limit, 1), TOURNAMENT_PAGE_MAX)
+        games = log.page(offset, limit)
         
         return {
             "tournament_id": tournament_id,
-            "tournament": tournament,
+            # Копия: ответ сериализуется после снятия блокировки, а
+            # end_tournament меняет запись турнира
+            "tournament": dict(tournament),
+            "players": log.summary(),
             "games": games,
+            "games_total": len(log),
+            "next_offset": offset + len(games) if offset + len(games) < len(log) else None,
             "message": f"Данные турнира #{tournament_id}"
         }
     
     def do_OPTIONS(self):
         """Обработка OPTIONS запросов для CORS"""
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+        self._send(200)
+
+class ConcurrentHTTPServer(ThreadingHTTPServer):
+    """Поток на соединение: медленный клиент не блокирует остальных"""
+    daemon_threads = True
+    # Очередь accept для сотен одновременных опросов комнат
+    request_queue_size = 1024
+
+
+if MEMORY_STORE_DIR:
+    init_persistence(MEMORY_STORE_DIR)
+
 
 if __name__ == '__main__':
-    from http.server import HTTPServer
-    server = HTTPServer(('localhost', 8000), handler)
-    print('🚀 API сервер запущен на http://localhost:8000')
+    if journal is None:
+        init_persistence("memory_store")
+    server = ConcurrentHTTPServer(('localhost', 8000), handler)
+    print('🚀 API сервер запущен на http://localhost:8000 (многопоточный режим)')
     server.serve_forever()
\ No newline at end of file
@@ -1,23 +1,77 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import time
+
+# Начало импорта модуля — отсчёт холодного старта инстанса
+_IMPORT_STARTED = time.perf_counter()
+
 import json
+import os
 import urllib.parse
 import math
+import threading
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import HTTPServer, ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from shared_store import open_store
+
+# Сколько секунд держать простаивающее keep-alive соединение (локальный сервер)
+KEEPALIVE_TIMEOUT = float(os.getenv("KEEPALIVE_TIMEOUT", "15"))
+
+
+def _on_reload():
+    """Другой процесс изменил состояние (или загружен снимок): обновляем счётчики, связи и индексы"""
+    global room_counter, tournament_counter, current_tournament
+    started = time.perf_counter()
+    room_counter = counters.get("room_counter", 1)
+    tournament_counter = counters.get("tournament_counter", 0)
+    current_tournament = counters.get("current_tournament")
+    room_by_creator.clear()
+    open_rooms.clear()
+    for room_id, room in rooms_db.items():
+        for member in room['members']:
+            member['player'] = players_db.get(member['player']['telegram_id'], member['player'])
+        room_by_creator[room['creator_id']] = room_id
+        if room.get('is_active', True):
+            open_rooms[room_id] = room
+    COLD_START.setdefault("reindex", time.perf_counter() - started)
+
 
-# Простое хранилище
-players_db = {}
-rooms_db = {}
+def _save_counters():
+    counters.update(
+        room_counter=room_counter,
+        tournament_counter=tournament_counter,
+        current_tournament=current_tournament,
+    )
+    for name in ("room_counter", "tournament_counter", "current_tournament"):
+        store.mark("counters", name)
+
+
+# Хранилище (в памяти процесса, снимок для тёплого старта или общее для всех воркеров, см. shared_store.py)
+store = open_store(_on_reload)
+players_db = store.table("players")
+rooms_db = store.table("rooms")
+counters = store.table("counters")
 room_counter = 1
 
+# Вторичные индексы поверх rooms_db
+room_by_creator = {}   # creator telegram_id -> room_id
+open_rooms = {}        # room_id -> room (активные комнаты в порядке создания)
+
 # Данные турниров
-tournaments_db = {}
-tournament_games = {}
+tournaments_db = store.table("tournaments")
+tournament_games = store.table("tournament_games")
 tournament_counter = 0
 current_tournament = None
 
+# Холодный старт инстанса, секунды: import — импорт модуля, state — загрузка снимка,
+# reindex — счётчики и индексы по снимку, first_request — первый запрос целиком
+COLD_START = {
+    "state": store.load_seconds,
+}
+_first_request = True
+
 # Система рейтинга Glicko-2 для бадминтона
 class Glicko2Rating:
     def __init__(self, rating=1500, rd=350, vol=0.06):
@@ -129,6 +183,30 @@ def calculate_rating_changes(room, score_data):
 
 def handler(request):
     """Обработчик для Vercel"""
+    global _first_request
+    started = time.perf_counter()
+    if request.method in ('GET', 'OPTIONS'):
+        with store.read():
+            result = _handle(request)
+    else:
+        with store.write():
+            result = _handle(request)
+    if _first_request:
+        _first_request = False
+        _report_cold_start(result, started)
+    return result
+
+
+def _report_cold_start(result, started):
+    """Первый ответ инстанса: сколько ушло на импорт, снимок и сам запрос"""
+    COLD_START["first_request"] = time.perf_counter() - started
+    names = [name for name in ("import", "state", "reindex", "first_request") if name in COLD_START]
+    timing = ", ".join(f"{name};dur={COLD_START[name] * 1000:.2f}" for name in names)
+    result['headers'] = dict(result['headers'], **{'Server-Timing': timing})
+    print("🧊 Холодный старт: " + ", ".join(f"{name} {COLD_START[name] * 1000:.1f} мс" for name in names))
+
+
+def _handle(request):
     global room_counter, tournament_counter, current_tournament
     
     # CORS заголовки
@@ -165,7 +243,7 @@ def handler(request):
             }
             
         elif request.method == 'GET' and path == '/rooms/':
-            response = list(rooms_db.values())
+            response = list(open_rooms.values())
             
         elif request.method == 'GET' and path.startswith('/rooms/') and path != '/rooms/':
             room_id = int(path.split('/')[-1])
@@ -219,6 +297,7 @@ def handler(request):
                     "rating": 1500
                 }
                 players_db[telegram_id] = player
+                store.mark("players", telegram_id)
                 response = player
                 
         elif request.method == 'POST' and path == '/rooms/':
@@ -229,11 +308,7 @@ def handler(request):
                 creator_id = data['creator_telegram_id']
                 
                 # ПРОВЕРЯЕМ НЕ СОЗДАЛ ЛИ УЖЕ КОМНАТУ
-                existing_room = None
-                for room_id, room in rooms_db.items():
-                    if room['creator_id'] == creator_id:
-                        existing_room = room_id
-                        break
+                existing_room = room_by_creator.get(creator_id)
                 
                 if existing_room:
                     return {'statusCode': 400, 'headers': headers, 'body': json.dumps({"error": f"Вы уже создали комнату #{existing_room}. Можно создать только одну комнату."})}
@@ -273,7 +348,12 @@ def handler(request):
                     }
                     
                     rooms_db[room_counter] = new_room
+                    room_by_creator[creator_id] = room_counter
+                    open_rooms[room_counter] = new_room
+                    store.mark("players", creator_id)
+                    store.mark("rooms", room_counter)
                     room_counter += 1
+                    _save_counters()
                     response = new_room
                     
         elif request.method == 'POST' and path == '/tournament/start':
@@ -288,6 +368,9 @@ def handler(request):
             }
             
             tournament_games[current_tournament] = []
+            store.mark("tournaments", current_tournament)
+            store.mark("tournament_games", current_tournament)
+            _save_counters()
             
             response = {
                 "message": f"Турнир #{current_tournament} начат!",
@@ -304,6 +387,8 @@ def handler(request):
                 tournaments_db[tournament_id]["end_time"] = datetime.now().isoformat()
                 
                 current_tournament = None
+                store.mark("tournaments", tournament_id)
+                _save_counters()
                 
                 response = {
                     "message": f"Турнир #{tournament_id} завершен!",
@@ -317,3 +402,55 @@ def handler(request):
         return {'statusCode': 500, 'headers': headers, 'body': json.dumps({"error": str(e)})}
     
     return {'statusCode': 200, 'headers': headers, 'body': json.dumps(response, ensure_ascii=False)}
+
+
+# Локальный запуск: тот же handler за многопоточным HTTP-сервером.
+# handler() меняет глобальные словари, поэтому вызовы сериализуются блокировкой;
+# чтение тела и отправка ответа идут вне неё.
+_store_lock = threading.RLock()
+
+
+class _LocalRequest:
+    """Запрос в том виде, в котором его передаёт Vercel"""
+    def __init__(self, method, path, body):
+        self.method = method
+        self.path = path
+        self.body = body
+
+
+class LocalHandler(BaseHTTPRequestHandler):
+    # Постоянные соединения: ответ уже буферизован и идёт с Content-Length
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    disable_nagle_algorithm = True
+    
+    def _dispatch(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        request = _LocalRequest(self.command, self.path.split('?')[0], body)
+        with _store_lock:
+            result = handler(request)
+        payload = result['body'].encode('utf-8')
+        self.send_response(result['statusCode'])
+        for key, value in result['headers'].items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_DELETE = do_OPTIONS = _dispatch
+
+
+class ConcurrentHTTPServer(ThreadingHTTPServer):
+    """Поток на соединение: медленный клиент не блокирует остальных"""
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+# Модуль загружен: время импорта вместе со снимком состояния
+COLD_START["import"] = time.perf_counter() - _IMPORT_STARTED
+
+if __name__ == '__main__':
+    server = ConcurrentHTTPServer(('0.0.0.0', 8000), LocalHandler)
+    print('🚀 API сервер запущен на http://0.0.0.0:8000 (многопоточный режим)')
+    server.serve_forever()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк отправки сообщений ботом: новое соединение на каждый запрос
+(requests.post, httpx.AsyncClient в каждом обработчике) против
+долгоживущих клиентов bot_http.py.
+
+Сервер локальный (loopback, без TLS и DNS), поэтому разница здесь —
+только TCP-рукопожатие и создание клиента; до api.telegram.org по TLS
+каждое новое соединение стоит ещё один-два RTT.
+
+Запуск: python bench_http_sessions.py
+"""
+
+import asyncio
+import http.server
+import time
+
+import httpx
+import requests
+
+import bot_http
+from testkit import CountingHandler, serve
+
+MESSAGES = 500
+CONCURRENCY = 20
+
+
+def per_request(url):
+    requests.post(url, json={"chat_id": 1, "text": "🏸"}, timeout=15).json()
+
+
+def pooled(url):
+    bot_http.telegram_session().post(url, json={"chat_id": 1, "text": "🏸"}, timeout=bot_http.TELEGRAM_TIMEOUT).json()
+
+
+async def httpx_per_handler(url):
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        (await client.post(url, json={"chat_id": 1, "text": "🏸"})).json()
+
+
+async def httpx_shared(url):
+    (await bot_http.api_client().post(url, json={"chat_id": 1, "text": "🏸"})).json()
+
+
+def run_sync(send, url):
+    CountingHandler.connections = set()
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        send(url)
+    return MESSAGES / (time.perf_counter() - start), len(CountingHandler.connections)
+
+
+def run_async(send, url):
+    async def scenario():
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def one():
+            async with semaphore:
+                await send(url)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(MESSAGES)))
+        elapsed = time.perf_counter() - start
+        await bot_http.close_api_client()
+        return elapsed
+
+    CountingHandler.connections = set()
+    return MESSAGES / asyncio.run(scenario()), len(CountingHandler.connections)
+
+
+def main():
+    print(f"🏸 {MESSAGES} сообщений; httpx — до {CONCURRENCY} одновременно")
+    print(f"{'клиент':>28} | {'сообщ./с':>8} | {'соединений':>10}")
+    with serve(http.server.ThreadingHTTPServer, CountingHandler) as port:
+        url = f"http://127.0.0.1:{port}/bot123/sendMessage"
+        rows = [
+            ("requests.post", run_sync(per_request, url)),
+            ("telegram_session()", run_sync(pooled, url)),
+            ("httpx.AsyncClient на вызов", run_async(httpx_per_handler, url)),
+            ("api_client()", run_async(httpx_shared, url)),
+        ]
+        bot_http.close_sessions()
+    for label, (rate, connections) in rows:
+        print(f"{label:>28} | {rate:>8.0f} | {connections:>10}")
+
+
+if __name__ == "__main__":
+    main()
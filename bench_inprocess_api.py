@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк запроса бота к API (GET /players/{id}, как в /whoami):
+HTTP через loopback к uvicorn против ASGI-транспорта внутри процесса
+(API_IN_PROCESS=true). API — main.py на SQLite в памяти.
+
+Запуск: python bench_inprocess_api.py
+"""
+
+import asyncio
+import logging
+import socket
+import statistics
+import threading
+import time
+
+import uvicorn
+
+import bot_http
+from testkit import load_main
+
+REQUESTS = 500
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def latency_ms(client):
+    samples = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        resp = await client.get("/players/1")
+        resp.json()
+        samples.append((time.perf_counter() - start) * 1000)
+    await bot_http.close_api_client()
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def main():
+    logging.disable(logging.INFO)
+    api = load_main("sqlite://")
+    with api.SessionLocal() as db:
+        db.add(api.Player(telegram_id=1, first_name="Анна"))
+        db.commit()
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    print(f"🏸 GET /players/1: {REQUESTS} запросов подряд")
+    print(f"{'транспорт':>16} | {'медиана, мс':>11} | {'p99, мс':>8}")
+    rows = [
+        ("HTTP (loopback)", asyncio.run(latency_ms(bot_http.api_client(f"http://127.0.0.1:{port}")))),
+        ("ASGI в процессе", asyncio.run(latency_ms(bot_http.api_client(app=api.app)))),
+    ]
+    server.should_exit = True
+    thread.join()
+    for label, (median, p99) in rows:
+        print(f"{label:>16} | {median:>11.2f} | {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
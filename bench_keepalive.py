@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк опроса списка комнат (api/index.py): новое TCP-соединение
+на каждый запрос против постоянного соединения HTTP/1.1.
+
+Запуск: python bench_keepalive.py
+"""
+
+import contextlib
+import http.client
+import io
+import statistics
+import time
+
+from testkit import load_api, serve
+
+POLLS = 2000
+ROOMS = 20
+
+
+def poll_latency_ms(port, keep_alive):
+    """Медиана и p99 задержки одного опроса GET /rooms/"""
+    samples = []
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    for _ in range(POLLS):
+        if not keep_alive:
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+        start = time.perf_counter()
+        conn.request("GET", "/rooms/", headers={} if keep_alive else {"Connection": "close"})
+        conn.getresponse().read()
+        samples.append((time.perf_counter() - start) * 1000)
+        if not keep_alive:
+            conn.close()
+    conn.close()
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def main():
+    api = load_api()
+
+    class QuietHandler(api.handler):
+        def log_message(self, format, *args):
+            pass
+
+    print(f"🏸 Опрос GET /rooms/: {POLLS} запросов, {ROOMS} комнат")
+    with serve(api.ConcurrentHTTPServer, QuietHandler) as port:
+        with contextlib.redirect_stdout(io.StringIO()):
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            for i in range(ROOMS):
+                conn.request("POST", "/rooms/", body=f'{{"name": "Корт {i}", "creator_telegram_id": {i}}}'.encode("utf-8"))
+                conn.getresponse().read()
+            conn.close()
+        print(f"{'соединение':>14} | {'медиана, мс':>11} | {'p99, мс':>8}")
+        for label, keep_alive in (("новое", False), ("keep-alive", True)):
+            median, p99 = poll_latency_ms(port, keep_alive)
+            print(f"{label:>14} | {median:>11.3f} | {p99:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
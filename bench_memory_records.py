@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк памяти in-memory хранилища (api/index.py): записи со __slots__
+(memory_records.py) против прежних вложенных словарей.
+
+Считает байты на игрока и на комнату при 100k игроков и 25k комнатах
+по 4 участника, а также время поиска игрока и чтения рейтинга.
+
+Запуск: python bench_memory_records.py
+"""
+
+import gc
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from memory_records import Member, Player, Room
+
+PLAYERS = 100_000
+ROOMS = 25_000
+MEMBERS = 4
+
+
+def build_dicts():
+    """Прежняя схема: словари игроков, комнаты со словарями участников"""
+    now = datetime.now().isoformat()
+    players = {}
+    for i in range(PLAYERS):
+        players[i] = {
+            "id": i, "telegram_id": i, "first_name": "Игрок", "last_name": str(i),
+            "username": None, "rating": 1500,
+        }
+    yield "players", players
+    rooms = {}
+    for r in range(ROOMS):
+        members = [
+            {"id": m + 1, "player": players[r * MEMBERS + m], "is_leader": m == 0, "joined_at": now}
+            for m in range(MEMBERS)
+        ]
+        rooms[r] = {
+            "id": r, "name": f"Комната {r}", "creator_id": r * MEMBERS,
+            "creator_full_name": "Игрок", "max_players": MEMBERS, "member_count": MEMBERS,
+            "is_active": True, "created_at": now, "members": members,
+        }
+    yield "rooms", rooms
+
+
+def build_records():
+    """Новая схема: Player/Room/Member со __slots__, участники ссылаются на id игрока"""
+    now = datetime.now().isoformat()
+    players = {}
+    for i in range(PLAYERS):
+        players[i] = Player(i, "Игрок", str(i))
+    yield "players", players
+    rooms = {}
+    for r in range(ROOMS):
+        members = [Member(m + 1, r * MEMBERS + m, m == 0, now) for m in range(MEMBERS)]
+        rooms[r] = Room(r, f"Комната {r}", r * MEMBERS, "Игрок", MEMBERS, now, members)
+    yield "rooms", rooms
+
+
+def measure(build):
+    """Байты на игрока и на комнату (по приросту памяти tracemalloc)"""
+    gc.collect()
+    tracemalloc.start()
+    sizes = {}
+    keep = []
+    previous = tracemalloc.get_traced_memory()[0]
+    for name, table in build():
+        keep.append(table)
+        current = tracemalloc.get_traced_memory()[0]
+        sizes[name] = current - previous
+        previous = current
+    tracemalloc.stop()
+    return sizes["players"] / PLAYERS, sizes["rooms"] / ROOMS, keep
+
+
+def lookup_ns(players, read):
+    """Среднее время (нс) на поиск игрока и чтение рейтинга"""
+    keys = list(range(0, PLAYERS, 7))
+    total = min(timeit.repeat(lambda: [read(players[k]) for k in keys], number=20, repeat=5))
+    return total / (20 * len(keys)) * 1e9
+
+
+def main():
+    print(f"🏸 Память in-memory хранилища: {PLAYERS} игроков, {ROOMS} комнат по {MEMBERS} участника")
+    dict_player, dict_room, dict_tables = measure(build_dicts)
+    record_player, record_room, record_tables = measure(build_records)
+
+    dict_lookup = lookup_ns(dict_tables[0], lambda p: p["rating"])
+    record_lookup = lookup_ns(record_tables[0], lambda p: p.rating)
+
+    print(f"{'схема':>10} | {'байт/игрок':>10} | {'байт/комната':>12} | {'нс на поиск':>11}")
+    print(f"{'словари':>10} | {dict_player:>10.0f} | {dict_room:>12.0f} | {dict_lookup:>11.1f}")
+    print(f"{'__slots__':>10} | {record_player:>10.0f} | {record_room:>12.0f} | {record_lookup:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
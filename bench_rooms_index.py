@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк операций с комнатами in-memory API (api/index.py) при росте числа комнат.
+
+Создание, вход, выход и удаление идут через вторичные индексы,
+поэтому время операции не должно расти с количеством комнат.
+Список комнат собирается из закэшированных JSON-фрагментов.
+
+Запуск: python bench_rooms_index.py
+"""
+
+import contextlib
+import io
+import time
+
+from testkit import call, load_api
+
+
+def fill(api, rooms):
+    """Заполняет хранилище комнатами по 3 участника"""
+    for i in range(rooms):
+        creator = 1_000_000 + i
+        call(api, "POST", "/rooms/", {"name": f"Комната {i}", "creator_telegram_id": creator})
+        for j in (1, 2):
+            call(api, "POST", f"/rooms/{i + 1}/join", {"telegram_id": creator * 10 + j, "first_name": "Игрок"})
+
+
+def measure(api, ops=500):
+    """Среднее время (мкс) на цикл создать → войти → выйти → удалить"""
+    base = 5_000_000
+    started = time.perf_counter()
+    for k in range(ops):
+        creator = base + k
+        _, room = call(api, "POST", "/rooms/", {"name": "bench", "creator_telegram_id": creator})
+        room_id = room["id"]
+        call(api, "POST", f"/rooms/{room_id}/join", {"telegram_id": creator + 1, "first_name": "Гость"})
+        call(api, "POST", f"/rooms/{room_id}/leave", {"telegram_id": creator + 1})
+        call(api, "DELETE", f"/rooms/{room_id}")
+    return (time.perf_counter() - started) / ops * 1e6
+
+
+def measure_list(api, polls=50):
+    """Среднее время (мкс) на GET /rooms/ без изменений между опросами"""
+    call(api, "GET", "/rooms/", decode=False)
+    started = time.perf_counter()
+    for _ in range(polls):
+        call(api, "GET", "/rooms/", decode=False)
+    return (time.perf_counter() - started) / polls * 1e6
+
+
+def main():
+    print("🏸 Бенчмарк индексов комнат (api/index.py)")
+    print(f"{'комнат':>8} | {'мкс на цикл':>12} | {'мкс на список':>14}")
+    for rooms in (100, 1_000, 10_000):
+        api = load_api()
+        # Обработчик печатает каждый POST — глушим вывод на время замера
+        with contextlib.redirect_stdout(io.StringIO()):
+            fill(api, rooms)
+            per_cycle = measure(api)
+            per_list = measure_list(api)
+        print(f"{rooms:>8} | {per_cycle:>12.1f} | {per_list:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
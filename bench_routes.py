@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Бенчмарк разбора пути в обработчиках на BaseHTTPRequestHandler:
+прежняя цепочка if/elif со startswith/split/in против таблицы ROUTES (routes.py)
+с кэшем разобранных путей и без него (RouteTable.resolve).
+
+Смесь запросов похожа на трафик бота: в основном список комнат,
+комната, игрок и вход/выход из комнаты.
+
+Запуск: python bench_routes.py
+"""
+
+import timeit
+
+from routes import RouteTable
+
+REQUESTS = [
+    ("GET", "/rooms/"),
+    ("GET", "/rooms/"),
+    ("GET", "/rooms/"),
+    ("GET", "/rooms/17"),
+    ("GET", "/players/123456789"),
+    ("GET", "/tournament/3"),
+    ("GET", "/"),
+    ("POST", "/rooms/17/join"),
+    ("POST", "/rooms/17/leave"),
+    ("POST", "/rooms/17/finish-game"),
+    ("POST", "/players/"),
+    ("POST", "/rooms/"),
+    ("POST", "/tournament/start"),
+    ("GET", "/unknown"),
+]
+
+
+def old_dispatch(method, path):
+    """Прежний разбор из api_simple.py: проверки по порядку, id через split"""
+    if method == "GET":
+        if path == "/":
+            return "get_root", {}
+        elif path == "/rooms/":
+            return "get_rooms", {}
+        elif path.startswith("/rooms/") and path != "/rooms/":
+            return "get_room", {"room_id": int(path.split("/")[-1])}
+        elif path.startswith("/players/"):
+            return "get_player", {"telegram_id": int(path.split("/")[-1])}
+        elif path.startswith("/tournament/"):
+            return "get_tournament", {"tournament_id": int(path.split("/")[-1])}
+        return None
+    if path == "/players/":
+        return "create_player", {}
+    elif path == "/rooms/":
+        return "create_room", {}
+    elif path == "/tournament/start":
+        return "start_tournament", {}
+    elif path == "/tournament/end":
+        return "end_tournament", {}
+    elif "/join" in path:
+        return "join_room", {"room_id": int(path.split("/")[2])}
+    elif "/leave" in path:
+        return "leave_room", {"room_id": int(path.split("/")[2])}
+    elif "/finish-game" in path:
+        return "finish_game", {"room_id": int(path.split("/")[2])}
+    elif path.startswith("/tournament/"):
+        return "get_tournament", {"tournament_id": int(path.split("/")[-1])}
+    return None
+
+
+def build_table():
+    table = RouteTable()
+    for method, template, name in [
+        ("GET", "/", "get_root"),
+        ("GET", "/rooms/", "get_rooms"),
+        ("GET", "/rooms/{room_id:int}", "get_room"),
+        ("GET", "/players/{telegram_id:int}", "get_player"),
+        ("GET", "/tournament/{tournament_id:int}", "get_tournament"),
+        ("POST", "/players/", "create_player"),
+        ("POST", "/rooms/", "create_room"),
+        ("POST", "/tournament/start", "start_tournament"),
+        ("POST", "/tournament/end", "end_tournament"),
+        ("POST", "/rooms/{room_id:int}/join", "join_room"),
+        ("POST", "/rooms/{room_id:int}/leave", "leave_room"),
+        ("POST", "/rooms/{room_id:int}/finish-game", "finish_game"),
+        ("POST", "/tournament/{tournament_id:int}", "get_tournament"),
+    ]:
+        table.add(method, template, name)
+    return table
+
+
+def per_request_us(dispatch):
+    """Среднее время (мкс) на разбор одного пути"""
+    loops = 2000
+    total = min(timeit.repeat(lambda: [dispatch(m, p) for m, p in REQUESTS], number=loops, repeat=5))
+    return total / (loops * len(REQUESTS)) * 1e6
+
+
+def main():
+    table = build_table()
+    # Обе схемы должны разбирать пути одинаково
+    for method, path in REQUESTS:
+        assert old_dispatch(method, path) == table.match(method, path) == table.resolve(method, path), (method, path)
+
+    print(f"🏸 Разбор пути: {len(REQUESTS)} запросов в смеси")
+    print(f"{'схема':>14} | {'мкс на запрос':>13}")
+    print(f"{'if/elif':>14} | {per_request_us(old_dispatch):>13.3f}")
+    print(f"{'RouteTable':>14} | {per_request_us(table.match):>13.3f}")
+    print(f"{'без кэша':>14} | {per_request_us(table.resolve):>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
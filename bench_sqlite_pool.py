@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Нагрузочный тест SQLite для main_simple.py: опрос списка комнат
+несколькими потоками, пока отдельный поток записывает игры.
+
+Сравнивает прежнюю схему (sqlite3.connect на каждый запрос, журнал
+отката) с SQLitePool (соединение на поток, WAL, mmap, кэш выражений).
+
+Запуск: python bench_sqlite_pool.py
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlite_pool import SQLitePool
+
+ROOMS = 200
+SECONDS = 1.5
+READERS = (1, 2, 4, 8)
+
+SCHEMA = """
+    CREATE TABLE rooms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, creator_id INTEGER NOT NULL,
+        max_players INTEGER DEFAULT 4, is_active BOOLEAN DEFAULT 1, is_game_started BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE room_members (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, room_id INTEGER NOT NULL, player_id INTEGER NOT NULL,
+        joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, is_leader BOOLEAN DEFAULT 0
+    );
+    CREATE TABLE games (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, room_id INTEGER NOT NULL, score_team1 INTEGER NOT NULL,
+        score_team2 INTEGER NOT NULL, winner_team INTEGER NOT NULL,
+        played_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+# Запросы из main_simple.py: список комнат и запись игры
+ROOMS_QUERY = """
+    SELECT r.*, COUNT(rm.id) as member_count
+    FROM rooms r
+    LEFT JOIN room_members rm ON r.id = rm.room_id
+    WHERE r.is_active = 1
+    GROUP BY r.id
+"""
+
+
+def create_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    for room_id in range(1, ROOMS + 1):
+        conn.execute("INSERT INTO rooms (name, creator_id) VALUES (?, ?)", (f"Корт {room_id}", room_id))
+        for player in range(3):
+            conn.execute("INSERT INTO room_members (room_id, player_id) VALUES (?, ?)", (room_id, room_id * 10 + player))
+    conn.commit()
+    conn.close()
+
+
+class PerRequest:
+    """Прежняя схема: новое соединение на каждый запрос"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def acquire(self):
+        return sqlite3.connect(self.path)
+
+    def release(self, conn):
+        conn.close()
+
+
+def poll(db):
+    conn = db.acquire()
+    try:
+        conn.execute(ROOMS_QUERY).fetchall()
+    finally:
+        db.release(conn)
+
+
+def write_game(db, game):
+    conn = db.acquire()
+    try:
+        room_id = game % ROOMS + 1
+        conn.execute(
+            "INSERT INTO games (room_id, score_team1, score_team2, winner_team) VALUES (?, ?, ?, ?)",
+            (room_id, 21, game % 21, 1),
+        )
+        conn.execute("UPDATE rooms SET is_game_started = 0 WHERE id = ?", (room_id,))
+        conn.commit()
+    finally:
+        db.release(conn)
+
+
+def run(db, readers):
+    """Опросов и игр в секунду за SECONDS, плюс число ошибок блокировки"""
+    stop = threading.Event()
+    counts = {"polls": 0, "games": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def reader():
+        done = errors = 0
+        while not stop.is_set():
+            try:
+                poll(db)
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        with lock:
+            counts["polls"] += done
+            counts["errors"] += errors
+
+    def writer():
+        game = 0
+        while not stop.is_set():
+            try:
+                write_game(db, game)
+                game += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts["errors"] += 1
+        counts["games"] = game
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return counts["polls"] / SECONDS, counts["games"] / SECONDS, counts["errors"]
+
+
+def main():
+    print(f"🏸 Опрос {ROOMS} комнат во время записи игр, {SECONDS} с на замер")
+    print(f"{'схема':>12} | {'читателей':>9} | {'опросов/с':>9} | {'игр/с':>7} | {'ошибок':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, make in (("connect", PerRequest), ("SQLitePool", SQLitePool)):
+            path = os.path.join(directory, f"{label}.db")
+            create_db(path)
+            db = make(path)
+            for readers in READERS:
+                polls, games, errors = run(db, readers)
+                print(f"{label:>12} | {readers:>9} | {polls:>9.0f} | {games:>7.0f} | {errors:>6}")
+            if isinstance(db, SQLitePool):
+                db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,11 @@
 import asyncio
 import logging
 from telegram import Update, BotCommand, WebAppInfo, BotCommandScopeChat
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
+from telegram.ext import AIORateLimiter, Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton
 from config import settings
 import httpx
+from bot_http import HTTP2_ENABLED, HTTP_POOL_SIZE, api_client, close_api_client
 from datetime import datetime
 
 # Настройка логирования
@@ -163,13 +164,13 @@ async def whoami(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     ln = update.effective_user.last_name or ""
     api_line = ""
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            r = await client.get(f"{settings.API_BASE_URL}/players/{tid}")
-            if r.status_code == 200:
-                pj = r.json()
-                api_line = f"\nAPI: rating={pj.get('rating')} rank={pj.get('initial_rank')} games={pj.get('games_count')}"
-            else:
-                api_line = f"\nAPI: not found ({r.status_code})"
+        client = api_client()
+        r = await client.get(f"/players/{tid}", timeout=8.0)
+        if r.status_code == 200:
+            pj = r.json()
+            api_line = f"\nAPI: rating={pj.get('rating')} rank={pj.get('initial_rank')} games={pj.get('games_count')}"
+        else:
+            api_line = f"\nAPI: not found ({r.status_code})"
     except Exception as e:
         api_line = f"\nAPI error: {e}"
     await update.message.reply_text(
@@ -186,20 +187,20 @@ async def tstart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         return
     name = " ".join(context.args) if context.args else datetime.now().strftime("%Y-%m-%d")
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.post(f"{settings.API_BASE_URL}/tournaments/start", json={"name": name})
-            if resp.status_code != 200:
-                text = resp.text
-                try:
-                    j = resp.json()
-                    text = j.get("detail") or j
-                except Exception:
-                    pass
-                await update.message.reply_text(f"Ошибка запуска турнира: {resp.status_code} {text}")
-                return
-            data = resp.json()
-            tid = data.get("id") or data.get("tournament_id")
-            await update.message.reply_text(f"🏁 Турнир #{tid} начат — {name}")
+        client = api_client()
+        resp = await client.post("/tournaments/start", json={"name": name}, timeout=10.0)
+        if resp.status_code != 200:
+            text = resp.text
+            try:
+                j = resp.json()
+                text = j.get("detail") or j
+            except Exception:
+                pass
+            await update.message.reply_text(f"Ошибка запуска турнира: {resp.status_code} {text}")
+            return
+        data = resp.json()
+        tid = data.get("id") or data.get("tournament_id")
+        await update.message.reply_text(f"🏁 Турнир #{tid} начат — {name}")
     except httpx.RequestError as e:
         await update.message.reply_text(f"Ошибка сети: {e.__class__.__name__}: {e}")
     except Exception as e:
@@ -211,30 +212,30 @@ async def tend(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not _is_admin(user_id) or chat.type != "private":
         return
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            if context.args:
-                tid = int(context.args[0])
-                resp = await client.post(f"{settings.API_BASE_URL}/tournaments/{tid}/end")
-                if resp.status_code != 200:
-                    await update.message.reply_text(f"Ошибка завершения турнира: {resp.status_code} {resp.text}")
-                    return
-                ended = resp.json()
-                tid = ended.get("tournament_id") or tid
-            else:
-                resp = await client.post(f"{settings.API_BASE_URL}/tournaments/end_latest")
-                if resp.status_code != 200:
-                    await update.message.reply_text(f"Ошибка завершения турнира: {resp.status_code} {resp.text}")
-                    return
-                ended = resp.json()
-                tid = ended.get("tournament_id")
-
-            # Получить отчёт
-            report_resp = await client.get(f"{settings.API_BASE_URL}/tournaments/{tid}/report")
-            if report_resp.status_code == 200:
-                report = report_resp.json().get("report", "")
-                await update.message.reply_text(report[:4000])
-            else:
-                await update.message.reply_text(f"Турнир #{tid} завершён. Отчёт недоступен.")
+        client = api_client()
+        if context.args:
+            tid = int(context.args[0])
+            resp = await client.post(f"/tournaments/{tid}/end", timeout=15.0)
+            if resp.status_code != 200:
+                await update.message.reply_text(f"Ошибка завершения турнира: {resp.status_code} {resp.text}")
+                return
+            ended = resp.json()
+            tid = ended.get("tournament_id") or tid
+        else:
+            resp = await client.post("/tournaments/end_latest", timeout=15.0)
+            if resp.status_code != 200:
+                await update.message.reply_text(f"Ошибка завершения турнира: {resp.status_code} {resp.text}")
+                return
+            ended = resp.json()
+            tid = ended.get("tournament_id")
+
+        # Получить отчёт
+        report_resp = await client.get(f"/tournaments/{tid}/report", timeout=15.0)
+        if report_resp.status_code == 200:
+            report = report_resp.json().get("report", "")
+            await update.message.reply_text(report[:4000])
+        else:
+            await update.message.reply_text(f"Турнир #{tid} завершён. Отчёт недоступен.")
     except httpx.RequestError as e:
         await update.message.reply_text(f"Ошибка сети: {e.__class__.__name__}: {e}")
     except Exception as e:
@@ -250,13 +251,13 @@ async def treport(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         return
     try:
         tid = int(context.args[0])
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            report_resp = await client.get(f"{settings.API_BASE_URL}/tournaments/{tid}/report")
-            if report_resp.status_code == 200:
-                report = report_resp.json().get("report", "")
-                await update.message.reply_text(report[:4000])
-            else:
-                await update.message.reply_text(f"Отчёт недоступен: {report_resp.text}")
+        client = api_client()
+        report_resp = await client.get(f"/tournaments/{tid}/report", timeout=10.0)
+        if report_resp.status_code == 200:
+            report = report_resp.json().get("report", "")
+            await update.message.reply_text(report[:4000])
+        else:
+            await update.message.reply_text(f"Отчёт недоступен: {report_resp.text}")
     except httpx.RequestError as e:
         await update.message.reply_text(f"Ошибка сети: {e.__class__.__name__}: {e}")
     except Exception as e:
@@ -314,17 +315,35 @@ def main() -> None:
     if not settings.TELEGRAM_BOT_TOKEN:
         logger.error("TELEGRAM_BOT_TOKEN не установлен!")
         return
+    if settings.BOT_MODE == "webhook" and not settings.WEBHOOK_URL:
+        logger.error("WEBHOOK_URL не задан для режима webhook!")
+        return
     
     print("🤖 Запуск Telegram бота...")
     print(f"📱 Токен: {settings.TELEGRAM_BOT_TOKEN[:20]}...")
     print("🌐 Mini App URL: http://localhost:8000/app")
+    if settings.API_IN_PROCESS:
+        # API в том же процессе: поднимаем main.app (БД, таблицы) до первой команды
+        api_client()
+        print("🔗 API: внутри процесса (main.app), без HTTP")
     print("=" * 50)
     
     # Создаем приложение
-    application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+    # Запросы к Telegram идут через постоянный пул соединений; HTTP/2 — если установлен h2
+    builder = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).connection_pool_size(HTTP_POOL_SIZE)
+    if HTTP2_ENABLED:
+        builder = builder.http_version("2")
+    # Лимиты Telegram и повтор 429 по retry_after (нужен python-telegram-bot[rate-limiter])
+    try:
+        builder = builder.rate_limiter(AIORateLimiter(max_retries=3))
+    except RuntimeError as e:
+        logger.warning(f"Ограничитель частоты отправки недоступен: {e}")
+    application = builder.build()
     
     # Настраиваем команды после инициализации приложения
     application.post_init = setup_commands
+    # Общий клиент API закрываем вместе с приложением
+    application.post_shutdown = close_api_client
     
     # Добавляем обработчики
     application.add_handler(CommandHandler("start", start))
@@ -352,10 +371,22 @@ def main() -> None:
     print("=" * 50)
     
     # Запускаем бота (блокирующий вызов)
-    application.run_polling(
-        allowed_updates=Update.ALL_TYPES,
-        drop_pending_updates=True
-    )
+    if settings.BOT_MODE == "webhook":
+        # Вебхук: обновления приходят сразу, без цикла опроса (нужен python-telegram-bot[webhooks])
+        application.run_webhook(
+            listen=settings.WEBHOOK_HOST,
+            port=settings.WEBHOOK_PORT,
+            url_path=settings.WEBHOOK_URL.split("://", 1)[-1].partition("/")[2],
+            webhook_url=settings.WEBHOOK_URL,
+            secret_token=settings.WEBHOOK_SECRET or None,
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=True
+        )
+    else:
+        application.run_polling(
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=True
+        )
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,175 @@
+"""
+Долгоживущие HTTP-клиенты ботов: один пул соединений на каждый адрес.
+
+Раньше каждое сообщение открывало новое соединение (requests.post,
+httpx.AsyncClient в каждом обработчике) и платило DNS + TCP + TLS до
+Telegram и до нашего API. Теперь соединения переиспользуются (keep-alive).
+
+bot_simple_api.py (потоки, requests):
+
+    telegram_session().post(url, json=data, timeout=TELEGRAM_TIMEOUT)
+    api_session().get(f"{API_BASE_URL}/tournaments/active", timeout=API_TIMEOUT)
+
+bot.py (asyncio, httpx; HTTP/2, если установлен пакет h2; при API_IN_PROCESS=true —
+прямо в main.app через ASGI, когда бот и API запущены вместе; приложение
+крутится на своём цикле событий в отдельном потоке, см. AppThreadTransport):
+
+    resp = await api_client().get("/players/42")
+    ...
+    await close_api_client()    # при остановке приложения
+"""
+
+import asyncio
+import os
+import threading
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from telegram_auth import BOT_KEY_HEADER, bot_api_key
+
+try:
+    import h2  # noqa: F401 — нужен httpx для HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Соединений в пуле на один адрес — с запасом на все потоки-обработчики бота
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", os.getenv("BOT_WORKERS", "8")))
+# Сколько держать простаивающее соединение httpx открытым (с)
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+# HTTP/2 к API: по умолчанию включён, если доступен пакет h2
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true" and HTTP2_AVAILABLE
+
+# Таймауты (подключение, чтение): подключение к живому серверу быстрое,
+# а долгое чтение — нормально для тяжёлых запросов вроде завершения турнира
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+TELEGRAM_TIMEOUT = (CONNECT_TIMEOUT, 15)
+API_TIMEOUT = (CONNECT_TIMEOUT, 15)
+# Долгий опрос getUpdates: чтение дольше, чем timeout самого getUpdates
+LONG_POLL_TIMEOUT = (CONNECT_TIMEOUT, 35)
+
+_lock = threading.Lock()
+_sessions = {}
+_api_client: Optional[httpx.AsyncClient] = None
+
+
+def _api_headers() -> dict:
+    """Запросы бота к API подписаны ключом X-Bot-Key: лимит частоты их не трогает"""
+    key = bot_api_key()
+    return {BOT_KEY_HEADER: key} if key else {}
+
+
+def _session(name: str, headers: Optional[dict] = None) -> requests.Session:
+    with _lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(headers or {})
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[name] = session
+        return session
+
+
+def telegram_session() -> requests.Session:
+    """Общая сессия requests для Bot API Telegram"""
+    return _session("telegram")
+
+
+def api_session() -> requests.Session:
+    """Общая сессия requests для нашего API"""
+    return _session("api", _api_headers())
+
+
+def close_sessions() -> None:
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+class AppThreadTransport(httpx.AsyncBaseTransport):
+    """ASGI-приложение на собственном цикле событий в отдельном потоке.
+
+    Обработчики main.py объявлены async, но ходят в базу синхронно через
+    SQLAlchemy: на цикле бота каждый запрос к базе останавливал бы все
+    обработчики. Здесь они ждут только свой ответ, а таймаут чтения
+    httpx работает (httpx.ASGITransport его не соблюдает)."""
+
+    def __init__(self, app):
+        self._inner = httpx.ASGITransport(app=app)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="api-in-process", daemon=True)
+        self._thread.start()
+
+    async def _call(self, request):
+        response = await self._inner.handle_async_request(request)
+        content = await response.aread()
+        return response.status_code, response.headers.multi_items(), content
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        future = asyncio.run_coroutine_threadsafe(self._call(request), self._loop)
+        timeout = request.extensions.get("timeout", {}).get("read")
+        try:
+            status_code, headers, content = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout(f"API внутри процесса не ответил за {timeout} с", request=request)
+        return httpx.Response(status_code, headers=headers, content=content)
+
+    async def aclose(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        await asyncio.to_thread(self._thread.join)
+        self._loop.close()
+
+
+def api_client(base_url: Optional[str] = None, app=None) -> httpx.AsyncClient:
+    """Общий httpx.AsyncClient к API (создаётся при первом вызове).
+
+    С app (или API_IN_PROCESS=true в настройках — тогда берётся main.app)
+    запросы уходят в ASGI-приложение внутри процесса: ни сокета, ни
+    соединений, остаются только маршрутизация и JSON. Приложение работает
+    в своём потоке (AppThreadTransport) и не блокирует цикл бота."""
+    global _api_client
+    if _api_client is None or _api_client.is_closed:
+        if base_url is None and app is None:
+            from config import settings
+            if settings.API_IN_PROCESS:
+                from main import app
+            else:
+                base_url = settings.API_BASE_URL
+        if app is not None:
+            _api_client = httpx.AsyncClient(
+                transport=AppThreadTransport(app),
+                base_url="http://api.local",
+                headers=_api_headers(),
+                timeout=httpx.Timeout(10.0, connect=CONNECT_TIMEOUT),
+            )
+            return _api_client
+        _api_client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=_api_headers(),
+            http2=HTTP2_ENABLED,
+            timeout=httpx.Timeout(10.0, connect=CONNECT_TIMEOUT),
+            # Все соединения пула остаются открытыми: лишние запросы ждут
+            # свободное соединение, а не открывают и закрывают новые
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_SIZE,
+                max_keepalive_connections=HTTP_POOL_SIZE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _api_client
+
+
+async def close_api_client(*_) -> None:
+    """Закрывает общий клиент API; подходит как post_shutdown приложения бота"""
+    global _api_client
+    client, _api_client = _api_client, None
+    if client is not None:
+        await client.aclose()
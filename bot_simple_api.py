@@ -6,6 +6,11 @@ import json
 import time
 import os
 from dotenv import load_dotenv
+from prometheus_client import start_http_server
+from update_workers import UpdateDispatcher
+from outbound_queue import OutboundQueue
+from bot_webhook import create_webhook_app
+from bot_http import API_TIMEOUT, CONNECT_TIMEOUT, LONG_POLL_TIMEOUT, TELEGRAM_TIMEOUT, api_session, telegram_session
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -26,14 +31,49 @@ def _load_admin_ids():
 
 ADMIN_IDS = _load_admin_ids()
 
+# Порт для метрик Prometheus (очередь обновлений, время обработчиков); пусто — не поднимать
+BOT_METRICS_PORT = os.getenv('BOT_METRICS_PORT', '')
+
+# Режим получения обновлений: polling (getUpdates) или webhook (Telegram сам присылает POST)
+BOT_MODE = os.getenv('BOT_MODE', 'polling').strip().lower()
+# Публичный адрес вебхука, например https://bot.example.com/webhook
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+# Секрет, который Telegram присылает в X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', os.getenv('PORT', '8443')))
+
 
 
 # Функции для работы с игроками удалены - по ТЗ данные хранятся в localStorage фронтенда
 
-def send_message(chat_id, text, reply_markup=None):
-    """Отправка сообщения в чат"""
+def deliver_message(data):
+    """Отправка одного сообщения в Telegram; возвращает (статус, json ответа)"""
     url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    
+    response = telegram_session().post(url, json=data, timeout=TELEGRAM_TIMEOUT)
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if response.status_code == 200:
+        print(f"✅ Сообщение отправлено успешно")
+    else:
+        print(f"❌ Ошибка отправки: {response.status_code}")
+    return response.status_code, body
+
+def report_undelivered(chat_id, payload, status, body):
+    """Сообщение отброшено очередью: Telegram отказал или исчерпаны повторы"""
+    description = (body or {}).get("description", "")
+    print(f"❌ Сообщение в чат {chat_id} не доставлено ({status}) {description}".rstrip())
+
+# Исходящие сообщения: лимиты Telegram, повтор 429, разные чаты — параллельно
+outbound = OutboundQueue(deliver_message, on_failure=report_undelivered)
+
+def send_message(chat_id, text, reply_markup=None):
+    """Отправка сообщения в чат (в очередь; обработчик не ждёт Telegram).
+
+    True — сообщение принято в очередь, а не доставлено: об ошибке
+    доставки позже сообщает report_undelivered."""
     data = {
         "chat_id": chat_id,
         "text": text,
@@ -44,13 +84,8 @@ def send_message(chat_id, text, reply_markup=None):
         data["reply_markup"] = reply_markup
     
     try:
-        response = requests.post(url, json=data, timeout=15)
-        if response.status_code == 200:
-            print(f"✅ Сообщение отправлено успешно")
-            return True
-        else:
-            print(f"❌ Ошибка отправки: {response.status_code}")
-            return False
+        outbound.enqueue(chat_id, data)
+        return True
     except Exception as e:
         print(f"❌ Ошибка отправки: {str(e)}")
         return False
@@ -98,7 +133,7 @@ def setup_bot_commands():
     }
     
     try:
-        response = requests.post(url, json=data, timeout=15)
+        response = telegram_session().post(url, json=data, timeout=TELEGRAM_TIMEOUT)
         if response.status_code == 200:
             print("✅ Команды бота настроены")
             print("📋 Доступные команды:")
@@ -126,7 +161,7 @@ def handle_start_command(chat_id, first_name, last_name="", username=""):
             "last_name": last_name or "",
             "username": username or ""
         }
-        resp = requests.post(f"{API_BASE_URL}/players/", json=payload, timeout=15)
+        resp = api_session().post(f"{API_BASE_URL}/players/", json=payload, timeout=API_TIMEOUT)
         if resp.status_code == 200:
             p = resp.json()
             fn = p.get("first_name") or first_name
@@ -202,7 +237,7 @@ def disable_webhook():
         url = f"https://api.telegram.org/bot{BOT_TOKEN}/deleteWebhook"
         # Сбрасываем непрочитанные апдейты и гарантированно отключаем вебхук,
         # чтобы избежать 409 Conflict при getUpdates
-        resp = requests.post(url, json={"drop_pending_updates": True}, timeout=10)
+        resp = telegram_session().post(url, json={"drop_pending_updates": True}, timeout=TELEGRAM_TIMEOUT)
         if resp.status_code == 200 and resp.json().get("ok"):
             print("✅ Вебхук отключён (polling активен)")
             return True
@@ -213,6 +248,24 @@ def disable_webhook():
         print(f"⚠️ Ошибка при отключении вебхука: {e}")
         return False
 
+def set_webhook():
+    """Включить вебхук: Telegram будет присылать обновления на WEBHOOK_URL"""
+    try:
+        url = f"https://api.telegram.org/bot{BOT_TOKEN}/setWebhook"
+        data = {"url": WEBHOOK_URL, "allowed_updates": ["message", "callback_query"]}
+        if WEBHOOK_SECRET:
+            data["secret_token"] = WEBHOOK_SECRET
+        resp = telegram_session().post(url, json=data, timeout=TELEGRAM_TIMEOUT)
+        if resp.status_code == 200 and resp.json().get("ok"):
+            print(f"✅ Вебхук включён: {WEBHOOK_URL}")
+            return True
+        else:
+            print(f"❌ Не удалось включить вебхук: {resp.status_code} {resp.text}")
+            return False
+    except Exception as e:
+        print(f"❌ Ошибка при включении вебхука: {e}")
+        return False
+
 def set_rank(chat_id, rank, first_name, last_name, username, force=False):
     """Установить ранг игрока через API и принудительно выставить соответствующий рейтинг"""
     print(f"[DEBUG] set_rank: chat_id={chat_id}, rank={rank}, user={username}, force={force}")
@@ -227,16 +280,16 @@ def set_rank(chat_id, rank, first_name, last_name, username, force=False):
             "force": force
         }
         print(f"[DEBUG] set_rank payload: {payload}")
-        resp = requests.post(f"{API_BASE_URL}/players/set_rank", json=payload, timeout=10)
+        resp = api_session().post(f"{API_BASE_URL}/players/set_rank", json=payload, timeout=API_TIMEOUT)
         print(f"[DEBUG] set_rank API response: {resp.status_code} {resp.text}")
         # Дополнительно принудительно выставим рейтинг по рангу
         target_rating = RANK_TO_RATING.get(rank)
         if target_rating is not None:
             try:
-                sr = requests.post(
+                sr = api_session().post(
                     f"{API_BASE_URL}/players/set_rating",
                     params={"telegram_id": chat_id, "rating": target_rating},
-                    timeout=10,
+                    timeout=API_TIMEOUT,
                 )
                 print(f"[DEBUG] set_rating API response: {sr.status_code} {sr.text}")
             except Exception as e:
@@ -280,7 +333,7 @@ def handle_admin_clear_rooms(chat_id, user_id):
         for attempt in range(attempts):
             try:
                 connect_timeout, read_timeout = timeouts[min(attempt, len(timeouts) - 1)]
-                dr = requests.delete(f"{API_BASE_URL}/rooms/clear_all", timeout=(connect_timeout, read_timeout))
+                dr = api_session().delete(f"{API_BASE_URL}/rooms/clear_all", timeout=(connect_timeout, read_timeout))
                 print(f"🔧 Результат очистки (попытка {attempt+1}/{attempts}): status={dr.status_code} body={dr.text[:200]}")
                 if dr.status_code == 200:
                     try:
@@ -317,12 +370,12 @@ def handle_start_tournament(chat_id, user_id):
     
     try:
         # Проверяем нет ли активного турнира
-        check = requests.get(f"{API_BASE_URL}/tournaments/active", timeout=15)
+        check = api_session().get(f"{API_BASE_URL}/tournaments/active", timeout=API_TIMEOUT)
         if check.status_code == 200:
             t = check.json()
             _current_tournaments[chat_id] = t.get('id')
             return send_message(chat_id, f"⚠️ Уже есть активный турнир #{t.get('id')}. Сначала завершите его командой /end_tournament")
-        resp = requests.post(f"{API_BASE_URL}/tournaments/start", json={}, timeout=15)
+        resp = api_session().post(f"{API_BASE_URL}/tournaments/start", json={}, timeout=API_TIMEOUT)
         if resp.status_code == 200:
             data = resp.json()
             tournament_id = data.get('id')
@@ -344,17 +397,17 @@ def handle_end_tournament(chat_id, user_id):
     
     try:
         # В системе может быть только один активный турнир — завершаем последний активный
-        resp = requests.post(f"{API_BASE_URL}/tournaments/end_latest", json={}, timeout=30)
+        resp = api_session().post(f"{API_BASE_URL}/tournaments/end_latest", json={}, timeout=(CONNECT_TIMEOUT, 30))
         if resp.status_code == 200:
             data = resp.json()
             _current_tournaments.pop(chat_id, None)
             tid = data.get('tournament_id')
             # Запрашиваем текстовый отчёт
             try:
-                r2 = requests.get(f"{API_BASE_URL}/tournaments/{tid}/report", timeout=20)
+                r2 = api_session().get(f"{API_BASE_URL}/tournaments/{tid}/report", timeout=(CONNECT_TIMEOUT, 20))
                 if r2.status_code == 200:
                     report = r2.json().get('report', '')
-                    # Отправляем отчёт инициатору и всем админам
+                    # Отправляем отчёт инициатору и всем админам (через очередь, параллельно по чатам)
                     send_message(chat_id, report)
                     for admin_id in ADMIN_IDS:
                         if admin_id != chat_id:
@@ -423,7 +476,7 @@ def process_update(update):
                         tg_id = int(parts[1])
                         rating = int(parts[2])
                         try:
-                            resp = requests.post(f"{API_BASE_URL}/players/set_rating", params={"telegram_id": tg_id, "rating": rating}, timeout=15)
+                            resp = api_session().post(f"{API_BASE_URL}/players/set_rating", params={"telegram_id": tg_id, "rating": rating}, timeout=API_TIMEOUT)
                             if resp.status_code == 200:
                                 data = resp.json()
                                 return send_message(chat_id, f"✅ Рейтинг обновлен: {tg_id} → {data.get('new_rating')}")
@@ -442,7 +495,7 @@ def process_update(update):
                             return send_message(chat_id, "❌ У вас нет прав для выполнения этой команды")
                         tid = int(parts[1])
                         try:
-                            resp = requests.post(f"{API_BASE_URL}/tournaments/{tid}/end", json={}, timeout=30)
+                            resp = api_session().post(f"{API_BASE_URL}/tournaments/{tid}/end", json={}, timeout=(CONNECT_TIMEOUT, 30))
                             if resp.status_code == 200:
                                 data = resp.json()
                                 return send_message(chat_id, f"🏁 Турнир #{tid} завершен! Таблица: {data.get('sheet_url','')}")
@@ -470,6 +523,17 @@ def process_update(update):
         print(f"❌ Ошибка обработки обновления: {str(e)}")
         return False
 
+# Команды, которые различаются в метриках; остальной текст — "other"
+KNOWN_COMMANDS = {"/start", "/help", "/setrank", "/setrating", "/clear_rooms", "/start_tournament", "/end_tournament"}
+
+def update_label(update):
+    """Метка обновления для гистограммы времени обработчика"""
+    if "callback_query" in update:
+        return "callback_query"
+    text = update.get("message", {}).get("text", "")
+    command = text.split()[0].lower() if text.strip() else ""
+    return command if command in KNOWN_COMMANDS else "other"
+
 def get_updates(offset=None):
     """Получение обновлений от Telegram"""
     url = f"https://api.telegram.org/bot{BOT_TOKEN}/getUpdates"
@@ -483,7 +547,7 @@ def get_updates(offset=None):
         params["offset"] = offset
     
     try:
-        response = requests.get(url, params=params, timeout=35)
+        response = telegram_session().get(url, params=params, timeout=LONG_POLL_TIMEOUT)
         if response.status_code == 200:
             return response.json()
         else:
@@ -501,7 +565,7 @@ def main():
         return
     # Проверка токена
     try:
-        r = requests.get(f"https://api.telegram.org/bot{BOT_TOKEN}/getMe", timeout=10)
+        r = telegram_session().get(f"https://api.telegram.org/bot{BOT_TOKEN}/getMe", timeout=TELEGRAM_TIMEOUT)
         if r.status_code != 200:
             print(f"❌ Неверный BOT_TOKEN или недоступен Telegram API: {r.status_code} {r.text}")
             return
@@ -513,10 +577,18 @@ def main():
 
     print(f"🌐 Mini App URL: {MINI_APP_URL}")
     print(f"🔗 API_BASE_URL: {API_BASE_URL}")
+    print(f"📬 Режим получения обновлений: {BOT_MODE}")
     print("=" * 50)
     
-    # На всякий случай отключаем вебхук (если где-то был настроен) — иначе polling не получит апдейты
-    disable_webhook()
+    if BOT_MODE == "webhook":
+        if not WEBHOOK_URL:
+            print("❌ WEBHOOK_URL не задан для режима webhook")
+            return
+        if not set_webhook():
+            return
+    else:
+        # Отключаем вебхук (если где-то был настроен) — иначе polling не получит апдейты
+        disable_webhook()
 
     # Настраиваем команды бота
     if not setup_bot_commands():
@@ -527,13 +599,41 @@ def main():
     print("📱 Отправьте /start в Telegram боту @GoBadmikAppBot")
     print("=" * 50)
     
+    if BOT_METRICS_PORT:
+        start_http_server(int(BOT_METRICS_PORT))
+        print(f"📈 Метрики бота: http://0.0.0.0:{BOT_METRICS_PORT}/metrics")
+
+    # Обновления разных чатов обрабатываются параллельно, одного чата — по порядку
+    dispatcher = UpdateDispatcher(process_update, label=update_label)
+    try:
+        if BOT_MODE == "webhook":
+            run_webhook(dispatcher)
+        else:
+            run_polling(dispatcher)
+    finally:
+        print("\n🛑 Бот остановлен, дорабатываем очередь...")
+        dispatcher.close(timeout=60)
+        outbound.close(timeout=60)
+
+def run_webhook(dispatcher):
+    """Приём обновлений через вебхук (uvicorn, до Ctrl+C)"""
+    import uvicorn
+
+    # Путь берём из WEBHOOK_URL: Telegram шлёт POST ровно туда
+    path = "/" + WEBHOOK_URL.split("://", 1)[-1].partition("/")[2]
+    app = create_webhook_app(dispatcher.submit, secret_token=WEBHOOK_SECRET, path=path)
+    print(f"🪝 Принимаем обновления на {WEBHOOK_HOST}:{WEBHOOK_PORT}{path}")
+    # create_webhook_app не обрабатывает lifespan — uvicorn не должен его слать
+    uvicorn.run(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT, log_level="warning", lifespan="off")
+
+def run_polling(dispatcher):
+    """Долгий опрос getUpdates (до Ctrl+C)"""
     offset = None
+    print("🔄 Бот работает... Нажмите Ctrl+C для остановки")
     
     while True:
         try:
-            print("🔄 Бот работает... Нажмите Ctrl+C для остановки")
-            
-            # Получаем обновления
+            # getUpdates сам ждёт до 30 с, пока нет обновлений, — пауза между запросами не нужна
             updates_response = get_updates(offset)
             
             if updates_response and "result" in updates_response:
@@ -543,19 +643,15 @@ def main():
                     update_id = update["update_id"]
                     offset = update_id + 1
                     
-                    print(f"🔄 Обрабатываем update_id: {update_id}")
+                    print(f"🔄 Ставим в очередь update_id: {update_id} (в очереди: {dispatcher.pending()})")
                     
-                    # Обрабатываем обновление
-                    if not process_update(update):
-                        print(f"❌ Ошибка обработки обновления {update_id}")
-                    else:
-                        print(f"✅ Успешно обработали update_id: {update_id}")
-            
-            # Небольшая пауза между запросами
-            time.sleep(1)
+                    # Ждёт, если очередь заполнена — следующий getUpdates подождёт обработчиков
+                    dispatcher.submit(update)
+            elif updates_response is None:
+                # Ошибка запроса: не долбим Telegram в цикле
+                time.sleep(1)
             
         except KeyboardInterrupt:
-            print("\n🛑 Бот остановлен пользователем")
             break
         except Exception as e:
             print(f"❌ Критическая ошибка: {str(e)}")
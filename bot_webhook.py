@@ -0,0 +1,76 @@
+"""
+Приём обновлений Telegram через вебхук для bot_simple_api.py.
+
+Маленькое ASGI-приложение: Telegram присылает POST с обновлением,
+приложение проверяет секрет (заголовок X-Telegram-Bot-Api-Secret-Token),
+ставит обновление в UpdateDispatcher и сразу отвечает 200 — команда
+начинает обрабатываться в момент прихода, без цикла опроса.
+
+    app = create_webhook_app(dispatcher.submit, secret_token=WEBHOOK_SECRET)
+    uvicorn.run(app, host="0.0.0.0", port=WEBHOOK_PORT)
+
+Если очередь обработчиков заполнена, отвечает 503: Telegram повторит
+доставку позже, а цикл событий не блокируется.
+"""
+
+import hmac
+import json
+import queue
+from typing import Any, Callable, Dict
+
+WEBHOOK_SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+
+
+async def _respond(send, status: int, body: Dict[str, Any]) -> None:
+    payload = json.dumps(body).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def create_webhook_app(submit: Callable[..., None], secret_token: str = "", path: str = "/webhook"):
+    """ASGI-приложение вебхука: POST path → submit(update, timeout=0)"""
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        if scope["path"] != path:
+            await _respond(send, 404, {"ok": False, "error": "not found"})
+            return
+        if scope["method"] != "POST":
+            await _respond(send, 405, {"ok": False, "error": "method not allowed"})
+            return
+        if secret_token:
+            received = dict(scope["headers"]).get(WEBHOOK_SECRET_HEADER, b"")
+            if not hmac.compare_digest(received, secret_token.encode("utf-8")):
+                await _respond(send, 403, {"ok": False, "error": "forbidden"})
+                return
+        try:
+            update = json.loads(await _read_body(receive))
+        except ValueError:
+            await _respond(send, 400, {"ok": False, "error": "invalid json"})
+            return
+        if not isinstance(update, dict) or "update_id" not in update:
+            await _respond(send, 400, {"ok": False, "error": "not an update"})
+            return
+        try:
+            # Не ждём свободного места: поток цикла событий не должен блокироваться
+            submit(update, timeout=0)
+        except queue.Full:
+            await _respond(send, 503, {"ok": False, "error": "busy"})
+            return
+        await _respond(send, 200, {"ok": True})
+
+    return app
@@ -22,6 +22,14 @@ class Settings:
     # По умолчанию используем публичные URL, чтобы бот и Mini App были согласованы
     MINI_APP_URL: str = os.getenv("MINI_APP_URL", "https://vanporigon-tech.github.io/badminton-rating-app")
     API_BASE_URL: str = os.getenv("API_BASE_URL", "https://badminton-api-vercel.onrender.com")
+    # Бот и API на одной машине: запросы к API идут в main.app внутри процесса, без HTTP
+    API_IN_PROCESS: bool = os.getenv("API_IN_PROCESS", "false").lower() == "true"
+    # Получение обновлений: polling или webhook (Telegram сам присылает POST на WEBHOOK_URL)
+    BOT_MODE: str = os.getenv("BOT_MODE", "polling").strip().lower()
+    WEBHOOK_URL: str = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", "8443")))
     
     # Admins
     @property
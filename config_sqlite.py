@@ -7,7 +7,7 @@ class Settings:
     # Database - используем SQLite для тестирования
     @property
     def DATABASE_URL(self) -> str:
-        return "sqlite:///./badminton_test.db"
+        return os.getenv("SQLITE_DATABASE_URL", "sqlite:///./badminton_test.db")
     
     # Telegram
     TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, case
 from typing import List, Optional, Tuple
 from datetime import datetime
 
@@ -18,20 +18,31 @@ def create_player(db: Session, player: PlayerCreate) -> Player:
     return db_player
 
 def update_player_rating(db: Session, player_id: int, new_rating: float, new_rd: float, new_volatility: float) -> Player:
-    player = db.query(Player).filter(Player.id == player_id).first()
+    player = db.get(Player, player_id)
     if player:
         player.rating = new_rating
         player.rd = new_rd
         player.volatility = new_volatility
         player.updated_at = datetime.utcnow()
         db.commit()
-        db.refresh(player)
     return player
 
+def update_player_ratings(db: Session, ratings: List[Tuple[int, float, float, float]]) -> None:
+    """Rating updates for all players of a game as one executemany in one transaction.
+
+    ratings: (player_id, rating, rd, volatility)
+    """
+    now = datetime.utcnow()
+    db.bulk_update_mappings(Player, [
+        {"id": player_id, "rating": rating, "rd": rd, "volatility": volatility, "updated_at": now}
+        for player_id, rating, rd, volatility in ratings
+    ])
+    db.commit()
+
 # Room CRUD operations
 def create_room(db: Session, room: RoomCreate) -> Room:
     # Get creator information to include in room name
-    creator = db.query(Player).filter(Player.id == room.creator_id).first()
+    creator = db.get(Player, room.creator_id)
     if not creator:
         raise ValueError("Creator not found")
     
@@ -39,22 +50,14 @@ def create_room(db: Session, room: RoomCreate) -> Room:
     creator_name = f"{creator.first_name} {creator.last_name}"
     room_name_with_creator = f"{room.name} - {creator_name}"
     
-    # Create room with modified name
+    # Create room with modified name; the creator joins as first member and leader
+    # in the same flush, so the room and its member are committed together
     room_data = room.dict()
     room_data['name'] = room_name_with_creator
     db_room = Room(**room_data)
+    db_room.members.append(RoomMember(player_id=room.creator_id, is_leader=True))
     db.add(db_room)
     db.commit()
-    db.refresh(db_room)
-    
-    # Add creator as first member and leader
-    member = RoomMember(
-        room_id=db_room.id,
-        player_id=room.creator_id,
-        is_leader=True
-    )
-    db.add(member)
-    db.commit()
     
     return db_room
 
@@ -70,19 +73,23 @@ def get_room_with_members(db: Session, room_id: int) -> Optional[Room]:
     ).filter(Room.id == room_id).first()
 
 def add_player_to_room(db: Session, room_id: int, player_id: int) -> RoomMember:
-    # Check if player is already in room
-    existing_member = db.query(RoomMember).filter(
-        and_(RoomMember.room_id == room_id, RoomMember.player_id == player_id)
-    ).first()
+    # Capacity, member count and existing membership in a single query
+    row = db.query(
+        Room.max_players,
+        func.count(RoomMember.id),
+        func.max(case((RoomMember.player_id == player_id, RoomMember.id))),
+    ).outerjoin(RoomMember, RoomMember.room_id == Room.id).filter(Room.id == room_id).group_by(Room.id).first()
     
-    if existing_member:
-        return existing_member
+    if row is None:
+        raise ValueError("Room not found")
+    max_players, member_count, existing_member_id = row
     
-    # Check if room is full
-    member_count = db.query(RoomMember).filter(RoomMember.room_id == room_id).count()
-    room = get_room_by_id(db, room_id)
+    # Check if player is already in room
+    if existing_member_id is not None:
+        return db.get(RoomMember, existing_member_id)
     
-    if member_count >= room.max_players:
+    # Check if room is full
+    if member_count >= max_players:
         raise ValueError("Room is full")
     
     member = RoomMember(
@@ -92,30 +99,22 @@ def add_player_to_room(db: Session, room_id: int, player_id: int) -> RoomMember:
     )
     db.add(member)
     db.commit()
-    db.refresh(member)
     return member
 
 def remove_player_from_room(db: Session, room_id: int, player_id: int) -> bool:
-    member = db.query(RoomMember).filter(
+    deleted = db.query(RoomMember).filter(
         and_(RoomMember.room_id == room_id, RoomMember.player_id == player_id)
-    ).first()
-    
-    if member:
-        db.delete(member)
-        db.commit()
-        return True
-    return False
+    ).delete(synchronize_session="fetch")
+    db.commit()
+    return deleted > 0
 
 def start_game(db: Session, room_id: int) -> bool:
-    room = get_room_with_members(db, room_id)
-    if not room:
-        return False
-    
-    member_count = len(room.members)
+    member_count = db.query(func.count(RoomMember.id)).filter(RoomMember.room_id == room_id).scalar()
     if member_count < 2:
         return False
     
-    room.is_game_started = True
+    started = db.query(Room).filter(Room.id == room_id).update(
+        {Room.is_game_started: True}, synchronize_session="fetch"
+    )
     db.commit()
-    return True
-
+    return started > 0
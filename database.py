@@ -1,7 +1,7 @@
 from sqlalchemy import create_engine, MetaData
-from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
+from models import Base
 
 # Create database engine
 engine = create_engine(settings.DATABASE_URL)
@@ -9,9 +9,6 @@ engine = create_engine(settings.DATABASE_URL)
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create base class for models
-Base = declarative_base()
-
 # Metadata for migrations
 metadata = MetaData()
 
@@ -1,16 +1,76 @@
-from sqlalchemy import create_engine, MetaData
-from sqlalchemy.ext.declarative import declarative_base
+import threading
+
+from sqlalchemy import create_engine, event, MetaData
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 from config_sqlite import settings
+from models import Base
+from sqlite_pool import SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE
+
+
+def _is_memory_url(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def create_sqlite_engine(url: str):
+    """SQLite engine: WAL and pragmas on every connection, pool chosen by database type"""
+    if _is_memory_url(url):
+        # An in-memory database lives as long as its connection, so share a single one
+        pool_options = {"poolclass": StaticPool}
+    else:
+        # File database: keep connections (statement cache, mmap) across sessions
+        pool_options = {"poolclass": QueuePool, "pool_size": 5, "max_overflow": 10}
+    sqlite_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        **pool_options,
+    )
+
+    @event.listens_for(sqlite_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not _is_memory_url(url):
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE)}")
+        # NORMAL is safe in WAL mode and only fsyncs on checkpoints
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    return sqlite_engine
 
-# Create database engine
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The engine for settings.DATABASE_URL is built on first use, not on import:
+# importing this module (or db_dialect) must not create ./badminton_test.db
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Engine for settings.DATABASE_URL, created on the first call"""
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_sqlite_engine(settings.DATABASE_URL)
+            _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+    return _engine
+
+
+def SessionLocal():
+    """Session factory bound to get_engine()"""
+    get_engine()
+    return _session_factory()
+
+
+def __getattr__(name):
+    # database_sqlite.engine is still available, just lazily
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Create base class for models
-Base = declarative_base()
 
 # Metadata for migrations
 metadata = MetaData()
@@ -25,5 +85,4 @@ def get_db():
 
 def create_tables():
     """Create all tables in database"""
-    Base.metadata.create_all(bind=engine)
-
+    Base.metadata.create_all(bind=get_engine())
@@ -0,0 +1,105 @@
+"""
+Особенности диалектов БД для main.py.
+
+Модели и эндпоинты main.py не зависят от того, Postgres под ними или
+SQLite: всё диалектное собрано здесь. В продакшене это Postgres (JSONB,
+TRUNCATE ... RESTART IDENTITY CASCADE), в тестах и бенчмарках — SQLite,
+в том числе в памяти (DATABASE_URL=sqlite://), без внешнего сервера.
+"""
+
+from typing import Iterable, List
+
+from sqlalchemy import BigInteger, MetaData, create_engine, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.types import JSON
+
+# JSON-колонка: JSONB в Postgres, JSON (текст) в остальных диалектах
+JSONType = JSON().with_variant(JSONB, "postgresql")
+
+# Колонки, добавленные после первых деплоев: (таблица, колонка)
+LATE_COLUMNS = (
+    ("rooms", "current_game"),
+    ("rooms", "last_result"),
+    ("players", "rank_changes_used"),
+)
+
+
+def normalize_database_url(url: str) -> str:
+    """postgres:// → postgresql+psycopg://; остальные URL без изменений"""
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    if url.startswith("postgresql://") and "+" not in url.split("://", 1)[0]:
+        url = url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
+def create_app_engine(url: str) -> Engine:
+    """Engine под диалект: SQLite — с WAL, прагмами и StaticPool для памяти"""
+    if url.startswith("sqlite"):
+        # Только для SQLite: database_sqlite тянет config_sqlite (load_dotenv)
+        from database_sqlite import create_sqlite_engine
+        return create_sqlite_engine(url)
+    return create_engine(url)
+
+
+def upgrade_schema(engine: Engine, metadata: MetaData) -> List[str]:
+    """Онлайн-миграция старых баз: добавляет недостающие колонки из LATE_COLUMNS,
+    в Postgres расширяет players.telegram_id до BIGINT. Возвращает выполненные шаги."""
+    applied = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        tables = set(inspector.get_table_names())
+        if engine.dialect.name == "postgresql" and "players" in tables:
+            columns = {c["name"]: c for c in inspector.get_columns("players")}
+            telegram_id = columns.get("telegram_id")
+            if telegram_id is not None and not isinstance(telegram_id["type"], BigInteger):
+                conn.execute(text("ALTER TABLE players ALTER COLUMN telegram_id TYPE BIGINT"))
+                applied.append("players.telegram_id BIGINT")
+
+        for table_name, column_name in LATE_COLUMNS:
+            if table_name not in tables:
+                continue
+            if column_name in {c["name"] for c in inspector.get_columns(table_name)}:
+                continue
+            column = metadata.tables[table_name].c[column_name]
+            ddl = f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column.type.compile(dialect=engine.dialect)}"
+            if column.default is not None and column.default.is_scalar:
+                ddl += f" DEFAULT {column.default.arg!r}"
+            conn.execute(text(ddl))
+            applied.append(f"{table_name}.{column_name}")
+    return applied
+
+
+def reset_tables(db: Session, metadata: MetaData, table_names: Iterable[str]) -> None:
+    """Очищает таблицы и сбрасывает счётчики id (фиксирует вызывающий).
+
+    Postgres — одним TRUNCATE ... RESTART IDENTITY CASCADE. Остальные диалекты
+    повторяют CASCADE вручную: вместе с перечисленными очищаются и ссылающиеся
+    на них таблицы, удаление идёт от зависимых к родительским."""
+    table_names = list(table_names)
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        db.execute(text(f"TRUNCATE TABLE {', '.join(table_names)} RESTART IDENTITY CASCADE"))
+        return
+
+    cleared = set(table_names)
+    # sorted_tables идут от родителей к зависимым — хватает одного прохода
+    for table in metadata.sorted_tables:
+        if any(fk.column.table.name in cleared for fk in table.foreign_keys):
+            cleared.add(table.name)
+    for table in reversed(metadata.sorted_tables):
+        if table.name in cleared:
+            db.execute(table.delete())
+
+    # Без AUTOINCREMENT SQLite и так начинает id заново с пустой таблицы;
+    # с ним счётчики лежат в sqlite_sequence
+    if dialect == "sqlite" and db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_sequence'")
+    ).first():
+        placeholders = ", ".join(f":t{i}" for i in range(len(cleared)))
+        db.execute(
+            text(f"DELETE FROM sqlite_sequence WHERE name IN ({placeholders})"),
+            {f"t{i}": name for i, name in enumerate(sorted(cleared))},
+        )
@@ -1,5 +1,10 @@
 # Gunicorn configuration file
 import multiprocessing
+import os
+import shutil
+
+# Общий каталог метрик Prometheus для всех воркеров (до импорта приложения)
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/badminton-rating-metrics")
 
 # Server socket
 bind = "0.0.0.0:8000"
@@ -35,3 +40,14 @@ tmp_upload_dir = None
 # keyfile = "path/to/keyfile"
 # certfile = "path/to/certfile"
 
+
+# Метрики: чистим каталог при старте мастера и убираем данные умерших воркеров
+def on_starting(server):
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -1,16 +1,23 @@
 import os
-from fastapi import FastAPI, HTTPException, Depends, Response
+import json
+import hashlib
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, Header
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, BigInteger, String, DateTime, Boolean, ForeignKey, Float, text
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.types import JSON
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, ForeignKey, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
-from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import logging
 from dotenv import load_dotenv
+from compression import CompressionMiddleware, PrecompressedCache
+from request_timing import ServerTimingMiddleware, TimedJSONResponse, install_sqlalchemy_hooks, track_section
+import metrics
+from rate_limit import enforce_rate_limit
+from db_dialect import JSONType, create_app_engine, normalize_database_url, reset_tables, upgrade_schema
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -23,7 +30,10 @@ load_dotenv()
 app = FastAPI(
     title="🏸 Badminton Rating API",
     description="API для приложения бадминтон рейтинга",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=TimedJSONResponse,
+    # Лимит частоты по telegram_id/IP, общий для всех воркеров
+    dependencies=[Depends(enforce_rate_limit)],
 )
 
 # CORS настройки (из переменной окружения CORS_ALLOW_ORIGINS, по умолчанию *)
@@ -41,6 +51,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие gzip/brotli для больших ответов (/players, /rooms/, отчёты)
+app.add_middleware(CompressionMiddleware)
+
+# Server-Timing: число SQL-запросов, время БД, Glicko-2 и сериализации
+app.add_middleware(ServerTimingMiddleware)
+
+# Prometheus: латентность по маршрутам и запросы в работе
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Отчёты завершённых турниров не меняются — храним их уже сжатыми
+report_cache = PrecompressedCache()
+
 # Настройка базы данных
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
@@ -48,13 +70,13 @@ DATABASE_URL = os.getenv(
 )
 
 # Нормализуем URL: postgres:// → postgresql://; используем драйвер psycopg
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-if DATABASE_URL.startswith("postgresql://") and "+" not in DATABASE_URL.split("://", 1)[0]:
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
+DATABASE_URL = normalize_database_url(DATABASE_URL)
 
-engine = create_engine(DATABASE_URL)
+# Postgres в продакшене; sqlite:// (в памяти) или sqlite:///файл — для тестов и бенчмарков
+engine = create_app_engine(DATABASE_URL)
+install_sqlalchemy_hooks(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+metrics.install_pool_metrics(engine, SessionLocal)
 Base = declarative_base()
 
 # Модели базы данных
@@ -90,8 +112,8 @@ class Room(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     # Состояние текущей игры и последний результат (для показа всем участникам)
-    current_game = Column(JSON().with_variant(JSONB, 'postgresql'), nullable=True)
-    last_result = Column(JSON().with_variant(JSONB, 'postgresql'), nullable=True)
+    current_game = Column(JSONType, nullable=True)
+    last_result = Column(JSONType, nullable=True)
     
     # Связи
     creator = relationship("Player", back_populates="rooms")
@@ -155,6 +177,20 @@ class GamePlayer(Base):
     game = relationship("Game", back_populates="players")
     player = relationship("Player", back_populates="games_played")
 
+
+class IdempotencyRecord(Base):
+    """Сохранённый ответ на запрос с заголовком Idempotency-Key."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    endpoint = Column(String(100), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    # None — запрос ещё выполняется, ответ пока не сохранён
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSONType, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 # Создание таблиц
 try:
     Base.metadata.create_all(bind=engine)
@@ -162,43 +198,10 @@ try:
 except Exception as e:
     logger.error(f"❌ Ошибка создания таблиц: {e}")
 
-# Безопасный апгрейд типов для telegram_id → BIGINT (если ранние деплои создали INT)
+# Безопасный апгрейд старых баз: telegram_id → BIGINT (Postgres), новые колонки состояния игры
 try:
-    with engine.connect() as conn:
-        # PostgreSQL: изменить тип столбца при необходимости
-        conn.execute(text("""
-            DO $$
-            BEGIN
-                IF EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_name='players' AND column_name='telegram_id' AND data_type='integer'
-                ) THEN
-                    ALTER TABLE players ALTER COLUMN telegram_id TYPE BIGINT;
-                END IF;
-                -- Добавляем JSONB поля состояния игры для комнат, если их нет
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_name='rooms' AND column_name='current_game'
-                ) THEN
-                    ALTER TABLE rooms ADD COLUMN current_game JSONB;
-                END IF;
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_name='rooms' AND column_name='last_result'
-                ) THEN
-                    ALTER TABLE rooms ADD COLUMN last_result JSONB;
-                END IF;
-                -- Добавляем поле rank_changes_used для ограничения повторной смены ранга
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_name='players' AND column_name='rank_changes_used'
-                ) THEN
-                    ALTER TABLE players ADD COLUMN rank_changes_used INTEGER DEFAULT 0;
-                END IF;
-            END$$;
-        """))
-        conn.commit()
-        logger.info("✅ Проверка/миграция telegram_id → BIGINT выполнена")
+    applied = upgrade_schema(engine, Base.metadata)
+    logger.info(f"✅ Проверка/миграция схемы выполнена: {', '.join(applied) or 'изменений нет'}")
 except Exception as e:
     logger.warning(f"⚠️ Не удалось выполнить онлайн-миграцию типов: {e}")
 
@@ -210,6 +213,108 @@ def get_db():
     finally:
         db.close()
 
+# Idempotency-Key: сколько хранить сохранённые ответы (по умолчанию сутки)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Резерв ключа без ответа старше этого считается брошенным (процесс упал посреди запроса)
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+
+
+def _idempotency_begin(db: Session, key: Optional[str], endpoint: str, payload: Any) -> Optional[Any]:
+    """Проверяет Idempotency-Key перед выполнением запроса.
+
+    Возвращает сохранённый ответ, если запрос с этим ключом уже выполнен.
+    Иначе резервирует ключ (запись без ответа) и возвращает None.
+    Повтор во время выполнения — 409, тот же ключ с другим телом — 422.
+    Резерв старше IDEMPOTENCY_LEASE_SECONDS повтор забирает себе.
+    """
+    if not key:
+        return None
+    request_hash = hashlib.sha256(
+        json.dumps(jsonable_encoder(payload), sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    now = datetime.utcnow()
+    record = db.get(IdempotencyRecord, (key, endpoint))
+    if record is not None and record.expires_at <= now:
+        db.delete(record)
+        record = None
+    if record is not None:
+        if record.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key уже использован с другим телом запроса")
+        if record.status_code is None:
+            leased_at = record.created_at
+            if leased_at is not None and leased_at > now - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS):
+                raise HTTPException(status_code=409, detail="Запрос с этим Idempotency-Key ещё выполняется")
+            # Резерв брошен: забирает его только один из параллельных повторов
+            taken = db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.key == key,
+                IdempotencyRecord.endpoint == endpoint,
+                IdempotencyRecord.status_code.is_(None),
+                IdempotencyRecord.created_at == leased_at,
+            ).update(
+                {"created_at": now, "expires_at": now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)},
+                synchronize_session=False,
+            )
+            db.commit()
+            if not taken:
+                raise HTTPException(status_code=409, detail="Запрос с этим Idempotency-Key ещё выполняется")
+            metrics.record_cache("idempotency", hit=False)
+            return None
+        metrics.record_cache("idempotency", hit=True)
+        return record.response
+    metrics.record_cache("idempotency", hit=False)
+    # Заодно чистим просроченные ключи
+    db.query(IdempotencyRecord).filter(IdempotencyRecord.expires_at <= now).delete(synchronize_session=False)
+    db.add(IdempotencyRecord(
+        key=key,
+        endpoint=endpoint,
+        request_hash=request_hash,
+        expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Параллельный повтор успел зарезервировать ключ раньше
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Запрос с этим Idempotency-Key ещё выполняется")
+    return None
+
+
+def _idempotency_store(db: Session, key: Optional[str], endpoint: str, result: Any, status_code: int = 200) -> Any:
+    """Записывает ответ для зарезервированного ключа в текущую транзакцию (фиксирует вызывающий)."""
+    if not key:
+        return result
+    record = db.get(IdempotencyRecord, (key, endpoint))
+    if record is not None:
+        record.response = jsonable_encoder(result)
+        record.status_code = status_code
+    return result
+
+
+def _idempotency_complete(db: Session, key: Optional[str], endpoint: str, result: Any, status_code: int = 200) -> Any:
+    """Сохраняет ответ для зарезервированного ключа и возвращает его без изменений."""
+    if not key:
+        return result
+    _idempotency_store(db, key, endpoint, result, status_code)
+    db.commit()
+    return result
+
+
+def _idempotency_abort(db: Session, key: Optional[str], endpoint: str) -> None:
+    """Снимает резерв ключа после ошибки, чтобы повтор выполнился заново."""
+    if not key:
+        return
+    try:
+        db.rollback()
+        db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.key == key,
+            IdempotencyRecord.endpoint == endpoint,
+            IdempotencyRecord.status_code.is_(None),
+        ).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"⚠️ Не удалось снять резерв Idempotency-Key {key}: {e}")
+
 # Pydantic модели
 class PlayerCreate(BaseModel):
     telegram_id: int
@@ -465,6 +570,16 @@ async def root():
 async def health():
     return {"status": "healthy", "timestamp": datetime.utcnow()}
 
+@app.get("/metrics")
+async def get_metrics(db: Session = Depends(get_db)):
+    """Метрики в формате Prometheus (сводно по всем воркерам gunicorn)."""
+    try:
+        metrics.OPEN_ROOMS.set(db.query(Room).filter(Room.is_active == True).count())
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось посчитать открытые комнаты для метрик: {e}")
+    body, content_type = metrics.render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.post("/players/", response_model=PlayerResponse)
 async def create_or_get_player(player: PlayerCreate, db: Session = Depends(get_db)):
     """Создает или получает игрока по telegram_id"""
@@ -554,10 +669,10 @@ async def admin_reset_all(secret: Optional[str] = None, db: Session = Depends(ge
         raise HTTPException(status_code=403, detail="Forbidden")
     try:
         # Полное очищение с каскадом и сбросом идентификаторов
-        db.execute(text(
-            "TRUNCATE TABLE game_players, games, room_members, rooms, players RESTART IDENTITY CASCADE"
-        ))
+        reset_tables(db, Base.metadata, ["game_players", "games", "room_members", "rooms", "players", "idempotency_keys"])
         db.commit()
+        # Ключи кэша отчётов и так не совпадут с новыми данными; освобождаем память
+        report_cache.clear()
         return {"status": "ok", "players": 0}
     except Exception as e:
         db.rollback()
@@ -569,8 +684,17 @@ async def list_players(db: Session = Depends(get_db)):
     return players
 
 @app.post("/rooms/", response_model=RoomResponse)
-async def create_room(room: RoomCreate, db: Session = Depends(get_db)):
+async def create_room(
+    room: RoomCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+):
     """Создает новую комнату"""
+    replay = _idempotency_begin(db, idempotency_key, "POST /rooms/", room)
+    if replay is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return replay
     try:
         # Находим игрока-создателя
         creator = db.query(Player).filter(Player.telegram_id == room.creator_telegram_id).first()
@@ -583,7 +707,7 @@ async def create_room(room: RoomCreate, db: Session = Depends(get_db)):
             # Возвращаем уже существующую комнату
             members = db.query(RoomMember).filter(RoomMember.room_id == existing_active.id).all()
             creator_full_name = f"{creator.first_name} {creator.last_name or ''}".strip()
-            return RoomResponse(
+            existing = RoomResponse(
                 id=existing_active.id,
                 name=existing_active.name,
                 creator_id=existing_active.creator_id,
@@ -601,6 +725,7 @@ async def create_room(room: RoomCreate, db: Session = Depends(get_db)):
                     ) for m in members
                 ]
             )
+            return _idempotency_complete(db, idempotency_key, "POST /rooms/", existing)
 
         # Создаем комнату
         new_room = Room(
@@ -609,8 +734,7 @@ async def create_room(room: RoomCreate, db: Session = Depends(get_db)):
             max_players=room.max_players
         )
         db.add(new_room)
-        db.commit()
-        db.refresh(new_room)
+        db.flush()
         
         # Добавляем создателя как участника и лидера
         room_member = RoomMember(
@@ -619,7 +743,7 @@ async def create_room(room: RoomCreate, db: Session = Depends(get_db)):
             is_leader=True
         )
         db.add(room_member)
-        db.commit()
+        db.flush()
         
         # Формируем ответ
         creator_full_name = f"{creator.first_name} {creator.last_name or ''}".strip()
@@ -641,11 +765,15 @@ async def create_room(room: RoomCreate, db: Session = Depends(get_db)):
             )]
         )
         
+        # Комната, участник и ответ для Idempotency-Key — одной транзакцией
+        _idempotency_store(db, idempotency_key, "POST /rooms/", result)
+        db.commit()
         logger.info(f"✅ Создана комната: {new_room.name} (ID: {new_room.id})")
         return result
         
     except Exception as e:
         logger.error(f"❌ Ошибка создания комнаты: {e}")
+        _idempotency_abort(db, idempotency_key, "POST /rooms/")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -745,8 +873,21 @@ def _calculate_and_apply_ratings(db: Session, team1: List[Player], team2: List[P
 
 
 @app.post("/games")
-async def create_game(game: GameCreate, db: Session = Depends(get_db)):
-    """Создать игру, обновить рейтинги Glicko-2, вернуть изменения для UI."""
+async def create_game(
+    game: GameCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+):
+    """Создать игру, обновить рейтинги Glicko-2, вернуть изменения для UI.
+
+    С заголовком Idempotency-Key повтор запроса возвращает сохранённый
+    результат без повторного пересчёта рейтингов.
+    """
+    replay = _idempotency_begin(db, idempotency_key, "POST /games", game)
+    if replay is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return replay
     try:
         # Validate scores
         if game.score1 is None or game.score2 is None:
@@ -810,7 +951,9 @@ async def create_game(game: GameCreate, db: Session = Depends(get_db)):
         team2 = [_ensure_player(db, pid) for pid in team2_ids]
 
         # Calculate ratings (strict, no fallback ±10)
-        changes = _calculate_and_apply_ratings(db, team1, team2, game.score1, game.score2)
+        with track_section("glicko"), metrics.RATING_UPDATE_LATENCY.time():
+            changes = _calculate_and_apply_ratings(db, team1, team2, game.score1, game.score2)
+        metrics.RATING_UPDATES.inc()
 
         # Persist Game and per-player entries
         print(f"🎮 СОЗДАНИЕ ИГРЫ: tournament_id={game.tournament_id}, room_id={game.room_id}, score1={game.score1}, score2={game.score2}")
@@ -821,9 +964,7 @@ async def create_game(game: GameCreate, db: Session = Depends(get_db)):
             score2=game.score2,
         )
         db.add(new_game)
-        db.commit()
-        db.refresh(new_game)
-        print(f"✅ ИГРА СОЗДАНА: id={new_game.id}, tournament_id={new_game.tournament_id}")
+        db.flush()
 
         for p in team1:
             ch = changes[p.telegram_id]
@@ -857,8 +998,6 @@ async def create_game(game: GameCreate, db: Session = Depends(get_db)):
             )
             db.add(gp)
 
-        db.commit()
-
         # Google Sheets интеграция удалена полностью (ускорение отклика)
 
         # Обновляем состояние комнаты, чтобы все участники увидели результат
@@ -874,21 +1013,46 @@ async def create_game(game: GameCreate, db: Session = Depends(get_db)):
                 }
                 room.current_game = None
                 db.add(room)
-                db.commit()
 
-        return {"game_id": new_game.id, "rating_changes": changes}
+        # Игра, рейтинги, комната и ответ для Idempotency-Key фиксируются
+        # одной транзакцией: после сбоя ничего не записано, резерв ключа
+        # снимается, и повтор пересчитает рейтинги ровно один раз
+        result = _idempotency_store(
+            db, idempotency_key, "POST /games", {"game_id": new_game.id, "rating_changes": changes}
+        )
+        db.commit()
+        print(f"✅ ИГРА СОЗДАНА: id={new_game.id}, tournament_id={new_game.tournament_id}")
+        return result
     except Exception as e:
         db.rollback()
+        _idempotency_abort(db, idempotency_key, "POST /games")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/tournaments/start", response_model=TournamentResponse)
-async def start_tournament(data: TournamentCreate, db: Session = Depends(get_db)):
-    t = Tournament(name=data.name or f"Tournament {datetime.utcnow().strftime('%Y-%m-%d')}")
-    db.add(t)
-    db.commit()
-    db.refresh(t)
-    return t
+async def start_tournament(
+    data: TournamentCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+):
+    replay = _idempotency_begin(db, idempotency_key, "POST /tournaments/start", data)
+    if replay is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return replay
+    try:
+        t = Tournament(name=data.name or f"Tournament {datetime.utcnow().strftime('%Y-%m-%d')}")
+        db.add(t)
+        db.flush()
+        # Турнир и ответ для Idempotency-Key — одной транзакцией
+        result = _idempotency_store(
+            db, idempotency_key, "POST /tournaments/start", TournamentResponse.model_validate(t)
+        )
+        db.commit()
+    except Exception:
+        _idempotency_abort(db, idempotency_key, "POST /tournaments/start")
+        raise
+    return result
 
 
 @app.post("/tournaments/{tournament_id}/end")
@@ -961,13 +1125,40 @@ async def end_tournament(tournament_id: int, db: Session = Depends(get_db)):
     return {"tournament_id": t.id, "sheet_url": url}
 
 
+def _report_cache_key(db: Session, tournament: "Tournament") -> tuple:
+    """Ключ кэша отчёта из того, что в него входит.
+
+    Кэш свой у каждого воркера gunicorn, а сброс базы начинает id заново,
+    поэтому ключ — не просто id: время создания и завершения турнира плюс
+    отпечаток участников (записи игр, рейтинги, имена). Один запрос вместо
+    построения отчёта; устаревший ключ просто перестаёт совпадать."""
+    rows = (
+        db.query(GamePlayer.id, GamePlayer.new_rating, Player.first_name, Player.last_name, Player.username)
+        .join(Game, Game.id == GamePlayer.game_id)
+        .join(Player, Player.id == GamePlayer.player_id)
+        .filter(Game.tournament_id == tournament.id)
+        .order_by(GamePlayer.id)
+        .all()
+    )
+    fingerprint = hashlib.sha256(json.dumps([list(row) for row in rows], ensure_ascii=False).encode("utf-8")).hexdigest()
+    return (tournament.id, tournament.created_at, tournament.ended_at, fingerprint)
+
+
 @app.get("/tournaments/{tournament_id}/report")
-async def get_tournament_report(tournament_id: int, db: Session = Depends(get_db)):
+async def get_tournament_report(tournament_id: int, request: Request, db: Session = Depends(get_db)):
+    accept_encoding = request.headers.get("accept-encoding")
     t = db.query(Tournament).filter(Tournament.id == tournament_id).first()
     if not t:
         raise HTTPException(status_code=404, detail="Турнир не найден")
-    report = _generate_tournament_report(db, t)
-    return {"report": report}
+    if t.is_active:
+        return {"report": _generate_tournament_report(db, t)}
+    # Турнир завершён — отчёт сжимается один раз на каждый набор данных
+    key = _report_cache_key(db, t)
+    cached = report_cache.get(key, accept_encoding)
+    metrics.record_cache("tournament_report", hit=cached is not None)
+    if cached is not None:
+        return cached
+    return report_cache.put(key, {"report": _generate_tournament_report(db, t)}, accept_encoding)
 
 
 @app.get("/tournaments/active", response_model=TournamentResponse)
@@ -13,10 +13,60 @@ import json
 from datetime import datetime
 import os
 
+from sqlite_pool import AsyncSQLite, SQLitePool
+
+# Файл базы; соединения переиспользуются потоками (см. sqlite_pool.py)
+DATABASE_PATH = os.getenv("SQLITE_DATABASE", "badminton.db")
+db = SQLitePool(DATABASE_PATH)
+# Эндпоинты не блокируют цикл событий: запись — один поток, чтение — пул потоков
+sql = AsyncSQLite(db)
+
+# Миграции схемы поверх таблиц init_db; PRAGMA user_version — сколько уже применено
+MIGRATIONS = [
+    # 1: индексы под список комнат, участие в комнате и игры комнаты
+    '''
+        CREATE INDEX IF NOT EXISTS idx_room_members_room_player ON room_members(room_id, player_id);
+        CREATE INDEX IF NOT EXISTS idx_rooms_active_creator ON rooms(is_active, creator_id);
+        CREATE INDEX IF NOT EXISTS idx_games_room ON games(room_id);
+    ''',
+    # 2: число участников хранится в комнате, триггеры держат его в актуальном виде
+    '''
+        ALTER TABLE rooms ADD COLUMN member_count INTEGER NOT NULL DEFAULT 0;
+        UPDATE rooms SET member_count = (
+            SELECT COUNT(*) FROM room_members WHERE room_members.room_id = rooms.id
+        );
+        CREATE TRIGGER IF NOT EXISTS room_members_count_insert AFTER INSERT ON room_members
+        BEGIN
+            UPDATE rooms SET member_count = member_count + 1 WHERE id = NEW.room_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS room_members_count_delete AFTER DELETE ON room_members
+        BEGIN
+            UPDATE rooms SET member_count = member_count - 1 WHERE id = OLD.room_id;
+        END;
+    ''',
+]
+
+# Частые запросы; их планы проверяет test_sqlite_schema.py (EXPLAIN QUERY PLAN)
+ROOMS_LIST_SQL = '''
+    SELECT id, name, creator_id, max_players, is_active, is_game_started, member_count
+    FROM rooms
+    WHERE is_active = 1
+'''
+ACTIVE_ROOM_BY_CREATOR_SQL = 'SELECT id FROM rooms WHERE creator_id = ? AND is_active = 1'
+MEMBERSHIP_SQL = 'SELECT id FROM room_members WHERE room_id = ? AND player_id = ?'
+ROOM_CAPACITY_SQL = 'SELECT member_count, max_players FROM rooms WHERE id = ?'
+
+def migrate(conn):
+    """Применяет недостающие миграции, каждую в своей транзакции"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.executescript(f'BEGIN; {script} PRAGMA user_version = {number}; COMMIT;')
+        print(f"🗄️ Миграция схемы SQLite #{number} применена")
+
 # Создаем SQLite базу данных
 def init_db():
     """Инициализация SQLite базы данных"""
-    conn = sqlite3.connect('badminton.db')
+    conn = db.acquire()
     cursor = conn.cursor()
     
     # Создаем таблицы
@@ -67,7 +117,8 @@ def init_db():
     ''')
     
     conn.commit()
-    conn.close()
+    migrate(conn)
+    db.release(conn)
 
 # Инициализируем базу данных
 init_db()
@@ -118,41 +169,41 @@ async def health_check():
 @app.post("/players/")
 async def create_player(player: PlayerCreate):
     """Создание игрока"""
-    conn = sqlite3.connect('badminton.db')
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute('''
-            INSERT INTO players (telegram_id, first_name, last_name, rating)
-            VALUES (?, ?, ?, ?)
-        ''', (player.telegram_id, player.first_name, player.last_name, player.rating))
+    def work(conn):
+        cursor = conn.cursor()
         
-        conn.commit()
-        player_id = cursor.lastrowid
-        
-        return {
-            "id": player_id,
-            "telegram_id": player.telegram_id,
-            "first_name": player.first_name,
-            "last_name": player.last_name,
-            "rating": player.rating,
-            "rd": 350.0,
-            "volatility": 0.06
-        }
-    except sqlite3.IntegrityError:
-        raise HTTPException(status_code=400, detail="Игрок уже существует")
-    finally:
-        conn.close()
+        try:
+            cursor.execute('''
+                INSERT INTO players (telegram_id, first_name, last_name, rating)
+                VALUES (?, ?, ?, ?)
+            ''', (player.telegram_id, player.first_name, player.last_name, player.rating))
+            
+            conn.commit()
+            player_id = cursor.lastrowid
+            
+            return {
+                "id": player_id,
+                "telegram_id": player.telegram_id,
+                "first_name": player.first_name,
+                "last_name": player.last_name,
+                "rating": player.rating,
+                "rd": 350.0,
+                "volatility": 0.06
+            }
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=400, detail="Игрок уже существует")
+    
+    return await sql.write(work)
 
 @app.get("/players/{telegram_id}")
 async def get_player(telegram_id: int):
     """Получение игрока по Telegram ID"""
-    conn = sqlite3.connect('badminton.db')
-    cursor = conn.cursor()
+    def work(conn):
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM players WHERE telegram_id = ?', (telegram_id,))
+        return cursor.fetchone()
     
-    cursor.execute('SELECT * FROM players WHERE telegram_id = ?', (telegram_id,))
-    player = cursor.fetchone()
-    conn.close()
+    player = await sql.read(work)
     
     if not player:
         raise HTTPException(status_code=404, detail="Игрок не найден")
@@ -171,67 +222,62 @@ async def get_player(telegram_id: int):
 @app.post("/rooms/")
 async def create_room(room: RoomCreate):
     """Создание новой комнаты"""
-    conn = sqlite3.connect('badminton.db')
-    cursor = conn.cursor()
-    
-    try:
-        # Проверяем, не создал ли уже пользователь комнату
-        cursor.execute('SELECT id FROM rooms WHERE creator_id = ? AND is_active = 1', (room.creator_id,))
-        existing_room = cursor.fetchone()
-        
-        if existing_room:
-            raise HTTPException(
-                status_code=400, 
-                detail="Вы уже создали активную комнату. Сначала завершите или удалите существующую."
-            )
-        
-        # Создаем комнату
-        cursor.execute('''
-            INSERT INTO rooms (name, creator_id, max_players, is_active, is_game_started)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (room.name, room.creator_id, 4, True, False))
-        
-        room_id = cursor.lastrowid
-        
-        # Добавляем создателя как участника и лидера
-        cursor.execute('''
-            INSERT INTO room_members (room_id, player_id, is_leader)
-            VALUES (?, ?, ?)
-        ''', (room_id, room.creator_id, True))
-        
-        conn.commit()
+    def work(conn):
+        cursor = conn.cursor()
         
-        return {
-            "id": room_id,
-            "name": room.name,
-            "creator_id": room.creator_id,
-            "max_players": 4,
-            "is_active": True,
-            "is_game_started": False,
-            "member_count": 1
-        }
-        
-    except sqlite3.IntegrityError:
-        raise HTTPException(status_code=400, detail="Ошибка создания комнаты")
-    finally:
-        conn.close()
+        try:
+            # Проверяем, не создал ли уже пользователь комнату
+            cursor.execute(ACTIVE_ROOM_BY_CREATOR_SQL, (room.creator_id,))
+            existing_room = cursor.fetchone()
+            
+            if existing_room:
+                raise HTTPException(
+                    status_code=400, 
+                    detail="Вы уже создали активную комнату. Сначала завершите или удалите существующую."
+                )
+            
+            # Создаем комнату
+            cursor.execute('''
+                INSERT INTO rooms (name, creator_id, max_players, is_active, is_game_started)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (room.name, room.creator_id, 4, True, False))
+            
+            room_id = cursor.lastrowid
+            
+            # Добавляем создателя как участника и лидера
+            cursor.execute('''
+                INSERT INTO room_members (room_id, player_id, is_leader)
+                VALUES (?, ?, ?)
+            ''', (room_id, room.creator_id, True))
+            
+            conn.commit()
+            
+            return {
+                "id": room_id,
+                "name": room.name,
+                "creator_id": room.creator_id,
+                "max_players": 4,
+                "is_active": True,
+                "is_game_started": False,
+                "member_count": 1
+            }
+            
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=400, detail="Ошибка создания комнаты")
+    
+    return await sql.write(work)
 
 @app.get("/rooms/")
 async def get_rooms():
     """Получение списка комнат"""
-    conn = sqlite3.connect('badminton.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT r.*, COUNT(rm.id) as member_count
-        FROM rooms r
-        LEFT JOIN room_members rm ON r.id = rm.room_id
-        WHERE r.is_active = 1
-        GROUP BY r.id
-    ''')
+    def work(conn):
+        cursor = conn.cursor()
+        # Число участников уже в строке комнаты — без JOIN и GROUP BY
+        cursor.execute(ROOMS_LIST_SQL)
+        return cursor.fetchall()
     
     rooms = []
-    for row in cursor.fetchall():
+    for row in await sql.read(work):
         rooms.append({
             "id": row[0],
             "name": row[1],
@@ -239,36 +285,39 @@ async def get_rooms():
             "max_players": row[3],
             "is_active": bool(row[4]),
             "is_game_started": bool(row[5]),
-            "member_count": row[7] or 0
+            "member_count": row[6]
         })
     
-    conn.close()
     return {"rooms": rooms, "total": len(rooms)}
 
 @app.get("/rooms/{room_id}")
 async def get_room(room_id: int):
     """Получение деталей комнаты"""
-    conn = sqlite3.connect('badminton.db')
-    cursor = conn.cursor()
+    def work(conn):
+        cursor = conn.cursor()
+        
+        # Получаем информацию о комнате
+        cursor.execute('SELECT * FROM rooms WHERE id = ?', (room_id,))
+        room = cursor.fetchone()
+        if not room:
+            return None, []
+        
+        # Получаем участников
+        cursor.execute('''
+            SELECT rm.*, p.first_name, p.last_name, p.rating
+            FROM room_members rm
+            JOIN players p ON rm.player_id = p.id
+            WHERE rm.room_id = ?
+        ''', (room_id,))
+        return room, cursor.fetchall()
     
-    # Получаем информацию о комнате
-    cursor.execute('SELECT * FROM rooms WHERE id = ?', (room_id,))
-    room = cursor.fetchone()
+    room, rows = await sql.read(work)
     
     if not room:
-        conn.close()
         raise HTTPException(status_code=404, detail="Комната не найдена")
     
-    # Получаем участников
-    cursor.execute('''
-        SELECT rm.*, p.first_name, p.last_name, p.rating
-        FROM room_members rm
-        JOIN players p ON rm.player_id = p.id
-        WHERE rm.room_id = ?
-    ''', (room_id,))
-    
     members = []
-    for row in cursor.fetchall():
+    for row in rows:
         members.append({
             "id": row[0],
             "player": {
@@ -281,8 +330,6 @@ async def get_room(room_id: int):
             "is_leader": bool(row[1])
         })
     
-    conn.close()
-    
     return {
         "id": room[0],
         "name": room[1],
@@ -297,10 +344,9 @@ async def get_room(room_id: int):
 @app.get("/rooms/{room_id}/members")
 async def get_room_members(room_id: int):
     """Получение списка участников комнаты"""
-    conn = sqlite3.connect('badminton.db')
-    cursor = conn.cursor()
-    
-    try:
+    def work(conn):
+        cursor = conn.cursor()
+        
         # Получаем участников с их именами
         cursor.execute('''
             SELECT rm.player_id, rm.is_leader, p.first_name, p.last_name, p.rating
@@ -309,35 +355,36 @@ async def get_room_members(room_id: int):
             WHERE rm.room_id = ?
             ORDER BY rm.is_leader DESC, p.first_name
         ''', (room_id,))
-        
-        members = []
-        for row in cursor.fetchall():
-            player_id, is_leader, first_name, last_name, rating = row
-            members.append({
-                "player_id": player_id,
-                "is_leader": bool(is_leader),
-                "name": f"{first_name} {last_name}",
-                "rating": rating
-            })
-        
-        return {
-            "room_id": room_id,
-            "members": members,
-            "total_count": len(members)
-        }
-        
+        return cursor.fetchall()
+    
+    try:
+        rows = await sql.read(work)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка получения участников: {str(e)}")
-    finally:
-        conn.close()
+    
+    members = []
+    for row in rows:
+        player_id, is_leader, first_name, last_name, rating = row
+        members.append({
+            "player_id": player_id,
+            "is_leader": bool(is_leader),
+            "name": f"{first_name} {last_name}",
+            "rating": rating
+        })
+    
+    return {
+        "room_id": room_id,
+        "members": members,
+        "total_count": len(members)
+    }
 
 @app.post("/rooms/{room_id}/join")
 async def join_room(room_id: int, player_id: int | None = Query(None), telegram_id: int | None = Query(None)):
     """Присоединение к комнате. Принимает player_id или telegram_id."""
-    conn = sqlite3.connect('badminton.db')
-    cursor = conn.cursor()
+    def work(conn):
+        nonlocal player_id
+        cursor = conn.cursor()
 
-    try:
         # Разрешаем telegram_id → player_id, если явно не передали player_id
         if player_id is None:
             if telegram_id is None:
@@ -349,19 +396,16 @@ async def join_room(room_id: int, player_id: int | None = Query(None), telegram_
             player_id = int(row[0])
 
         # Проверяем, не в комнате ли уже игрок
-        cursor.execute('SELECT id FROM room_members WHERE room_id = ? AND player_id = ?', (room_id, player_id))
+        cursor.execute(MEMBERSHIP_SQL, (room_id, player_id))
         if cursor.fetchone():
             return {"success": True, "message": "Уже в комнате"}
 
         # Проверяем количество участников
-        cursor.execute('SELECT COUNT(*) FROM room_members WHERE room_id = ?', (room_id,))
-        member_count = cursor.fetchone()[0]
-
-        cursor.execute('SELECT max_players FROM rooms WHERE id = ?', (room_id,))
-        max_players_row = cursor.fetchone()
-        if not max_players_row:
+        cursor.execute(ROOM_CAPACITY_SQL, (room_id,))
+        capacity = cursor.fetchone()
+        if not capacity:
             raise HTTPException(status_code=404, detail="Комната не найдена")
-        max_players = max_players_row[0]
+        member_count, max_players = capacity
 
         if member_count >= max_players:
             raise HTTPException(status_code=400, detail="Комната заполнена")
@@ -374,18 +418,17 @@ async def join_room(room_id: int, player_id: int | None = Query(None), telegram_
 
         conn.commit()
         return {"success": True, "message": "Успешно присоединились к комнате"}
-    finally:
-        conn.close()
+
+    return await sql.write(work)
 
 @app.post("/rooms/{room_id}/start")
 async def start_game(room_id: int, leader_data: dict):
     """Начало игры (только для лидера)"""
     leader_id = leader_data.get('leader_id')
     
-    conn = sqlite3.connect('badminton.db')
-    cursor = conn.cursor()
-    
-    try:
+    def work(conn):
+        cursor = conn.cursor()
+        
         # Проверяем, что пользователь действительно лидер этой комнаты
         cursor.execute('''
             SELECT is_leader FROM room_members 
@@ -397,7 +440,7 @@ async def start_game(room_id: int, leader_data: dict):
             raise HTTPException(status_code=403, detail="Только лидер может начать игру")
         
         # Проверяем количество участников
-        cursor.execute('SELECT COUNT(*) FROM room_members WHERE room_id = ?', (room_id,))
+        cursor.execute(ROOM_CAPACITY_SQL, (room_id,))
         member_count = cursor.fetchone()[0]
         
         if member_count < 2:
@@ -420,35 +463,36 @@ async def start_game(room_id: int, leader_data: dict):
             "member_count": member_count,
             "game_type": "1v1" if member_count == 2 else "2v2"
         }
-        
+    
+    try:
+        return await sql.write(work)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка начала игры: {str(e)}")
-    finally:
-        conn.close()
 
 @app.post("/games/")
 async def create_game(game: GameCreate):
     """Создание игры"""
-    conn = sqlite3.connect('badminton.db')
-    cursor = conn.cursor()
-    
     # Определяем победителя
     winner_team = 1 if game.score_team1 > game.score_team2 else 2
     
-    # Создаем запись об игре
-    cursor.execute('''
-        INSERT INTO games (room_id, score_team1, score_team2, winner_team)
-        VALUES (?, ?, ?, ?)
-    ''', (game.room_id, game.score_team1, game.score_team2, winner_team))
-    
-    game_id = cursor.lastrowid
-    
-    # Завершаем игру
-    cursor.execute('UPDATE rooms SET is_game_started = 0 WHERE id = ?', (game.room_id,))
+    def work(conn):
+        cursor = conn.cursor()
+        
+        # Создаем запись об игре
+        cursor.execute('''
+            INSERT INTO games (room_id, score_team1, score_team2, winner_team)
+            VALUES (?, ?, ?, ?)
+        ''', (game.room_id, game.score_team1, game.score_team2, winner_team))
+        
+        game_id = cursor.lastrowid
+        
+        # Завершаем игру
+        cursor.execute('UPDATE rooms SET is_game_started = 0 WHERE id = ?', (game.room_id,))
+        
+        conn.commit()
+        return game_id
     
-    conn.commit()
-    conn.close()
+    game_id = await sql.write(work)
     
     return {
         "id": game_id,
@@ -465,10 +509,9 @@ async def clear_all_rooms(admin_id: int = Query(..., description="ID админ
     if admin_id != 972717950:
         raise HTTPException(status_code=403, detail="Доступ запрещен")
     
-    conn = sqlite3.connect('badminton.db')
-    cursor = conn.cursor()
-    
-    try:
+    def work(conn):
+        cursor = conn.cursor()
+        
         # Удаляем всех участников комнат
         cursor.execute('DELETE FROM room_members')
         
@@ -479,14 +522,14 @@ async def clear_all_rooms(admin_id: int = Query(..., description="ID админ
         cursor.execute('DELETE FROM rooms')
         
         conn.commit()
-        
-        return {"message": "Все комнаты успешно очищены", "deleted_rooms": cursor.rowcount}
-        
+        return cursor.rowcount
+    
+    try:
+        deleted_rooms = await sql.write(work)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=f"Ошибка очистки: {str(e)}")
-    finally:
-        conn.close()
+    
+    return {"message": "Все комнаты успешно очищены", "deleted_rooms": deleted_rooms}
 
 # Serve the main HTML page
 @app.get("/app", response_class=HTMLResponse)
@@ -0,0 +1,168 @@
+"""
+Журнал изменений и снимки для in-memory хранилищ API.
+
+Каждое изменение дописывается строкой JSON в журнал текущего поколения
+(journal-<N>.log). Запись идёт в буфер, на диск её сбрасывает фоновый
+поток раз в fsync_interval, поэтому запрос не ждёт диска. Периодически
+состояние целиком пишется в snapshot.json, и журнал начинается заново.
+
+При старте читается снимок и затем все журналы его поколения и новее.
+"""
+
+import glob
+import json
+import os
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+SNAPSHOT_FILE = "snapshot.json"
+
+
+def _journal_path(directory: str, generation: int) -> str:
+    return os.path.join(directory, f"journal-{generation}.log")
+
+
+class MemoryJournal:
+    def __init__(self, directory: str, fsync_interval: float = 0.05, compact_every: int = 10000):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        os.makedirs(directory, exist_ok=True)
+
+        self.generation = 0
+        self.pending_ops = 0
+        self._file = None
+        self._dirty = False
+        self._compacting = False
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+
+    # ---- загрузка ----
+
+    def load(self) -> Tuple[Optional[Any], List[list]]:
+        """Читает снимок и хвост журнала. Возвращает (состояние из снимка, операции)."""
+        state = None
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self.generation = snapshot["generation"]
+            state = snapshot["state"]
+
+        ops: List[list] = []
+        for generation in self._journal_generations():
+            if generation < self.generation:
+                # Остался от прерванного сжатия — уже учтён в снимке
+                os.remove(_journal_path(self.directory, generation))
+                continue
+            ops.extend(self._read_journal(_journal_path(self.directory, generation)))
+            self.generation = max(self.generation, generation)
+
+        self.pending_ops = len(ops)
+        self._open_journal()
+        return state, ops
+
+    def _journal_generations(self) -> List[int]:
+        generations = []
+        for path in glob.glob(os.path.join(self.directory, "journal-*.log")):
+            try:
+                generations.append(int(os.path.basename(path)[len("journal-"):-len(".log")]))
+            except ValueError:
+                continue
+        return sorted(generations)
+
+    @staticmethod
+    def _read_journal(path: str) -> List[list]:
+        ops = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ops.append(json.loads(line))
+                except ValueError:
+                    # Недописанная последняя строка после падения процесса
+                    break
+        return ops
+
+    def _open_journal(self) -> None:
+        self._file = open(_journal_path(self.directory, self.generation), "a", encoding="utf-8")
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="memory-journal-fsync", daemon=True)
+            self._flusher.start()
+
+    # ---- запись ----
+
+    def append(self, op: list) -> bool:
+        """Дописывает операцию. Возвращает True, когда пора делать снимок."""
+        line = json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._write_lock:
+            self._file.write(line)
+            self._dirty = True
+            self.pending_ops += 1
+            if self.pending_ops >= self.compact_every and not self._compacting:
+                self._compacting = True
+                return True
+        return False
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.fsync_interval):
+            self.sync()
+
+    def sync(self) -> None:
+        """Сбрасывает буфер журнала и делает fsync (одна операция на пачку записей)."""
+        with self._write_lock:
+            if not self._dirty:
+                return
+            self._file.flush()
+            fd = self._file.fileno()
+            self._dirty = False
+        try:
+            os.fsync(fd)
+        except OSError:
+            # Файл уже закрыт сжатием — его содержимое синхронизировано там
+            pass
+
+    # ---- снимки ----
+
+    def compact(self, dump_state: Callable[[], Any], freeze: Callable[[], Any]) -> None:
+        """Пишет снимок и начинает новый журнал.
+
+        freeze() — контекстный менеджер, останавливающий изменения хранилища
+        на время снятия копии; dump_state() возвращает сериализуемое состояние.
+        """
+        try:
+            with freeze():
+                state_json = json.dumps(dump_state(), ensure_ascii=False, separators=(",", ":"))
+                with self._write_lock:
+                    old_generation = self.generation
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    self._file.close()
+                    self.generation += 1
+                    self._file = open(_journal_path(self.directory, self.generation), "a", encoding="utf-8")
+                    self._dirty = False
+                    self.pending_ops = 0
+
+            snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+            tmp_path = snapshot_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write('{"generation":%d,"state":' % self.generation)
+                f.write(state_json)
+                f.write("}")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, snapshot_path)
+            for generation in self._journal_generations():
+                if generation <= old_generation:
+                    os.remove(_journal_path(self.directory, generation))
+        finally:
+            self._compacting = False
+
+    def close(self) -> None:
+        self._stop.set()
+        self.sync()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
@@ -0,0 +1,126 @@
+"""
+Компактные записи in-memory хранилища (api/index.py): игроки, комнаты, участники.
+
+Классы со __slots__ вместо вложенных словарей. Участник комнаты ссылается
+на игрока по telegram_id, поэтому данные игрока хранятся в одном месте.
+Для ответов API записи превращаются в словари (to_dict), для снимка
+и журнала — в короткие списки (to_state / from_state).
+"""
+
+from typing import Dict, List, Optional
+
+
+class Player:
+    __slots__ = ("telegram_id", "first_name", "last_name", "username", "rating")
+
+    def __init__(self, telegram_id: int, first_name: str, last_name: Optional[str] = None,
+                 username: Optional[str] = None, rating: float = 1500):
+        self.telegram_id = telegram_id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.username = username
+        self.rating = rating
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name or ''}".strip()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.telegram_id,
+            "telegram_id": self.telegram_id,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "username": self.username,
+            "rating": self.rating,
+        }
+
+    def to_state(self) -> list:
+        return [self.telegram_id, self.first_name, self.last_name, self.username, self.rating]
+
+    @classmethod
+    def from_state(cls, state: list) -> "Player":
+        return cls(*state)
+
+
+def unknown_player(telegram_id: int) -> Player:
+    """Заглушка для игрока, которого нет в хранилище"""
+    return Player(telegram_id, "Неизвестный", "Игрок")
+
+
+class Member:
+    __slots__ = ("id", "player_id", "is_leader", "joined_at")
+
+    def __init__(self, member_id: int, player_id: int, is_leader: bool, joined_at: str):
+        self.id = member_id
+        self.player_id = player_id
+        self.is_leader = is_leader
+        self.joined_at = joined_at
+
+    def to_dict(self, players: Dict[int, Player]) -> dict:
+        player = players.get(self.player_id) or unknown_player(self.player_id)
+        return {
+            "id": self.id,
+            "player": player.to_dict(),
+            "is_leader": self.is_leader,
+            "joined_at": self.joined_at,
+        }
+
+    def to_state(self) -> list:
+        return [self.id, self.player_id, self.is_leader, self.joined_at]
+
+
+class Room:
+    __slots__ = (
+        "id", "name", "creator_id", "creator_full_name", "max_players",
+        "is_active", "created_at", "members", "result",
+    )
+
+    def __init__(self, room_id: int, name: str, creator_id: int, creator_full_name: str,
+                 max_players: int, created_at: str, members: List[Member],
+                 is_active: bool = True, result: Optional[dict] = None):
+        self.id = room_id
+        self.name = name
+        self.creator_id = creator_id
+        self.creator_full_name = creator_full_name
+        self.max_players = max_players
+        self.is_active = is_active
+        self.created_at = created_at
+        self.members = members
+        # Итог игры (game_finished, final_score, rating_changes, finished_at)
+        self.result = result
+
+    @property
+    def member_count(self) -> int:
+        return len(self.members)
+
+    def to_dict(self, players: Dict[int, Player]) -> dict:
+        data = {
+            "id": self.id,
+            "name": self.name,
+            "creator_id": self.creator_id,
+            "creator_full_name": self.creator_full_name,
+            "max_players": self.max_players,
+            "member_count": len(self.members),
+            "is_active": self.is_active,
+            "created_at": self.created_at,
+            "members": [member.to_dict(players) for member in self.members],
+        }
+        if self.result:
+            data.update(self.result)
+        return data
+
+    def to_state(self) -> list:
+        return [
+            self.id, self.name, self.creator_id, self.creator_full_name, self.max_players,
+            self.created_at, [member.to_state() for member in self.members],
+            self.is_active, self.result,
+        ]
+
+    @classmethod
+    def from_state(cls, state: list) -> "Room":
+        room_id, name, creator_id, creator_full_name, max_players, created_at, members, is_active, result = state
+        return cls(
+            room_id, name, creator_id, creator_full_name, max_players, created_at,
+            [Member(*member) for member in members], is_active, result,
+        )
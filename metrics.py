@@ -0,0 +1,198 @@
+"""
+Метрики API в формате Prometheus.
+
+Под gunicorn с несколькими воркерами значения складываются через
+каталог PROMETHEUS_MULTIPROC_DIR (задаётся в gunicorn.conf.py до импорта
+prometheus_client). Без него используется обычный реестр процесса.
+"""
+
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Запросы, обрабатываемые в данный момент",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Соединения, выданные из пула БД",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Выданные соединения сверх pool_size (overflow)",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Ожидание соединения из пула БД сессией (очередь при исчерпанном пуле и открытие нового)",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_CONNECT = Histogram(
+    "db_connect_seconds",
+    "Открытие нового соединения с БД пулом",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+RATING_UPDATES = Counter(
+    "rating_updates_total",
+    "Пересчёты рейтинга Glicko-2 после игр",
+)
+RATING_UPDATE_LATENCY = Histogram(
+    "rating_update_seconds",
+    "Время пересчёта рейтинга Glicko-2",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+OPEN_ROOMS = Gauge(
+    "open_rooms",
+    "Активные комнаты (значение на момент последнего /metrics)",
+    multiprocess_mode="mostrecent",
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Обращения к кэшам ответов",
+    ["cache", "result"],
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+# Начало транзакции сессии, ещё не получившей соединение (см. install_pool_metrics)
+_wait_started: ContextVar[Optional[float]] = ContextVar("db_pool_wait_started", default=None)
+
+
+def install_pool_metrics(engine, session_factory=None) -> None:
+    """Отслеживает занятость пула, ожидание соединения и открытие новых соединений.
+
+    Только события SQLAlchemy: слушатели пула переносятся в новый пул при
+    engine.dispose() и пересоздании. Событие checkin приходит до возврата
+    соединения в очередь, поэтому выданные соединения считаем сами;
+    отсоединённые (detach) в пул уже не вернутся и вычитаются сразу.
+
+    Ожидание: сессия начинает транзакцию (after_transaction_create) прямо
+    перед тем, как взять соединение, и событие checkout его завершает —
+    между ними очередь пула при исчерпании и открытие нового соединения."""
+    checked_out = 0
+    lock = threading.Lock()
+
+    def _update_pool_gauges(delta):
+        nonlocal checked_out
+        with lock:
+            checked_out += delta
+            value = checked_out
+        DB_POOL_CHECKED_OUT.set(value)
+        size = getattr(engine.pool, "size", None)
+        if callable(size):
+            DB_POOL_OVERFLOW.set(max(value - size(), 0))
+
+    @event.listens_for(engine, "do_connect")
+    def _on_do_connect(dialect, connection_record, cargs, cparams):
+        connection_record.info["connect_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        started = connection_record.info.pop("connect_started", None)
+        if started is not None:
+            DB_CONNECT.observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        started = _wait_started.get()
+        if started is not None:
+            _wait_started.set(None)
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+        _update_pool_gauges(1)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        _update_pool_gauges(-1)
+
+    @event.listens_for(engine, "detach")
+    def _on_detach(dbapi_connection, connection_record):
+        _update_pool_gauges(-1)
+
+    if session_factory is None:
+        return
+
+    @event.listens_for(session_factory, "after_transaction_create")
+    def _on_transaction_create(session, transaction):
+        if transaction.parent is None:
+            _wait_started.set(time.perf_counter())
+
+    @event.listens_for(session_factory, "after_transaction_end")
+    def _on_transaction_end(session, transaction):
+        # Транзакция без запросов соединение так и не взяла
+        if transaction.parent is None:
+            _wait_started.set(None)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: латентность по маршрутам и число запросов в работе."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # Шаблон маршрута, а не сырой путь — иначе id комнат раздувают число серий
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                method=scope.get("method", ""),
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - started)
+
+
+def render_metrics():
+    """Возвращает (тело, content-type) со сводкой по всем воркерам."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Вызывается из gunicorn child_exit: убирает live-метрики умершего воркера."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
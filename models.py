@@ -1,7 +1,10 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
-from database import Base
+
+# Base without an engine: the same models serve database.py (Postgres)
+# and database_sqlite.py (SQLite), importing them connects to nothing
+Base = declarative_base()
 
 class Player(Base):
     __tablename__ = "players"
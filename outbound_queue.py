@@ -0,0 +1,246 @@
+"""
+Очередь исходящих сообщений Telegram для bot_simple_api.py.
+
+Telegram ограничивает отправку: около 30 сообщений в секунду на бота,
+около одного в секунду в личный чат и 20 в минуту в группу. Очередь
+соблюдает эти лимиты корзинами токенов (общей и на каждый чат), шлёт
+в разные чаты параллельно, а в один чат — по порядку. Ответ 429
+повторяется автоматически через retry_after из ответа Telegram.
+
+enqueue только ставит сообщение в очередь: о том, что сообщение так и не
+доставлено (ошибка Telegram или исчерпаны повторы), сообщает on_failure.
+
+    outbound = OutboundQueue(deliver, on_failure=report)   # deliver(payload) -> (status, json)
+    outbound.enqueue(chat_id, {"chat_id": chat_id, "text": "..."})  # сразу возвращает управление
+    ...
+    outbound.close()                      # дождаться отправки всего, что в очереди
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+# Лимиты Telegram: сообщений в секунду на бота и в личный чат, в минуту — в группу
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_GROUP_RATE_PER_MIN = float(os.getenv("TELEGRAM_GROUP_RATE_PER_MIN", "20"))
+# Потоков-отправителей (одновременных запросов к Telegram)
+OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "4"))
+# Повторов одного сообщения (429, 5xx, сетевые ошибки), после — сообщение отбрасывается
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "5"))
+
+OUTBOUND_QUEUE_DEPTH = Gauge(
+    "bot_outbound_queue_depth",
+    "Исходящие сообщения, ожидающие отправки",
+)
+OUTBOUND_SENT = Counter(
+    "bot_outbound_messages_total",
+    "Исходящие сообщения по результату",
+    ["result"],
+)
+
+Deliver = Callable[[Dict[str, Any]], Tuple[int, Optional[Dict[str, Any]]]]
+# on_failure(chat_id, payload, status, json ответа) — сообщение отброшено
+OnFailure = Callable[[Hashable, Dict[str, Any], int, Optional[Dict[str, Any]]], None]
+
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не больше burst про запас"""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Сколько секунд ждать свободный токен (0 — есть сейчас)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class _Chat:
+    __slots__ = ("messages", "bucket", "attempts", "busy")
+
+    def __init__(self, bucket: TokenBucket):
+        self.messages: Deque[Dict[str, Any]] = deque()
+        self.bucket = bucket
+        self.attempts = 0
+        # Сообщение чата сейчас отправляется или чат стоит в расписании
+        self.busy = False
+
+
+def chat_bucket(chat_id: Hashable) -> TokenBucket:
+    """Лимит чата: группы (отрицательный chat_id) — в минуту, личные чаты — в секунду"""
+    if isinstance(chat_id, int) and chat_id < 0:
+        return TokenBucket(TELEGRAM_GROUP_RATE_PER_MIN / 60)
+    return TokenBucket(TELEGRAM_CHAT_RATE)
+
+
+def retry_after(status: int, body: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Через сколько секунд повторить отправку; None — повторять не нужно"""
+    if status == 429:
+        return float(((body or {}).get("parameters") or {}).get("retry_after", 1))
+    if status >= 500:
+        return 1.0
+    return None
+
+
+class OutboundQueue:
+    """Исходящие сообщения с общим и початовым лимитом, порядок внутри чата сохраняется"""
+
+    # Сколько чатов держать, прежде чем забывать простаивающие (их корзины уже полны)
+    MAX_IDLE_CHATS = 1024
+    # Не чаще раза в столько секунд: проход по всем чатам идёт под общей блокировкой
+    PRUNE_INTERVAL = 60.0
+
+    def __init__(self, deliver: Deliver, workers: int = OUTBOUND_WORKERS,
+                 global_rate: float = TELEGRAM_GLOBAL_RATE, max_retries: int = OUTBOUND_MAX_RETRIES,
+                 bucket: Callable[[Hashable], TokenBucket] = chat_bucket,
+                 on_failure: Optional[OnFailure] = None):
+        self.deliver = deliver
+        self.on_failure = on_failure
+        self.workers = workers
+        self.max_retries = max_retries
+        self.bucket = bucket
+        self._global = TokenBucket(global_rate, burst=global_rate)
+        self._cond = threading.Condition()
+        self._chats: Dict[Hashable, _Chat] = {}
+        # Расписание чатов: (не раньше, порядковый номер, chat_id)
+        self._schedule: List[Tuple[float, int, Hashable]] = []
+        self._order = itertools.count()
+        self._pending = 0
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+        self._pruned_at = time.monotonic()
+
+    def enqueue(self, chat_id: Hashable, payload: Dict[str, Any]) -> None:
+        """Ставит сообщение в очередь и сразу возвращает управление"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("OutboundQueue закрыта")
+            if not self._threads:
+                self._start()
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _Chat(self.bucket(chat_id))
+            chat.messages.append(payload)
+            self._pending += 1
+            OUTBOUND_QUEUE_DEPTH.inc()
+            if not chat.busy:
+                self._plan(chat_id, chat, time.monotonic())
+
+    def pending(self) -> int:
+        """Сообщений в очереди и в отправке"""
+        with self._cond:
+            return self._pending
+
+    def _start(self) -> None:
+        self._threads = [
+            threading.Thread(target=self._work, name=f"bot-outbound-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _plan(self, chat_id: Hashable, chat: _Chat, not_before: float) -> None:
+        # Вызывается под self._cond
+        chat.busy = True
+        heapq.heappush(self._schedule, (not_before, next(self._order), chat_id))
+        self._cond.notify_all()
+
+    def _next(self) -> Optional[Tuple[Hashable, _Chat, Dict[str, Any]]]:
+        """Ближайшее сообщение, которое можно отправить, с учётом обоих лимитов"""
+        with self._cond:
+            while True:
+                if not self._schedule:
+                    if self._closed:
+                        return None
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                not_before, _, chat_id = self._schedule[0]
+                if not_before > now:
+                    self._cond.wait(not_before - now)
+                    continue
+                heapq.heappop(self._schedule)
+                chat = self._chats[chat_id]
+                # Токен списывается только когда свободны оба лимита
+                wait = max(chat.bucket.delay(now), self._global.delay(now))
+                if wait:
+                    heapq.heappush(self._schedule, (now + wait, next(self._order), chat_id))
+                    continue
+                chat.bucket.take(now)
+                self._global.take(now)
+                return chat_id, chat, chat.messages[0]
+
+    def _work(self) -> None:
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            chat_id, chat, payload = job
+            try:
+                status, body = self.deliver(payload)
+            except Exception as e:
+                print(f"❌ Ошибка отправки в чат {chat_id}: {e}")
+                status, body = 599, None
+            delay = retry_after(status, body)
+            with self._cond:
+                now = time.monotonic()
+                if delay is not None and chat.attempts < self.max_retries:
+                    chat.attempts += 1
+                    OUTBOUND_SENT.labels(result="retried").inc()
+                    print(f"⏳ Telegram ответил {status}, повтор в чат {chat_id} через {delay:.1f} с")
+                    self._plan(chat_id, chat, now + delay)
+                    continue
+                OUTBOUND_SENT.labels(result="sent" if status == 200 else "failed").inc()
+                chat.messages.popleft()
+                chat.attempts = 0
+                self._pending -= 1
+                OUTBOUND_QUEUE_DEPTH.dec()
+                if chat.messages:
+                    self._plan(chat_id, chat, now)
+                else:
+                    chat.busy = False
+                    if len(self._chats) > self.MAX_IDLE_CHATS and now - self._pruned_at >= self.PRUNE_INTERVAL:
+                        self._prune(now)
+                    self._cond.notify_all()
+            if status != 200 and self.on_failure is not None:
+                try:
+                    self.on_failure(chat_id, payload, status, body)
+                except Exception as e:
+                    print(f"❌ Ошибка обработчика недоставленного сообщения: {e}")
+
+    def _prune(self, now: float) -> None:
+        # Вызывается под self._cond: забываем простаивающие чаты с полной корзиной
+        self._pruned_at = now
+        for chat_id in [key for key, chat in self._chats.items() if not chat.busy and chat.bucket.full(now)]:
+            del self._chats[chat_id]
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Дожидается отправки всех сообщений и останавливает потоки"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending == 0, timeout)
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
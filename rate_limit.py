@@ -0,0 +1,207 @@
+"""
+Ограничение частоты запросов (token bucket) по пользователю Telegram или IP.
+
+Ключ — проверенный telegram_id из initData Mini App (заголовок
+X-Telegram-Init-Data, подпись токеном бота, см. telegram_auth.py), иначе
+адрес клиента: X-Forwarded-For учитывается только от доверенных прокси
+(RATE_LIMIT_TRUSTED_PROXIES). Неподписанные ?telegram_id= и X-Telegram-Id
+не учитываются — их подставляет сам клиент. Бот шлёт запросы всех
+пользователей с одного адреса и подписывает их ключом X-Bot-Key — такие
+запросы лимиту не подлежат; адреса без лимита — RATE_LIMIT_EXEMPT_CLIENTS.
+
+Состояние корзин хранится в общем mmap-файле, поэтому лимиты действуют
+на все воркеры gunicorn сразу. Проверка — хэш ключа, несколько слотов
+открытой адресации под flock, без обращений к БД.
+"""
+
+import hashlib
+import ipaddress
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: только блокировка внутри процесса
+    fcntl = None
+
+from fastapi import HTTPException, Request
+
+import telegram_auth
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_STATE_FILE = os.getenv("RATE_LIMIT_STATE_FILE", "/tmp/badminton-rating-ratelimit.bin")
+RATE_LIMIT_SLOTS = int(os.getenv("RATE_LIMIT_SLOTS", "65536"))
+# Адреса/подсети прокси через запятую, чьему X-Forwarded-For можно верить;
+# "*" — любой непосредственный собеседник (платформа вроде Render/Vercel,
+# где адрес балансировщика заранее неизвестен): клиент — последний адрес,
+# который дописала платформа
+RATE_LIMIT_TRUSTED_PROXIES = os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "")
+# Клиенты без лимита (адреса/подсети через запятую), например сервер бота
+RATE_LIMIT_EXEMPT_CLIENTS = os.getenv("RATE_LIMIT_EXEMPT_CLIENTS", "")
+# Сколько секунд initData Mini App считается действительным
+RATE_LIMIT_INIT_DATA_MAX_AGE = int(os.getenv("RATE_LIMIT_INIT_DATA_MAX_AGE", "86400"))
+
+# (запросов в секунду, размер корзины) по шаблону маршрута
+ROUTE_LIMITS: Dict[Tuple[str, str], Tuple[float, float]] = {
+    ("GET", "/rooms/"): (2.0, 10.0),
+    ("GET", "/rooms/{room_id}"): (4.0, 20.0),
+    ("GET", "/players"): (1.0, 5.0),
+    ("POST", "/games"): (0.5, 5.0),
+    ("POST", "/rooms/"): (0.5, 5.0),
+    ("GET", "/tournaments/{tournament_id}/report"): (1.0, 5.0),
+}
+DEFAULT_LIMIT: Tuple[float, float] = (10.0, 30.0)
+EXEMPT_ROUTES = {"/health", "/metrics"}
+
+# Сколько соседних слотов проверяем при коллизии хэшей
+_PROBES = 8
+
+
+class SharedTokenBucket:
+    """Таблица token bucket в mmap-файле, общая для всех процессов."""
+
+    # хэш ключа (0 — пустой слот), остаток токенов, время последнего обновления
+    SLOT = struct.Struct("<Qdd")
+
+    def __init__(self, path: str = RATE_LIMIT_STATE_FILE, slots: int = RATE_LIMIT_SLOTS):
+        self.slots = slots
+        size = self.SLOT.size * slots
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._thread_lock = threading.Lock()
+
+    def _lock(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def _unlock(self):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def acquire(self, key: str, rate: float, burst: float, now: Optional[float] = None) -> float:
+        """Берёт токен для ключа. Возвращает 0, если можно, иначе секунды до следующего токена."""
+        if now is None:
+            now = time.time()
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+        start = key_hash % self.slots
+        slot_size = self.SLOT.size
+
+        self._lock()
+        try:
+            target = None
+            oldest = None
+            tokens, updated_at = burst, now
+            for i in range(_PROBES):
+                offset = ((start + i) % self.slots) * slot_size
+                slot_hash, slot_tokens, slot_updated = self.SLOT.unpack_from(self._map, offset)
+                if slot_hash == key_hash:
+                    target = offset
+                    tokens, updated_at = slot_tokens, slot_updated
+                    break
+                if slot_hash == 0:
+                    if target is None:
+                        target = offset
+                    break
+                if oldest is None or slot_updated < oldest[1]:
+                    oldest = (offset, slot_updated)
+            if target is None:
+                # Окно занято — вытесняем самую давнюю корзину (она почти наверняка полная)
+                target = oldest[0]
+
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            if tokens >= 1.0:
+                self.SLOT.pack_into(self._map, target, key_hash, tokens - 1.0, now)
+                return 0.0
+            self.SLOT.pack_into(self._map, target, key_hash, tokens, now)
+            return (1.0 - tokens) / rate
+        finally:
+            self._unlock()
+
+
+_bucket: Optional[SharedTokenBucket] = None
+
+
+def get_bucket() -> SharedTokenBucket:
+    global _bucket
+    if _bucket is None:
+        _bucket = SharedTokenBucket()
+    return _bucket
+
+
+def _networks(value: str):
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+
+def _in_networks(address: str, networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+TRUST_ANY_PROXY = RATE_LIMIT_TRUSTED_PROXIES.strip() == "*"
+TRUSTED_PROXIES = [] if TRUST_ANY_PROXY else _networks(RATE_LIMIT_TRUSTED_PROXIES)
+EXEMPT_CLIENTS = _networks(RATE_LIMIT_EXEMPT_CLIENTS)
+
+
+def client_ip(request: Request) -> str:
+    """IP клиента: X-Forwarded-For читается справа налево и только от доверенных прокси."""
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded or not (TRUST_ANY_PROXY or _in_networks(peer, TRUSTED_PROXIES)):
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    if TRUST_ANY_PROXY:
+        # Левые адреса мог дописать сам клиент; правый добавила платформа
+        return hops[-1] if hops else peer
+    for hop in reversed(hops):
+        if not _in_networks(hop, TRUSTED_PROXIES):
+            return hop
+    return hops[0] if hops else peer
+
+
+def client_key(request: Request) -> Optional[str]:
+    """Ключ корзины клиента; None — клиент без лимита (бот или RATE_LIMIT_EXEMPT_CLIENTS)."""
+    token = telegram_auth.BOT_TOKEN
+    if telegram_auth.is_bot_request(request.headers.get(telegram_auth.BOT_KEY_HEADER), token):
+        return None
+    user = telegram_auth.verify_init_data(
+        request.headers.get(telegram_auth.INIT_DATA_HEADER, ""), token, RATE_LIMIT_INIT_DATA_MAX_AGE
+    )
+    if user is not None:
+        return f"tg:{user['id']}"
+    ip = client_ip(request)
+    if _in_networks(ip, EXEMPT_CLIENTS):
+        return None
+    return f"ip:{ip}"
+
+
+async def enforce_rate_limit(request: Request) -> None:
+    """Глобальная зависимость FastAPI: 429 с Retry-After при превышении лимита маршрута."""
+    if not RATE_LIMIT_ENABLED:
+        return
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", request.url.path)
+    if route_path in EXEMPT_ROUTES:
+        return
+    client = client_key(request)
+    if client is None:
+        return
+    rate, burst = ROUTE_LIMITS.get((request.method, route_path), DEFAULT_LIMIT)
+    key = f"{request.method} {route_path}|{client}"
+    retry_after = get_bucket().acquire(key, rate, burst)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Слишком много запросов, попробуйте позже",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
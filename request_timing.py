@@ -0,0 +1,141 @@
+"""
+Профилирование запросов: число SQL-запросов, время в БД, в Glicko-2 и на сериализацию.
+
+Статистика собирается через события SQLAlchemy engine и отдаётся
+в заголовке Server-Timing и в структурированной строке лога.
+"""
+
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger("request_timing")
+
+# Предупреждение, если запрос выполнил больше SQL-запросов (признак N+1)
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "50"))
+
+
+class RequestStats:
+    __slots__ = ("queries", "sections", "started_at")
+
+    def __init__(self):
+        self.queries = 0
+        # Время по секциям в секундах: db, glicko, serialize
+        self.sections: Dict[str, float] = {}
+        self.started_at = time.perf_counter()
+
+    def add(self, section: str, seconds: float) -> None:
+        self.sections[section] = self.sections.get(section, 0.0) + seconds
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_section(section: str):
+    """Засекает время блока и добавляет его к секции текущего запроса."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.add(section, time.perf_counter() - started)
+
+
+def install_sqlalchemy_hooks(engine) -> None:
+    """Подписывается на события engine: считает запросы и время в БД."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started_at"].pop()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.add("db", time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse, который учитывает время кодирования тела как serialize."""
+
+    def render(self, content) -> bytes:
+        with track_section("serialize"):
+            return super().render(content)
+
+
+def _server_timing(stats: RequestStats, total: float) -> str:
+    parts = [f'db;dur={stats.sections.get("db", 0.0) * 1000:.2f};desc="{stats.queries} queries"']
+    for section in ("glicko", "serialize"):
+        if section in stats.sections:
+            parts.append(f"{section};dur={stats.sections[section] * 1000:.2f}")
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware: собирает RequestStats на время запроса и отдаёт Server-Timing."""
+
+    def __init__(self, app, query_budget: int = SQL_QUERY_BUDGET):
+        self.app = app
+        self.query_budget = query_budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", _server_timing(stats, time.perf_counter() - stats.started_at))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            self._log(scope, status_code, stats)
+
+    def _log(self, scope, status_code: int, stats: RequestStats) -> None:
+        record = {
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "status": status_code,
+            "queries": stats.queries,
+            "total_ms": round((time.perf_counter() - stats.started_at) * 1000, 2),
+        }
+        for section, seconds in stats.sections.items():
+            record[f"{section}_ms"] = round(seconds * 1000, 2)
+        line = json.dumps(record, ensure_ascii=False)
+        if stats.queries > self.query_budget:
+            logger.warning(f"⚠️ Превышен бюджет SQL-запросов ({self.query_budget}): {line}")
+        else:
+            logger.info(line)
@@ -0,0 +1,128 @@
+"""
+Таблица маршрутов для обработчиков на BaseHTTPRequestHandler
+(api/index.py, api.py, api_simple.py).
+
+Шаблоны вида /rooms/{room_id:int}/join разбираются при регистрации.
+Статические пути ищутся в словаре метода. Пути с параметрами разложены
+по корзинам (метод, число сегментов, первый сегмент), так что на запрос
+проверяется один-два кандидата, а не все маршруты. Разобранные пути
+запоминаются в словаре метода рядом со статическими (до CACHE_SIZE), и
+повторный опрос той же комнаты стоит одного поиска в словаре.
+
+Параметр совпадает с любым сегментом и приводится к типу из шаблона, как
+int(path.split('/')[-1]) в прежних цепочках if/elif: нечисловой id даёт
+ValueError, и обработчик отвечает 500, как и раньше.
+
+    ROUTES = RouteTable()
+
+    class handler(BaseHTTPRequestHandler):
+        @ROUTES.get("/rooms/{room_id:int}")
+        def get_room(self, data, room_id):
+            ...
+
+    route, params = ROUTES.match("GET", "/rooms/5")   # (get_room, {"room_id": 5})
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Тип параметра -> преобразование сегмента
+CONVERTERS = {
+    "int": int,
+    "str": str,
+}
+
+# Сколько разобранных путей с параметрами помнить на метод
+CACHE_SIZE = 4096
+
+_EMPTY: dict = {}
+
+
+class RouteTable:
+    def __init__(self):
+        # метод -> {путь: функция}
+        self._static: Dict[str, Dict[str, Callable]] = {}
+        # (метод, число сегментов, первый сегмент) ->
+        #     [(функция, ((номер, текст), ...) постоянных сегментов, ((номер, имя, преобразование), ...))]
+        self._dynamic: Dict[Tuple[str, int, str], List[tuple]] = {}
+        # метод -> {путь: (функция, параметры)}: статические пути и уже разобранные
+        self._paths: Dict[str, Dict[str, tuple]] = {}
+
+    def add(self, method: str, template: str, target: Callable) -> None:
+        segments = template.split("/")
+        literals = []
+        params = []
+        for index, segment in enumerate(segments):
+            if segment.startswith("{") and segment.endswith("}"):
+                name, _, kind = segment[1:-1].partition(":")
+                params.append((index, name, CONVERTERS[kind or "str"]))
+            else:
+                literals.append((index, segment))
+        if not params:
+            self._static.setdefault(method, {})[template] = target
+        else:
+            # Первый сегмент после "/" — ключ корзины, параметром он быть не может
+            if params[0][0] == 1:
+                raise ValueError(f"первый сегмент маршрута не может быть параметром: {template}")
+            key = (method, len(segments), segments[1])
+            rest = tuple(literal for literal in literals if literal[0] > 1)
+            self._dynamic.setdefault(key, []).append((target, rest, tuple(params)))
+        self._reset_paths(method)
+
+    def _reset_paths(self, method: str) -> None:
+        self._paths[method] = {path: (target, {}) for path, target in self._static.get(method, {}).items()}
+
+    def route(self, method: str, template: str):
+        """Декоратор: регистрирует функцию как обработчик маршрута"""
+        def decorator(target):
+            self.add(method, template, target)
+            return target
+        return decorator
+
+    def get(self, template: str):
+        return self.route("GET", template)
+
+    def post(self, template: str):
+        return self.route("POST", template)
+
+    def delete(self, template: str):
+        return self.route("DELETE", template)
+
+    def match(self, method: str, path: str) -> Optional[Tuple[Callable, dict]]:
+        """Возвращает (функция, параметры) или None, если маршрута нет.
+
+        ValueError — сегмент не приводится к типу параметра. Параметры
+        общие для повторных запросов того же пути: их не изменяют."""
+        paths = self._paths.get(method, _EMPTY)
+        found = paths.get(path)
+        if found is not None:
+            return found
+        found = self.resolve(method, path)
+        if found is not None and paths is not _EMPTY:
+            # Пути приходят от клиентов: кэш не растёт без предела
+            if len(paths) >= CACHE_SIZE:
+                self._reset_paths(method)
+                paths = self._paths[method]
+            paths[path] = found
+        return found
+
+    def resolve(self, method: str, path: str) -> Optional[Tuple[Callable, dict]]:
+        """Тот же поиск, что match, но без кэша разобранных путей"""
+        target = self._static.get(method, _EMPTY).get(path)
+        if target is not None:
+            return target, {}
+        parts = path.split("/")
+        if len(parts) < 2:
+            return None
+        candidates = self._dynamic.get((method, len(parts), parts[1]))
+        if candidates is None:
+            return None
+        for target, literals, params in candidates:
+            for index, text in literals:
+                if parts[index] != text:
+                    break
+            else:
+                if len(params) == 1:
+                    index, name, convert = params[0]
+                    return target, {name: convert(parts[index])}
+                return target, {name: convert(parts[index]) for index, name, convert in params}
+        return None
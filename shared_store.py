@@ -0,0 +1,335 @@
+"""
+Хранилище состояния для in-memory API (api.py, api_vercel.py).
+
+Обработчики работают с обычными словарями из store.table(...). Хранилище
+решает, видят ли эти словари другие процессы:
+
+* MemoryStore — только память процесса (поведение по умолчанию);
+* SQLiteStore — общий файл SQLite в режиме WAL. Каждое изменение получает
+  номер версии; перед запросом процесс сверяет счётчик и подтягивает
+  только записи новее своей версии, поэтому чтения остаются в памяти;
+* SnapshotStore — тёплый старт: при импорте загружает последний снимок
+  из файла, изменения записывает обратно пачками. Файл должен лежать на
+  постоянном диске (том Render/Fly, диск VM). На Vercel записывать можно
+  только в /tmp, а он свой у каждого инстанса и пуст после холодного
+  старта: снимок там переживает лишь перезапуск процесса в том же
+  инстансе, данные между инстансами и после простоя теряются. Поэтому
+  значения по умолчанию нет — путь задаётся явно.
+
+Выбор — переменная SHARED_STATE_DB (путь к файлу SQLite), иначе
+WARM_STATE_FILE (путь к снимку), иначе память.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Set, Tuple
+
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", "")
+
+# Снимок для тёплого старта (путь на постоянном диске; /tmp на Vercel не переживает холодный старт)
+WARM_STATE_FILE = os.getenv("WARM_STATE_FILE", "")
+# Снимок пишется после стольких изменённых записей или через столько секунд
+WARM_STATE_FLUSH_EVERY = int(os.getenv("WARM_STATE_FLUSH_EVERY", "50"))
+WARM_STATE_FLUSH_INTERVAL = float(os.getenv("WARM_STATE_FLUSH_INTERVAL", "1.0"))
+
+TABLES = ("players", "rooms", "tournaments", "tournament_games", "counters")
+
+# Удалённые записи (NULL) храним столько версий, потом чистим
+TOMBSTONE_KEEP_VERSIONS = 1000
+
+
+def _restore_keys(table: str, value):
+    """JSON хранит ключи объектов строками: rating_changes игр турнира
+    снова получают int telegram_id, как до сохранения"""
+    if table == "tournament_games" and isinstance(value, list):
+        for game in value:
+            changes = game.get("rating_changes") if isinstance(game, dict) else None
+            if isinstance(changes, dict):
+                game["rating_changes"] = {
+                    int(key) if isinstance(key, str) and key.lstrip("-").isdigit() else key: change
+                    for key, change in changes.items()
+                }
+    return value
+
+
+class MemoryStore:
+    """Состояние только в памяти процесса.
+
+    Чтения идут параллельно: блокировка нужна только на вход (подтянуть
+    чужие изменения) и выход. Запись ждёт, пока текущие чтения закончатся,
+    и не пускает новые — обработчики читают словари без копирования."""
+
+    # Сколько заняла загрузка сохранённого состояния при старте
+    load_seconds = 0.0
+
+    def __init__(self, on_reload: Optional[Callable[[], None]] = None):
+        self.tables: Dict[str, dict] = {name: {} for name in TABLES}
+        self.on_reload = on_reload
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        self._readers = 0
+        self._writers_waiting = 0
+        self._dirty: Set[Tuple[str, object]] = set()
+
+    def table(self, name: str) -> dict:
+        return self.tables[name]
+
+    def mark(self, table: str, key) -> None:
+        """Отмечает изменённую (или удалённую) запись — она попадёт в общее хранилище"""
+        self._dirty.add((table, key))
+
+    def refresh(self) -> bool:
+        """Подтягивает чужие изменения. Возвращает True, если что-то поменялось"""
+        return False
+
+    def _commit(self, dirty: Set[Tuple[str, object]]) -> None:
+        pass
+
+    def _rollback(self) -> None:
+        pass
+
+    def _needs_reload(self) -> bool:
+        """Есть ли чужие изменения (проверка без изменения словарей)"""
+        return False
+
+    def _reload(self) -> None:
+        if self.refresh() and self.on_reload is not None:
+            self.on_reload()
+
+    @contextmanager
+    def read(self):
+        """Контекст запроса на чтение: блокировка только на вход и выход"""
+        with self._lock:
+            # Чужие изменения применяются, когда словари никто не читает
+            while self._writers_waiting or (self._readers and self._needs_reload()):
+                self._idle.wait()
+            self._reload()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._readers -= 1
+                if not self._readers:
+                    self._idle.notify_all()
+
+    @contextmanager
+    def write(self):
+        """Контекст запроса с изменениями: блокировка записи, свежие данные, фиксация"""
+        with self._lock:
+            self._writers_waiting += 1
+            try:
+                while self._readers:
+                    self._idle.wait()
+            finally:
+                self._writers_waiting -= 1
+                self._idle.notify_all()
+            self._begin_write()
+            self._dirty = set()
+            try:
+                self._reload()
+                yield
+            except BaseException:
+                self._rollback()
+                raise
+            dirty, self._dirty = self._dirty, set()
+            self._commit(dirty)
+
+    def _begin_write(self) -> None:
+        pass
+
+
+class SQLiteStore(MemoryStore):
+    """Общее состояние в файле SQLite (WAL), с копией в памяти каждого процесса"""
+
+    def __init__(self, path: str, on_reload: Optional[Callable[[], None]] = None):
+        super().__init__(on_reload)
+        self.path = path
+        self.version = 0
+        self._data_version = None
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS kv (
+                tbl TEXT NOT NULL,
+                key NOT NULL,
+                value TEXT,
+                version INTEGER NOT NULL,
+                PRIMARY KEY (tbl, key)
+            );
+            CREATE INDEX IF NOT EXISTS kv_version ON kv(version);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            INSERT OR IGNORE INTO meta VALUES ('version', 0), ('purged_version', 0);
+            """
+        )
+
+    def _meta(self, name: str) -> int:
+        return self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()[0]
+
+    def _needs_reload(self) -> bool:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version
+
+    def refresh(self) -> bool:
+        # PRAGMA data_version меняется только после коммитов других соединений
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return False
+        self._data_version = data_version
+
+        in_transaction = self._conn.in_transaction
+        if not in_transaction:
+            self._conn.execute("BEGIN")
+        try:
+            version = self._meta("version")
+            if version == self.version:
+                return False
+            if self.version < self._meta("purged_version"):
+                # Отстали дальше хранимых удалений — загружаем всё заново
+                self.version = 0
+            if self.version == 0:
+                for rows in self.tables.values():
+                    rows.clear()
+            changes = self._conn.execute(
+                "SELECT tbl, key, value FROM kv WHERE version > ?", (self.version,)
+            ).fetchall()
+        finally:
+            if not in_transaction:
+                self._conn.execute("COMMIT")
+
+        for table, key, value in changes:
+            if value is None:
+                self.tables[table].pop(key, None)
+            else:
+                self.tables[table][key] = _restore_keys(table, json.loads(value))
+        self.version = version
+        return True
+
+    def _begin_write(self) -> None:
+        # IMMEDIATE — сразу берём блокировку записи, общую для всех процессов
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def _rollback(self) -> None:
+        self._conn.execute("ROLLBACK")
+        # Словари могли измениться частично — при следующем запросе перечитываем всё
+        self.version = 0
+        self._data_version = None
+
+    def _commit(self, dirty: Set[Tuple[str, object]]) -> None:
+        if not dirty:
+            self._conn.execute("COMMIT")
+            return
+        try:
+            version = self._meta("version") + 1
+            rows = []
+            for table, key in dirty:
+                value = self.tables[table].get(key)
+                encoded = None if value is None else json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+                rows.append((table, key, encoded, version))
+            self._conn.executemany("INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)", rows)
+            self._conn.execute("UPDATE meta SET value = ? WHERE name = 'version'", (version,))
+            if version % TOMBSTONE_KEEP_VERSIONS == 0:
+                purged = version - TOMBSTONE_KEEP_VERSIONS
+                self._conn.execute("DELETE FROM kv WHERE value IS NULL AND version <= ?", (purged,))
+                self._conn.execute("UPDATE meta SET value = ? WHERE name = 'purged_version'", (purged,))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._rollback()
+            raise
+        self.version = version
+
+
+class SnapshotStore(MemoryStore):
+    """Память процесса + снимок в файле: загрузка при старте, запись пачками"""
+
+    def __init__(self, path: str, on_reload: Optional[Callable[[], None]] = None,
+                 flush_every: int = WARM_STATE_FLUSH_EVERY,
+                 flush_interval: float = WARM_STATE_FLUSH_INTERVAL):
+        super().__init__(on_reload)
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.pending = 0
+        self.flushes = 0
+        self._flushed_at = time.monotonic()
+        self._loaded = False
+
+        started = time.perf_counter()
+        self._load()
+        # Время загрузки снимка — часть холодного старта
+        self.load_seconds = time.perf_counter() - started
+        atexit.register(self.flush)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as snapshot:
+                state = json.load(snapshot)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as error:
+            print(f"⚠️ Снимок {self.path} не прочитан: {error}")
+            return
+        # Ключи хранятся парами [ключ, значение] — int остаются int
+        for table, rows in state.items():
+            if table in self.tables:
+                self.tables[table].update((key, _restore_keys(table, value)) for key, value in rows)
+        self._loaded = True
+
+    def _needs_reload(self) -> bool:
+        return self._loaded
+
+    def refresh(self) -> bool:
+        # Инстанс может простаивать между записями — отложенная пачка уходит и на чтении
+        self._flush_if_due()
+        # Индексы и счётчики API строятся по загруженному снимку при первом запросе
+        loaded, self._loaded = self._loaded, False
+        return loaded
+
+    def _commit(self, dirty: Set[Tuple[str, object]]) -> None:
+        self.pending += len(dirty)
+        self._flush_if_due()
+
+    def _flush_if_due(self) -> None:
+        if self.pending >= self.flush_every or (
+            self.pending and time.monotonic() - self._flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Записывает снимок целиком: во временный файл, затем атомарная замена"""
+        with self._lock:
+            if not self.pending:
+                return
+            state = {name: list(rows.items()) for name, rows in self.tables.items()}
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(temporary, "w", encoding="utf-8") as snapshot:
+                    json.dump(state, snapshot, ensure_ascii=False, separators=(",", ":"))
+                os.replace(temporary, self.path)
+            except OSError as error:
+                # Снимок — только ускорение старта; запрос из-за него не падает
+                print(f"⚠️ Снимок {self.path} не записан: {error}")
+                return
+            self.pending = 0
+            self.flushes += 1
+            self._flushed_at = time.monotonic()
+
+
+def open_store(on_reload: Optional[Callable[[], None]] = None, path: Optional[str] = None) -> MemoryStore:
+    """Хранилище по настройкам SHARED_STATE_DB / WARM_STATE_FILE"""
+    if path is None:
+        path = SHARED_STATE_DB
+    if path:
+        print(f"🗄️ Общее состояние API: {path} (SQLite WAL)")
+        return SQLiteStore(path, on_reload)
+    if WARM_STATE_FILE:
+        store = SnapshotStore(WARM_STATE_FILE, on_reload)
+        print(f"🗄️ Снимок состояния API: {WARM_STATE_FILE} (загружен за {store.load_seconds * 1000:.1f} мс)")
+        return store
+    return MemoryStore(on_reload)
@@ -0,0 +1,132 @@
+"""
+Переиспользуемые соединения SQLite для main_simple.py.
+
+Каждый поток держит одно соединение к файлу базы и отдаёт его всем своим
+запросам, поэтому кэш подготовленных выражений (cached_statements)
+действительно работает между запросами. При открытии соединение
+переводится в WAL: читатели не ждут писателя, а писатель — читателей.
+
+    db = SQLitePool("badminton.db")
+
+    conn = db.acquire()
+    try:
+        conn.execute("SELECT ...")
+    finally:
+        db.release(conn)   # незафиксированные изменения откатываются
+
+AsyncSQLite выносит эти вызовы из цикла событий: все записи идут через
+один поток-писатель (писатели не борются за блокировку), чтения — через
+пул потоков со своими соединениями, поэтому GET не ждёт медленную запись.
+
+    sql = AsyncSQLite(db)
+    rooms = await sql.read(lambda conn: conn.execute("SELECT ...").fetchall())
+"""
+
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, TypeVar
+
+# Размер отображения файла базы в память (байт), 0 — не использовать mmap
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Сколько ждать блокировку записи, прежде чем вернуть "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Подготовленных выражений в кэше каждого соединения
+SQLITE_CACHED_STATEMENTS = int(os.getenv("SQLITE_CACHED_STATEMENTS", "256"))
+# Потоков (и соединений) для чтения в AsyncSQLite
+SQLITE_READ_THREADS = int(os.getenv("SQLITE_READ_THREADS", "4"))
+
+T = TypeVar("T")
+
+
+class SQLitePool:
+    """Одно соединение на поток, настроенное под WAL"""
+
+    def __init__(self, path: str, mmap_size: int = SQLITE_MMAP_SIZE,
+                 busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS,
+                 cached_statements: int = SQLITE_CACHED_STATEMENTS):
+        self.path = path
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Соединением пользуется только создавший его поток; другой поток
+        # обращается к нему лишь в close_all, когда запросов уже нет
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        # В WAL NORMAL не теряет целостность, fsync только на контрольных точках
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Соединение текущего потока (открывается при первом обращении)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Возвращает соединение: то, что не зафиксировано, откатывается — как при close()"""
+        if conn.in_transaction:
+            conn.rollback()
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+class AsyncSQLite:
+    """Асинхронный доступ к SQLitePool: один поток-писатель и пул читателей"""
+
+    def __init__(self, pool: SQLitePool, read_threads: int = SQLITE_READ_THREADS):
+        self.pool = pool
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-write")
+        self._readers = ThreadPoolExecutor(
+            max_workers=read_threads, thread_name_prefix="sqlite-read", initializer=self._read_only,
+        )
+
+    def _read_only(self) -> None:
+        # Соединения читателей не могут случайно начать запись
+        self.pool.acquire().execute("PRAGMA query_only=1")
+
+    def _run(self, work: Callable[..., T], *args) -> T:
+        conn = self.pool.acquire()
+        try:
+            return work(conn, *args)
+        finally:
+            self.pool.release(conn)
+
+    async def read(self, work: Callable[..., T], *args) -> T:
+        """work(conn, *args) в потоке-читателе"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, functools.partial(self._run, work, *args))
+
+    async def write(self, work: Callable[..., T], *args) -> T:
+        """work(conn, *args) в единственном потоке-писателе; фиксирует work сам"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, functools.partial(self._run, work, *args))
+
+    def close(self) -> None:
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        self.pool.close_all()
@@ -3,6 +3,16 @@ let tg = window.Telegram.WebApp;
 let currentUser = null;
 let currentRoom = null;
 
+// Запросы к API с подписанным initData: по нему сервер узнаёт пользователя
+// для лимита частоты запросов (без него лимит общий на весь IP)
+function apiFetch(url, options = {}) {
+    const headers = Object.assign({}, options.headers || {});
+    if (tg && tg.initData) {
+        headers['X-Telegram-Init-Data'] = tg.initData;
+    }
+    return fetch(url, Object.assign({}, options, { headers }));
+}
+
 // Initialize the app
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize Telegram WebApp
@@ -43,7 +53,7 @@ async function checkUserRegistration() {
     if (!currentUser) return;
     
     try {
-        const response = await fetch(`/players/${currentUser.id}`);
+        const response = await apiFetch(`/players/${currentUser.id}`);
         if (response.ok) {
             // User exists, show main menu
             showSection('main-menu');
@@ -122,7 +132,7 @@ async function handleRegistration(event) {
         
         console.log('Sending registration request:', requestBody);
         
-        const response = await fetch('/players/', {
+        const response = await apiFetch('/players/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -312,7 +322,7 @@ function showSection(sectionId) {
 // Load available rooms
 async function loadRooms() {
     try {
-        const response = await fetch('/rooms/');
+        const response = await apiFetch('/rooms/');
         if (response.ok) {
             const data = await response.json();
             displayRooms(data.rooms);
@@ -371,7 +381,7 @@ function displayRooms(rooms) {
 async function joinRoom(roomId) {
     try {
         // Получаем информацию о пользователе из базы данных
-        const playerResponse = await fetch(`/players/${currentUser.id}`);
+        const playerResponse = await apiFetch(`/players/${currentUser.id}`);
         if (!playerResponse.ok) {
             showMessage('Ошибка: пользователь не найден в базе данных', 'error');
             return;
@@ -379,7 +389,7 @@ async function joinRoom(roomId) {
         
         const player = await playerResponse.json();
         
-        const response = await fetch(`/rooms/${roomId}/join?telegram_id=${currentUser.id}`, {
+        const response = await apiFetch(`/rooms/${roomId}/join?telegram_id=${currentUser.id}`, {
             method: 'POST'
         });
         
@@ -415,7 +425,7 @@ async function joinRoom(roomId) {
 async function showRoomDetails(roomId) {
     try {
         // Получаем информацию о комнате
-        const roomResponse = await fetch(`/rooms/${roomId}`);
+        const roomResponse = await apiFetch(`/rooms/${roomId}`);
         if (!roomResponse.ok) {
             showMessage('Ошибка получения информации о комнате', 'error');
             return;
@@ -435,7 +445,7 @@ async function showRoomDetails(roomId) {
         // displayRoomDetails будет вызвана выше
         
         // Получаем информацию о текущем пользователе
-        const playerResponse = await fetch(`/players/${currentUser.id}`);
+        const playerResponse = await apiFetch(`/players/${currentUser.id}`);
         let currentPlayer = null;
         if (playerResponse.ok) {
             currentPlayer = await playerResponse.json();
@@ -594,7 +604,7 @@ function displayRoomDetails(room) {
     let isInRoom = false;
     
     try {
-        const playerResponse = await fetch(`/players/${currentUser.id}`);
+        const playerResponse = await apiFetch(`/players/${currentUser.id}`);
         if (playerResponse.ok) {
             const player = await playerResponse.json();
             isLeader = room.members.find(m => m.player.id === player.id)?.is_leader || false;
@@ -637,7 +647,7 @@ function displayRoomDetails(room) {
 async function leaveRoom(roomId) {
     try {
         // Получаем информацию о пользователе из базы данных
-        const playerResponse = await fetch(`/players/${currentUser.id}`);
+        const playerResponse = await apiFetch(`/players/${currentUser.id}`);
         if (!playerResponse.ok) {
             showMessage('Ошибка: пользователь не найден в базе данных', 'error');
             return;
@@ -645,7 +655,7 @@ async function leaveRoom(roomId) {
         
         const player = await playerResponse.json();
         
-        const response = await fetch(`/rooms/${roomId}/leave?telegram_id=${currentUser.id}`, {
+        const response = await apiFetch(`/rooms/${roomId}/leave?telegram_id=${currentUser.id}`, {
             method: 'POST'
         });
         
@@ -669,7 +679,7 @@ async function leaveRoom(roomId) {
 // Start game
 async function startGame(roomId) {
     try {
-        const response = await fetch(`/rooms/${roomId}/start`, {
+        const response = await apiFetch(`/rooms/${roomId}/start`, {
             method: 'POST'
         });
         
@@ -706,7 +716,7 @@ async function handleGameScore(event) {
     }
     
     try {
-        const response = await fetch('/games/', {
+        const response = await apiFetch('/games/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -750,7 +760,7 @@ async function handleCreateRoom(event) {
     
     // Сначала получаем информацию о пользователе
     try {
-        const playerResponse = await fetch(`/players/${currentUser.id}`);
+        const playerResponse = await apiFetch(`/players/${currentUser.id}`);
         if (!playerResponse.ok) {
             showMessage('Ошибка: пользователь не найден в базе данных', 'error');
             return;
@@ -765,7 +775,7 @@ async function handleCreateRoom(event) {
         
         console.log('Sending request to /rooms/', requestBody);
         
-        const response = await fetch('/rooms/', {
+        const response = await apiFetch('/rooms/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -835,7 +845,7 @@ async function handleStartGame() {
     }
     
     try {
-        const response = await fetch(`/rooms/${currentRoom.id}/start`, {
+        const response = await apiFetch(`/rooms/${currentRoom.id}/start`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -872,7 +882,7 @@ async function handleJoinRoom() {
     
     try {
         // Получаем информацию о пользователе из базы данных
-        const playerResponse = await fetch(`/players/${currentUser.id}`);
+        const playerResponse = await apiFetch(`/players/${currentUser.id}`);
         if (!playerResponse.ok) {
             showMessage('Ошибка: пользователь не найден в базе данных', 'error');
             return;
@@ -880,7 +890,7 @@ async function handleJoinRoom() {
         
         const player = await playerResponse.json();
         
-        const response = await fetch(`/rooms/${currentRoom.id}/join?telegram_id=${currentUser.id}`);
+        const response = await apiFetch(`/rooms/${currentRoom.id}/join?telegram_id=${currentUser.id}`);
         
         if (response.ok) {
             const result = await response.json();
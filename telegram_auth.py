@@ -0,0 +1,58 @@
+"""
+Проверка запросов к API: initData Mini App и ключ бота.
+
+Mini App передаёт строку Telegram.WebApp.initData в заголовке
+X-Telegram-Init-Data; подпись проверяется токеном бота, поэтому
+telegram_id из неё можно использовать как ключ лимита. Бот подписывает
+свои запросы ключом X-Bot-Key, производным от того же токена (сам
+токен по сети не передаётся).
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Optional
+from urllib.parse import parse_qsl
+
+# Токен бота: TELEGRAM_BOT_TOKEN (bot.py) или BOT_TOKEN (bot_simple_api.py)
+BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN") or os.getenv("BOT_TOKEN", "")
+INIT_DATA_HEADER = "X-Telegram-Init-Data"
+BOT_KEY_HEADER = "X-Bot-Key"
+
+
+def verify_init_data(init_data: str, bot_token: str = BOT_TOKEN, max_age: int = 86400,
+                     now: Optional[float] = None) -> Optional[dict]:
+    """Пользователь из initData, если подпись верна и данные не старше max_age секунд; иначе None"""
+    if not init_data or not bot_token:
+        return None
+    fields = dict(parse_qsl(init_data, keep_blank_values=True))
+    received = fields.pop("hash", "")
+    check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
+    expected = hmac.new(secret, check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, received):
+        return None
+    try:
+        auth_date = int(fields.get("auth_date", "0"))
+        user = json.loads(fields.get("user", ""))
+    except ValueError:
+        return None
+    if max_age and (time.time() if now is None else now) - auth_date > max_age:
+        return None
+    if not isinstance(user, dict) or "id" not in user:
+        return None
+    return user
+
+
+def bot_api_key(bot_token: str = BOT_TOKEN) -> str:
+    """Ключ запросов бота к API ('' — токен не задан)"""
+    if not bot_token:
+        return ""
+    return hmac.new(bot_token.encode("utf-8"), b"badminton-api-bot", hashlib.sha256).hexdigest()
+
+
+def is_bot_request(key: Optional[str], bot_token: str = BOT_TOKEN) -> bool:
+    expected = bot_api_key(bot_token)
+    return bool(expected and key) and hmac.compare_digest(expected, key)
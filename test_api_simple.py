@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест сериализации ответов api_simple.py: JSON строится под общей блокировкой
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import os
+
+from testkit import ROOT, call
+
+
+def load_simple():
+    spec = importlib.util.spec_from_file_location("api_simple_lock", os.path.join(ROOT, "api_simple.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_response_serialized_under_lock():
+    """json.dumps ответа маршрута выполняется, пока _lock захвачена"""
+    print("🧪 Тестируем сериализацию под блокировкой...")
+    api = load_simple()
+    held = []
+
+    class CheckedJson:
+        loads = staticmethod(json.loads)
+
+        @staticmethod
+        def dumps(obj, **kwargs):
+            held.append(api._lock.locked())
+            return json.dumps(obj, **kwargs)
+
+    api.json = CheckedJson
+    with contextlib.redirect_stdout(io.StringIO()):
+        status, room = call(api, "POST", "/rooms/", {"name": "Корт", "creator_telegram_id": 7})
+        assert status == 200 and room["id"] == 1
+        status, rooms = call(api, "GET", "/rooms/")
+        assert [r["id"] for r in rooms] == [1]
+    assert held == [True, True]
+    print("✅ Ответ не читает словари, которые меняет другой поток")
+
+
+def test_route_error_is_json():
+    """Ошибка маршрута — ответ 500 с JSON, блокировка освобождена"""
+    print("🧪 Тестируем ошибку маршрута...")
+    api = load_simple()
+    with contextlib.redirect_stdout(io.StringIO()):
+        status, error = call(api, "POST", "/rooms/", {"creator_telegram_id": 7})
+    assert status == 500 and "error" in error
+    assert not api._lock.locked()
+    print("✅ Ошибка отдана как JSON")
+
+
+if __name__ == "__main__":
+    test_response_serialized_under_lock()
+    test_route_error_is_json()
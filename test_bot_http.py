@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест долгоживущих HTTP-клиентов ботов (bot_http.py): соединения переиспользуются
+"""
+
+import asyncio
+import http.server
+
+import bot_http
+from testkit import CountingHandler, serve
+
+
+def test_requests_sessions_reuse_connection():
+    """telegram_session/api_session — одна сессия на адрес и одно соединение на серию запросов"""
+    print("🧪 Тестируем сессии requests...")
+    CountingHandler.connections = set()
+    with serve(http.server.ThreadingHTTPServer, CountingHandler) as port:
+        assert bot_http.telegram_session() is bot_http.telegram_session()
+        assert bot_http.telegram_session() is not bot_http.api_session()
+        for _ in range(5):
+            resp = bot_http.telegram_session().post(
+                f"http://127.0.0.1:{port}/bot123/sendMessage", json={"chat_id": 1, "text": "hi"},
+                timeout=bot_http.TELEGRAM_TIMEOUT,
+            )
+            assert resp.json() == {"ok": True}
+        bot_http.close_sessions()
+    assert len(CountingHandler.connections) == 1
+    print("✅ Сессия держит одно соединение")
+
+
+def test_shared_async_client_reuses_connection():
+    """api_client — один httpx.AsyncClient на все обработчики, закрывается close_api_client"""
+    print("🧪 Тестируем общий клиент httpx...")
+
+    async def scenario(port):
+        client = bot_http.api_client(f"http://127.0.0.1:{port}")
+        for _ in range(5):
+            assert bot_http.api_client() is client
+            resp = await bot_http.api_client().get("/players/1", timeout=5.0)
+            assert resp.json() == {"ok": True}
+        await bot_http.close_api_client()
+        assert client.is_closed
+
+    CountingHandler.connections = set()
+    with serve(http.server.ThreadingHTTPServer, CountingHandler) as port:
+        asyncio.run(scenario(port))
+    assert len(CountingHandler.connections) == 1
+    print("✅ Клиент переиспользует соединение")
+
+
+if __name__ == "__main__":
+    test_requests_sessions_reuse_connection()
+    test_shared_async_client_reuses_connection()
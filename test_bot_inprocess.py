@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест клиента API бота внутри процесса: команды bot.py идут прямо в main.app
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+
+import bot
+import bot_http
+from testkit import load_main
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def command(user_id, args=()):
+    message = FakeMessage()
+    update = SimpleNamespace(
+        effective_user=SimpleNamespace(id=user_id, username="anna", first_name="Анна", last_name="К"),
+        effective_chat=SimpleNamespace(type="private"),
+        message=message,
+    )
+    return update, SimpleNamespace(args=list(args)), message
+
+
+def test_commands_use_in_process_api():
+    """/whoami и турнирные команды работают через ASGI-транспорт, без сети"""
+    print("🧪 Тестируем API внутри процесса...")
+    main = load_main("sqlite://")
+
+    async def scenario():
+        client = bot_http.api_client(app=main.app)
+        assert str(client.base_url) == "http://api.local"
+        resp = await client.post("/games", json={
+            "team1_telegram_ids": [501], "team2_telegram_ids": [502], "score1": 21, "score2": 12,
+        })
+        assert resp.status_code == 200
+
+        update, context, message = command(501)
+        await bot.whoami(update, context)
+        assert "API: rating=" in message.replies[0]
+
+        admin_id = 900
+        original = bot._is_admin
+        bot._is_admin = lambda user_id: user_id == admin_id
+        try:
+            update, context, message = command(admin_id, ["Кубок"])
+            await bot.tstart(update, context)
+            assert message.replies[0].startswith("🏁 Турнир #")
+            update, context, message = command(admin_id)
+            await bot.tend(update, context)
+            assert message.replies and "Ошибка" not in message.replies[0]
+        finally:
+            bot._is_admin = original
+            await bot_http.close_api_client()
+
+    asyncio.run(scenario())
+    print("✅ Команды бота работают без HTTP")
+
+
+def test_blocking_endpoint_does_not_stall_bot():
+    """Синхронная работа с базой в async-обработчике не останавливает цикл бота, таймаут соблюдается"""
+    print("🧪 Тестируем блокирующий обработчик API внутри процесса...")
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow(seconds: float):
+        time.sleep(seconds)  # как синхронный запрос SQLAlchemy в main.py
+        return {"ok": True}
+
+    async def scenario():
+        client = bot_http.api_client(app=app)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        try:
+            resp = await client.get("/slow", params={"seconds": 0.3})
+            assert resp.json() == {"ok": True}
+            assert ticks >= 10, ticks
+
+            started = time.perf_counter()
+            try:
+                await client.get("/slow", params={"seconds": 0.5}, timeout=0.1)
+            except httpx.ReadTimeout:
+                pass
+            else:
+                raise AssertionError("ожидался ReadTimeout")
+            assert time.perf_counter() - started < 0.4
+        finally:
+            task.cancel()
+            await bot_http.close_api_client()
+
+    asyncio.run(scenario())
+    print("✅ Цикл бота не ждёт базу")
+
+
+if __name__ == "__main__":
+    test_commands_use_in_process_api()
+    test_blocking_endpoint_does_not_stall_bot()
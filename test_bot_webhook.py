@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест режима вебхука (bot_webhook.py) и опроса без паузы в bot_simple_api.py
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+
+import bot_simple_api
+from bot_webhook import create_webhook_app
+from update_workers import UpdateDispatcher
+
+SECRET = "s3cret"
+
+
+def update(update_id, chat_id=1, text="/help"):
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}, "from": {"id": chat_id}, "text": text}}
+
+
+def test_webhook_dispatches_updates_as_they_arrive():
+    """Фейковый Telegram шлёт POST — обновление обрабатывается сразу, ответ 200"""
+    print("🧪 Тестируем приём вебхука...")
+    handled = {}
+    done = threading.Event()
+
+    def handler(item):
+        handled[item["update_id"]] = time.perf_counter()
+        done.set()
+
+    dispatcher = UpdateDispatcher(handler, workers=2, max_pending=10)
+    app = create_webhook_app(dispatcher.submit, secret_token=SECRET)
+
+    async def telegram():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bot.local") as client:
+            headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+            sent_at = time.perf_counter()
+            resp = await client.post("/webhook", json=update(1), headers=headers)
+            assert resp.status_code == 200 and resp.json() == {"ok": True}
+
+            assert (await client.post("/webhook", json=update(2))).status_code == 403
+            assert (await client.post("/webhook", json=update(2), headers={
+                "X-Telegram-Bot-Api-Secret-Token": "wrong"})).status_code == 403
+            assert (await client.post("/webhook", content=b"{", headers=headers)).status_code == 400
+            assert (await client.post("/webhook", json={"text": "нет update_id"}, headers=headers)).status_code == 400
+            assert (await client.get("/webhook", headers=headers)).status_code == 405
+            assert (await client.post("/other", json=update(2), headers=headers)).status_code == 404
+            return sent_at
+
+    sent_at = asyncio.run(telegram())
+    assert done.wait(1)
+    dispatcher.close(timeout=5)
+    assert list(handled) == [1]
+    assert handled[1] - sent_at < 0.1
+    print(f"✅ Обновление обработано через {(handled[1] - sent_at) * 1000:.1f} мс")
+
+
+def test_webhook_full_queue_returns_503():
+    """Заполненная очередь — 503, Telegram повторит доставку; цикл событий не блокируется"""
+    print("🧪 Тестируем переполнение очереди вебхука...")
+    release = threading.Event()
+    dispatcher = UpdateDispatcher(lambda item: release.wait(5), workers=1, max_pending=1)
+    app = create_webhook_app(dispatcher.submit)
+
+    async def telegram():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bot.local") as client:
+            first = await client.post("/webhook", json=update(1))
+            second = await client.post("/webhook", json=update(2, chat_id=2))
+            return first.status_code, second.status_code
+
+    assert asyncio.run(telegram()) == (200, 503)
+    release.set()
+    dispatcher.close(timeout=5)
+    print("✅ Переполнение отдаёт 503")
+
+
+def test_polling_has_no_fixed_pause():
+    """run_polling сразу запрашивает следующую пачку, без time.sleep(1)"""
+    print("🧪 Тестируем опрос без паузы...")
+    batches = [{"result": [update(1)]}, {"result": [update(2)]}]
+    offsets = []
+
+    def fake_get_updates(offset=None):
+        offsets.append(offset)
+        if not batches:
+            raise KeyboardInterrupt
+        return batches.pop(0)
+
+    handled = []
+    dispatcher = UpdateDispatcher(lambda item: handled.append(item["update_id"]), workers=1)
+    original = bot_simple_api.get_updates
+    bot_simple_api.get_updates = fake_get_updates
+    try:
+        started = time.perf_counter()
+        bot_simple_api.run_polling(dispatcher)
+        elapsed = time.perf_counter() - started
+    finally:
+        bot_simple_api.get_updates = original
+    dispatcher.close(timeout=5)
+    assert offsets == [None, 2, 3]
+    assert handled == [1, 2]
+    assert elapsed < 0.5
+    print(f"✅ Три запроса getUpdates за {elapsed * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    test_webhook_dispatches_updates_as_they_arrive()
+    test_webhook_full_queue_returns_503()
+    test_polling_has_no_fixed_pause()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тестирование сжатия ответов и кэша сжатых отчётов турниров
+"""
+
+import gzip
+import os
+import tempfile
+
+os.environ.setdefault(
+    "DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "badminton_main_test.db")
+)
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+
+
+def test_players_list_gzip():
+    """Большой список игроков отдаётся сжатым, маленький ответ — нет"""
+    for i in range(40):
+        client.post("/players/", json={"telegram_id": 7000 + i, "first_name": "Игрок 🏸", "last_name": f"Тестовый {i}"})
+    resp = client.get("/players", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert len(resp.json()) >= 40
+
+    small = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_ended_tournament_report_cached():
+    """Отчёт завершённого турнира сжимается один раз и берётся из кэша"""
+    t = client.post("/tournaments/start", json={"name": "Кэш"}).json()
+    for i in range(30):
+        client.post("/games", json={
+            "team1_telegram_ids": [7100 + i], "team2_telegram_ids": [7200 + i],
+            "score1": 21, "score2": 10 + i % 10, "tournament_id": t["id"],
+        })
+    client.post(f"/tournaments/{t['id']}/end")
+
+    first = client.get(f"/tournaments/{t['id']}/report", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    keys = [key for key in main.report_cache._entries if key[0] == t["id"]]
+    assert len(keys) == 1
+    cached_gzip = main.report_cache._entries[keys[0]]["gzip"]
+    assert gzip.decompress(cached_gzip).decode("utf-8") == first.content.decode("utf-8")
+
+    plain = client.get(f"/tournaments/{t['id']}/report", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == first.json()
+
+
+def test_report_cache_follows_data():
+    """Кэш другого воркера не отдаёт устаревший отчёт: имя игрока изменилось — ключ другой"""
+    t = client.post("/tournaments/start", json={"name": "Имена"}).json()
+    client.post("/games", json={
+        "team1_telegram_ids": [7301], "team2_telegram_ids": [7302], "score1": 21, "score2": 12,
+        "tournament_id": t["id"],
+    })
+    client.post(f"/tournaments/{t['id']}/end")
+    first = client.get(f"/tournaments/{t['id']}/report").json()["report"]
+
+    with main.SessionLocal() as db:
+        player = db.query(main.Player).filter(main.Player.telegram_id == 7301).one()
+        player.username = "renamed_7301"
+        db.commit()
+    second = client.get(f"/tournaments/{t['id']}/report").json()["report"]
+    assert "renamed_7301" not in first and "renamed_7301" in second
+
+
+if __name__ == "__main__":
+    test_players_list_gzip()
+    test_ended_tournament_report_cached()
+    test_report_cache_follows_data()
+    print("🎉 Проверки сжатия пройдены")
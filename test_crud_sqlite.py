@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест движка SQLite (database_sqlite.py) и CRUD с одной транзакцией на операцию
+"""
+
+import contextlib
+import os
+import tempfile
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+import crud_sqlite
+from database_sqlite import Base, create_sqlite_engine
+from models_sqlite import Player
+from schemas import PlayerCreate, RoomCreate
+
+
+@contextlib.contextmanager
+def statements(engine):
+    """Собирает SQL-выражения и фиксации, выполненные внутри блока"""
+    executed = {"sql": [], "commits": 0}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        executed["sql"].append(statement.split()[0].upper())
+
+    def on_commit(conn):
+        executed["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    try:
+        yield executed
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine, "commit", on_commit)
+
+
+def test_engine_settings():
+    """Файл — WAL и QueuePool, память — StaticPool; прагмы на каждом соединении"""
+    print("🧪 Тестируем настройки движка SQLite...")
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine("sqlite:///" + os.path.join(directory, "crud.db"))
+        assert isinstance(engine.pool, QueuePool)
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+            assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+        engine.dispose()
+    assert isinstance(create_sqlite_engine("sqlite://").pool, StaticPool)
+    print("✅ Движок настроен")
+
+
+def test_crud_single_transaction():
+    """Комната с создателем — одна фиксация, вход в комнату — один SELECT и один INSERT"""
+    print("🧪 Тестируем CRUD SQLite...")
+    engine = create_sqlite_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+    players = [
+        crud_sqlite.create_player(db, PlayerCreate(telegram_id=100 + i, first_name="Игрок", last_name=str(i)))
+        for i in range(4)
+    ]
+    ids = [player.id for player in players]
+
+    with statements(engine) as executed:
+        room = crud_sqlite.create_room(db, RoomCreate(name="Корт", creator_id=ids[0], max_players=2))
+    assert executed["commits"] == 1
+    assert room.name == "Корт - Игрок 0" and [m.is_leader for m in room.members] == [True]
+
+    with statements(engine) as executed:
+        member = crud_sqlite.add_player_to_room(db, room.id, ids[1])
+    assert executed["sql"] == ["SELECT", "INSERT"] and executed["commits"] == 1
+    assert crud_sqlite.add_player_to_room(db, room.id, ids[1]).id == member.id
+    try:
+        crud_sqlite.add_player_to_room(db, room.id, ids[2])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("комната заполнена, вход должен быть запрещён")
+
+    assert crud_sqlite.start_game(db, room.id) is True
+    assert crud_sqlite.remove_player_from_room(db, room.id, ids[1]) is True
+    assert crud_sqlite.remove_player_from_room(db, room.id, ids[1]) is False
+
+    with statements(engine) as executed:
+        crud_sqlite.update_player_ratings(db, [(ids[0], 1520.0, 300.0, 0.06), (ids[1], 1480.0, 300.0, 0.06)])
+    assert executed["sql"] == ["UPDATE"] and executed["commits"] == 1
+    assert db.get(Player, ids[0]).rating == 1520.0 and db.get(Player, ids[1]).rating == 1480.0
+    db.close()
+    print("✅ CRUD укладывается в одну транзакцию")
+
+
+if __name__ == "__main__":
+    test_engine_settings()
+    test_crud_single_transaction()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест постоянных соединений HTTP/1.1 в обработчиках на BaseHTTPRequestHandler
+"""
+
+import contextlib
+import http.client
+import importlib.util
+import io
+import json
+import os
+
+from testkit import load_api, serve
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def request(conn, method, path, body=None):
+    payload = json.dumps(body).encode("utf-8") if body is not None else None
+    headers = {"Content-Type": "application/json"} if payload else {}
+    conn.request(method, path, body=payload, headers=headers)
+    response = conn.getresponse()
+    raw = response.read()
+    assert int(response.getheader("Content-Length")) == len(raw)
+    return response.status, json.loads(raw) if raw else None
+
+
+def check_persistent(port):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    status, room = request(conn, "POST", "/rooms/", {"name": "Корт", "creator_telegram_id": 1})
+    assert status == 200 and room["name"] == "Корт"
+    sock = conn.sock
+
+    # Ошибки приходят с настоящим статусом, соединение не закрывается
+    assert request(conn, "GET", "/rooms/999") == (404, {"error": "Комната не найдена"})
+    assert request(conn, "POST", "/rooms/", {"name": "Ещё", "creator_telegram_id": 1})[0] == 400
+    assert request(conn, "GET", "/nope")[0] == 404
+    assert request(conn, "OPTIONS", "/rooms/") == (200, None)
+    for _ in range(5):
+        status, rooms = request(conn, "GET", "/rooms/")
+        assert status == 200 and len(rooms) == 1
+    assert conn.sock is sock
+    conn.close()
+
+
+def test_index_keepalive():
+    """api/index.py: несколько запросов по одному соединению с правильными статусами"""
+    print("🧪 Тестируем keep-alive в api/index.py...")
+    api = load_api()
+    with contextlib.redirect_stdout(io.StringIO()), serve(api.ConcurrentHTTPServer, api.handler) as port:
+        check_persistent(port)
+    print("✅ Соединение переиспользуется")
+
+
+def test_simple_keepalive():
+    """api_simple.py: то же поведение на простом хранилище"""
+    print("🧪 Тестируем keep-alive в api_simple.py...")
+    spec = importlib.util.spec_from_file_location("api_simple_keepalive", os.path.join(ROOT, "api_simple.py"))
+    api = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(api)
+    with contextlib.redirect_stdout(io.StringIO()), serve(api.ThreadingHTTPServer, api.handler) as port:
+        check_persistent(port)
+    print("✅ Соединение переиспользуется")
+
+
+if __name__ == "__main__":
+    test_index_keepalive()
+    test_simple_keepalive()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест полного API main.py на SQLite в памяти и диалектных функций db_dialect.py
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy.pool import StaticPool
+
+from testkit import ROOT, load_main
+
+
+def test_full_api_in_memory():
+    """main.py без изменений работает на sqlite://, сброс очищает всё и начинает id с 1"""
+    print("🧪 Тестируем main.py на SQLite в памяти...")
+    from fastapi.testclient import TestClient
+
+    started = time.perf_counter()
+    main = load_main("sqlite://")
+    assert isinstance(main.engine.pool, StaticPool)
+    client = TestClient(main.app)
+    print(f"   API поднят за {(time.perf_counter() - started) * 1000:.0f} мс")
+
+    game = client.post("/games", json={
+        "team1_telegram_ids": [1, 2], "team2_telegram_ids": [3, 4], "score1": 21, "score2": 17,
+    })
+    assert game.status_code == 200
+    assert len(client.get("/players").json()) == 4
+
+    room = client.post("/rooms/", json={"name": "Корт", "creator_telegram_id": 1})
+    assert room.status_code == 200, room.text
+
+    reset = client.post("/admin/reset_all", params={"secret": os.getenv("ADMIN_RESET_SECRET", "reset123")})
+    assert reset.status_code == 200, reset.text
+    assert client.get("/players").json() == []
+    with main.SessionLocal() as db:
+        for model in (main.Game, main.GamePlayer, main.Room, main.RoomMember, main.IdempotencyRecord):
+            assert db.query(model).count() == 0
+
+    again = client.post("/games", json={
+        "team1_telegram_ids": [5], "team2_telegram_ids": [6], "score1": 21, "score2": 10,
+    })
+    assert again.status_code == 200 and again.json()["game_id"] == 1
+    print("✅ Полный API работает без Postgres")
+
+
+def test_legacy_sqlite_database_upgraded():
+    """Старая база без колонок состояния игры получает их при старте"""
+    print("🧪 Тестируем онлайн-миграцию на SQLite...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "legacy.db")
+        legacy = sqlite3.connect(path)
+        legacy.executescript("""
+            CREATE TABLE players (
+                id INTEGER PRIMARY KEY, telegram_id INTEGER UNIQUE, first_name VARCHAR NOT NULL,
+                last_name VARCHAR, username VARCHAR, rating INTEGER, rd FLOAT, volatility FLOAT,
+                initial_rank VARCHAR, games_count INTEGER, created_at DATETIME
+            );
+            CREATE TABLE rooms (
+                id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, creator_id INTEGER REFERENCES players (id),
+                max_players INTEGER, is_active BOOLEAN, created_at DATETIME
+            );
+            INSERT INTO players (telegram_id, first_name, rating) VALUES (77, 'Анна', 1500);
+        """)
+        legacy.close()
+
+        main = load_main("sqlite:///" + path)
+        with main.engine.connect() as conn:
+            players = {row[1]: row for row in conn.exec_driver_sql("PRAGMA table_info(players)")}
+            rooms = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(rooms)")}
+        assert players["rank_changes_used"][4] == "0"
+        assert {"current_game", "last_result"} <= rooms
+        assert main.upgrade_schema(main.engine, main.Base.metadata) == []
+        main.engine.dispose()
+    print("✅ Колонки добавлены")
+
+
+def test_postgres_path_skips_sqlite_module():
+    """Импорт db_dialect не тянет database_sqlite (config_sqlite, engine на ./badminton_test.db)"""
+    print("🧪 Тестируем ленивый импорт SQLite...")
+    check = (
+        "import sys, db_dialect; "
+        "db_dialect.create_app_engine('postgresql+psycopg://u:p@localhost/db'); "
+        "assert 'database_sqlite' not in sys.modules, 'database_sqlite импортирован'"
+    )
+    subprocess.run([sys.executable, "-c", check], cwd=ROOT, check=True)
+    print("✅ Модуль SQLite не загружается")
+
+
+
+def test_sqlite_module_has_no_import_side_effects():
+    """database_sqlite и models_sqlite импортируются без файла БД и без DeprecationWarning"""
+    print("🧪 Тестируем импорт модулей SQLite...")
+    check = (
+        "import warnings; warnings.simplefilter('error', DeprecationWarning); "
+        "import database_sqlite, models_sqlite, models, db_dialect; "
+        "db_dialect.create_app_engine('sqlite://').dispose(); "
+        "assert models_sqlite.Player is models.Player"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        env.pop("SQLITE_DATABASE_URL", None)
+        subprocess.run([sys.executable, "-c", check], cwd=directory, env=env, check=True)
+        assert os.listdir(directory) == [], os.listdir(directory)
+    print("✅ Импорт ничего не создаёт")
+
+if __name__ == "__main__":
+    test_full_api_in_memory()
+    test_legacy_sqlite_database_upgraded()
+    test_postgres_path_skips_sqlite_module()
+    test_sqlite_module_has_no_import_side_effects()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест сохранения in-memory хранилища (api/index.py) между перезапусками
+"""
+
+import contextlib
+import io
+import tempfile
+import time
+
+from testkit import call, load_api
+
+
+def restart(directory):
+    """Новый экземпляр API, загруженный из каталога хранилища"""
+    api = load_api()
+    with contextlib.redirect_stdout(io.StringIO()):
+        api.init_persistence(directory)
+    return api
+
+
+def test_state_survives_restart():
+    """Игроки, комнаты, турниры и счётчики восстанавливаются из журнала"""
+    print("🧪 Тестируем восстановление из журнала...")
+    with tempfile.TemporaryDirectory() as directory:
+        api = restart(directory)
+        call(api, "POST", "/players/", {"telegram_id": 1, "first_name": "Анна"})
+        call(api, "POST", "/rooms/", {"name": "Корт 1", "creator_telegram_id": 1})
+        call(api, "POST", "/rooms/1/join", {"telegram_id": 2, "first_name": "Борис"})
+        call(api, "POST", "/rooms/", {"name": "Корт 2", "creator_telegram_id": 3})
+        call(api, "DELETE", "/rooms/2")
+        call(api, "DELETE", "/tournament/start")
+        api.journal.close()
+
+        api = restart(directory)
+        assert sorted(api.players_db) == [1, 2, 3]
+        assert list(api.rooms_db) == [1]
+        room = api.rooms_db[1]
+        assert [member.player_id for member in room.members] == [1, 2]
+        assert api.players_db[2].first_name == "Борис"
+        assert api.room_by_creator == {1: 1}
+        assert api._is_member(1, 2)
+        assert api.room_counter == 3
+        assert api.current_tournament == 1
+
+        # Счётчик не сбросился: новая комната получает следующий номер
+        _, new_room = call(api, "POST", "/rooms/", {"name": "Корт 3", "creator_telegram_id": 3})
+        assert new_room["id"] == 3
+        api.journal.close()
+    print("✅ Состояние восстановлено")
+
+
+def test_snapshot_compaction():
+    """После снимка старый журнал удаляется, а состояние не теряется"""
+    print("🧪 Тестируем снимок и сжатие журнала...")
+    with tempfile.TemporaryDirectory() as directory:
+        api = restart(directory)
+        for i in range(10):
+            call(api, "POST", "/players/", {"telegram_id": i, "first_name": f"Игрок {i}"})
+        api.journal.compact(api._snapshot_state, api._freeze_all)
+        call(api, "POST", "/players/", {"telegram_id": 10, "first_name": "После снимка"})
+        api.journal.close()
+
+        api = restart(directory)
+        assert len(api.players_db) == 11
+        assert api.journal.generation == 1
+        api.journal.close()
+    print("✅ Снимок работает")
+
+
+def test_restart_100k_players():
+    """Перезапуск со 100 тысячами игроков укладывается в секунду"""
+    print("🧪 Тестируем перезапуск со 100k игроков...")
+    with tempfile.TemporaryDirectory() as directory:
+        api = restart(directory)
+        for i in range(100_000):
+            api.players_db[i] = api.Player(i, "Игрок", str(i))
+        api.journal.compact(api._snapshot_state, api._freeze_all)
+        for i in range(1000):
+            call(api, "POST", "/players/", {"telegram_id": 200_000 + i, "first_name": "Хвост"})
+        api.journal.close()
+
+        started = time.perf_counter()
+        api = restart(directory)
+        elapsed = time.perf_counter() - started
+        assert len(api.players_db) == 101_000
+        api.journal.close()
+    print(f"✅ Загрузка заняла {elapsed:.3f} с")
+    assert elapsed < 1.0
+
+
+if __name__ == "__main__":
+    test_state_survives_restart()
+    test_snapshot_compaction()
+    test_restart_100k_players()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест /metrics: метки маршрутов по шаблону и метрики пула соединений БД
+"""
+
+import os
+import tempfile
+
+from testkit import load_main
+
+
+def sample(body, name):
+    """Значение метрики без меток из текста Prometheus"""
+    for line in body.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[1])
+    raise AssertionError(f"нет метрики {name}")
+
+
+def test_metrics_routes_and_pool():
+    """Маршрут помечен шаблоном, пул считается и после engine.dispose()"""
+    print("🧪 Тестируем /metrics...")
+    from fastapi.testclient import TestClient
+
+    with tempfile.TemporaryDirectory() as directory:
+        main = load_main("sqlite:///" + os.path.join(directory, "metrics.db"))
+        client = TestClient(main.app)
+        client.post("/players/", json={"telegram_id": 1, "first_name": "Анна"})
+        room = client.post("/rooms/", json={"name": "Корт", "creator_telegram_id": 1}).json()
+        assert client.get(f"/rooms/{room['id']}").status_code == 200
+
+        body = client.get("/metrics").text
+        assert 'route="/rooms/{room_id}"' in body
+        assert 'route="/rooms/%d"' % room["id"] not in body
+        # Соединение занято только самим запросом /metrics
+        assert sample(body, "db_pool_checked_out") == 1
+        assert sample(body, "db_pool_overflow") == 0
+        connects = sample(body, "db_connect_seconds_count")
+        assert connects >= 1
+        # Каждая сессия запроса ждала соединение из пула
+        waits = sample(body, "db_pool_wait_seconds_count")
+        assert waits >= 3
+
+        # Новый пул после dispose() наследует слушателей
+        main.engine.dispose()
+        body = client.get("/metrics").text
+        assert sample(body, "db_pool_checked_out") == 1
+        assert sample(body, "db_connect_seconds_count") > connects
+        assert sample(body, "db_pool_wait_seconds_count") > waits
+
+        # Отсоединённое соединение в пул не вернётся: счётчик не должен течь
+        connection = main.engine.connect()
+        connection.connection.detach()
+        connection.close()
+        body = client.get("/metrics").text
+        assert sample(body, "db_pool_checked_out") == 1
+        main.engine.dispose()
+    print("✅ Метрики маршрутов и пула на месте")
+
+
+if __name__ == "__main__":
+    test_metrics_routes_and_pool()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест очереди исходящих сообщений бота (outbound_queue.py)
+"""
+
+import threading
+import time
+
+from outbound_queue import OutboundQueue, TokenBucket
+
+
+class FakeTelegram:
+    """Записывает отправки; на заданные сообщения один раз отвечает 429"""
+
+    def __init__(self, flood=(), retry_after=0.2, latency=0.0):
+        self.sent = []
+        self.flood = set(flood)
+        self.retry_after = retry_after
+        self.latency = latency
+        self.lock = threading.Lock()
+
+    def __call__(self, payload):
+        time.sleep(self.latency)
+        with self.lock:
+            if payload["text"] in self.flood:
+                self.flood.discard(payload["text"])
+                return 429, {"ok": False, "parameters": {"retry_after": self.retry_after}}
+            self.sent.append((payload["chat_id"], payload["text"], time.monotonic()))
+        return 200, {"ok": True}
+
+
+def message(chat_id, text):
+    return {"chat_id": chat_id, "text": text}
+
+
+def test_broadcast_is_concurrent_and_enqueue_returns_immediately():
+    """Рассылка по чатам идёт параллельно, enqueue не ждёт Telegram"""
+    print("🧪 Тестируем рассылку через очередь...")
+    telegram = FakeTelegram(latency=0.1)
+    outbound = OutboundQueue(telegram, workers=4, global_rate=100)
+    started = time.monotonic()
+    for chat_id in range(1, 5):
+        outbound.enqueue(chat_id, message(chat_id, "отчёт"))
+    assert time.monotonic() - started < 0.05
+    outbound.close(timeout=5)
+    assert sorted(chat_id for chat_id, _, _ in telegram.sent) == [1, 2, 3, 4]
+    # Четыре отправки по 100 мс заняли около 100 мс, а не 400
+    assert max(sent_at for _, _, sent_at in telegram.sent) - started < 0.3
+    print("✅ Рассылка параллельная")
+
+
+def test_per_chat_limit_and_order():
+    """Сообщения одного чата идут по порядку и не чаще лимита чата"""
+    print("🧪 Тестируем лимит чата...")
+    telegram = FakeTelegram()
+    outbound = OutboundQueue(telegram, workers=4, global_rate=100, bucket=lambda chat_id: TokenBucket(10))
+    for i in range(4):
+        outbound.enqueue(1, message(1, f"m{i}"))
+    outbound.enqueue(2, message(2, "другой чат"))
+    outbound.close(timeout=5)
+    chat1 = [(text, sent_at) for chat_id, text, sent_at in telegram.sent if chat_id == 1]
+    assert [text for text, _ in chat1] == ["m0", "m1", "m2", "m3"]
+    gaps = [b - a for (_, a), (_, b) in zip(chat1, chat1[1:])]
+    assert min(gaps) >= 0.09, gaps
+    print("✅ Лимит чата соблюдается")
+
+
+def test_global_limit():
+    """Общий лимит бота ограничивает рассылку по многим чатам"""
+    print("🧪 Тестируем общий лимит...")
+    telegram = FakeTelegram()
+    outbound = OutboundQueue(telegram, workers=4, global_rate=20)
+    started = time.monotonic()
+    for chat_id in range(30):
+        outbound.enqueue(chat_id, message(chat_id, "отчёт"))
+    outbound.close(timeout=5)
+    # Запас в 20 токенов уходит сразу, остальные 10 — по 20 в секунду
+    assert len(telegram.sent) == 30
+    assert time.monotonic() - started >= 0.45
+    print("✅ Общий лимит соблюдается")
+
+
+def test_429_retried_after_retry_after():
+    """429 повторяется через retry_after, следующие сообщения чата ждут повтора"""
+    print("🧪 Тестируем повтор 429...")
+    telegram = FakeTelegram(flood={"первое"}, retry_after=0.2)
+    outbound = OutboundQueue(telegram, workers=2, global_rate=100, bucket=lambda chat_id: TokenBucket(100))
+    started = time.monotonic()
+    outbound.enqueue(1, message(1, "первое"))
+    outbound.enqueue(1, message(1, "второе"))
+    outbound.close(timeout=5)
+    assert [text for _, text, _ in telegram.sent] == ["первое", "второе"]
+    assert telegram.sent[0][2] - started >= 0.2
+    print("✅ 429 повторён")
+
+
+
+def test_failure_reported_after_retries():
+    """Недоставленное сообщение уходит в on_failure: сразу при 400, при 429 — после повторов"""
+    print("🧪 Тестируем отчёт о недоставке...")
+    failures = []
+    responses = {"плохое": (400, {"ok": False, "description": "Bad Request"}), "сбой": (429, {"ok": False, "parameters": {"retry_after": 0.05}})}
+
+    def deliver(payload):
+        return responses.get(payload["text"], (200, {"ok": True}))
+
+    outbound = OutboundQueue(deliver, workers=2, global_rate=100, max_retries=1,
+                             bucket=lambda chat_id: TokenBucket(100),
+                             on_failure=lambda chat_id, payload, status, body: failures.append((chat_id, payload["text"], status)))
+    outbound.enqueue(1, message(1, "плохое"))
+    outbound.enqueue(2, message(2, "сбой"))
+    outbound.enqueue(3, message(3, "хорошее"))
+    outbound.close(timeout=5)
+    assert sorted(failures) == [(1, "плохое", 400), (2, "сбой", 429)]
+    print("✅ Недоставка видна")
+
+
+def test_idle_chats_pruned_periodically():
+    """Простаивающие чаты забываются не чаще PRUNE_INTERVAL"""
+    print("🧪 Тестируем очистку простаивающих чатов...")
+    telegram = FakeTelegram()
+    outbound = OutboundQueue(telegram, workers=2, global_rate=1000, bucket=lambda chat_id: TokenBucket(1000))
+    outbound.MAX_IDLE_CHATS = 2
+    outbound.PRUNE_INTERVAL = 0.5
+    for chat_id in range(5):
+        outbound.enqueue(chat_id, message(chat_id, "отчёт"))
+    while outbound.pending():
+        time.sleep(0.01)
+    # Интервал ещё не прошёл — чаты на месте
+    assert len(outbound._chats) == 5
+    time.sleep(0.55)
+    outbound.enqueue(5, message(5, "отчёт"))
+    outbound.close(timeout=5)
+    assert len(outbound._chats) <= 2
+    print("✅ Чаты очищаются по интервалу")
+
+if __name__ == "__main__":
+    test_broadcast_is_concurrent_and_enqueue_returns_immediately()
+    test_per_chat_limit_and_order()
+    test_global_limit()
+    test_429_retried_after_retry_after()
+    test_failure_reported_after_retries()
+    test_idle_chats_pruned_periodically()
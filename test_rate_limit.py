@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тестирование общего token bucket ограничителя запросов
+"""
+
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+import rate_limit
+import telegram_auth
+from rate_limit import SharedTokenBucket
+from testkit import load_main
+
+
+def _bucket(slots=1024):
+    return SharedTokenBucket(os.path.join(tempfile.mkdtemp(), "ratelimit.bin"), slots=slots)
+
+
+def test_burst_then_retry_after():
+    """После исчерпания корзины приходит Retry-After, затем токены восстанавливаются"""
+    bucket = _bucket()
+    now = 1000.0
+    for _ in range(5):
+        assert bucket.acquire("GET /rooms/|tg:1", rate=1.0, burst=5.0, now=now) == 0.0
+    retry_after = bucket.acquire("GET /rooms/|tg:1", rate=1.0, burst=5.0, now=now)
+    assert 0 < retry_after <= 1.0
+    # Другой пользователь не затронут
+    assert bucket.acquire("GET /rooms/|tg:2", rate=1.0, burst=5.0, now=now) == 0.0
+    assert bucket.acquire("GET /rooms/|tg:1", rate=1.0, burst=5.0, now=now + 1.0) == 0.0
+
+
+def test_state_shared_between_instances():
+    """Два экземпляра над одним файлом (как два воркера) видят общий лимит"""
+    path = os.path.join(tempfile.mkdtemp(), "ratelimit.bin")
+    worker1 = SharedTokenBucket(path, slots=1024)
+    worker2 = SharedTokenBucket(path, slots=1024)
+    now = 2000.0
+    assert worker1.acquire("k", rate=0.1, burst=2.0, now=now) == 0.0
+    assert worker2.acquire("k", rate=0.1, burst=2.0, now=now) == 0.0
+    assert worker1.acquire("k", rate=0.1, burst=2.0, now=now) > 0
+
+
+def test_check_is_fast():
+    """Проверка лимита занимает микросекунды"""
+    bucket = _bucket(slots=65536)
+    n = 20000
+    started = time.perf_counter()
+    for i in range(n):
+        bucket.acquire(f"GET /rooms/|tg:{i % 500}", rate=100.0, burst=100.0)
+    per_call_us = (time.perf_counter() - started) / n * 1e6
+    print(f"⏱️ Проверка лимита: {per_call_us:.1f} мкс")
+    assert per_call_us < 200
+
+
+BOT_TOKEN = "123456:test-token"
+
+
+def _init_data(user_id, token=BOT_TOKEN, auth_date=None):
+    """initData, подписанный как это делает Telegram"""
+    fields = {
+        "auth_date": str(int(time.time()) if auth_date is None else auth_date),
+        "user": json.dumps({"id": user_id, "first_name": "Анна"}),
+    }
+    check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", token.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret, check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+def _request(peer, forwarded=None, query=None, headers=None):
+    headers = dict(headers or {})
+    if forwarded:
+        headers["x-forwarded-for"] = forwarded
+    return SimpleNamespace(client=SimpleNamespace(host=peer), headers=headers, query_params=query or {})
+
+
+def test_client_ip_trusts_only_proxies():
+    """X-Forwarded-For учитывается только от доверенного прокси, справа налево"""
+    saved = rate_limit.TRUST_ANY_PROXY, rate_limit.TRUSTED_PROXIES
+    try:
+        rate_limit.TRUST_ANY_PROXY, rate_limit.TRUSTED_PROXIES = False, []
+        assert rate_limit.client_ip(_request("203.0.113.5", "1.2.3.4")) == "203.0.113.5"
+
+        rate_limit.TRUSTED_PROXIES = [ipaddress.ip_network("10.0.0.0/8")]
+        # Клиент подставил адрес слева — берём первый справа не-прокси
+        assert rate_limit.client_ip(_request("10.0.0.2", "1.2.3.4, 198.51.100.7, 10.0.0.1")) == "198.51.100.7"
+        assert rate_limit.client_ip(_request("203.0.113.5", "1.2.3.4")) == "203.0.113.5"
+
+        rate_limit.TRUST_ANY_PROXY, rate_limit.TRUSTED_PROXIES = True, []
+        assert rate_limit.client_ip(_request("172.16.0.9", "1.2.3.4, 198.51.100.7")) == "198.51.100.7"
+    finally:
+        rate_limit.TRUST_ANY_PROXY, rate_limit.TRUSTED_PROXIES = saved
+    # telegram_id из запроса ключом не становится
+    assert rate_limit.client_key(_request("203.0.113.5", query={"telegram_id": "42"})) == "ip:203.0.113.5"
+
+
+def test_key_from_verified_identity():
+    """Подписанный initData даёт ключ по пользователю, ключ бота снимает лимит, подделки — по IP"""
+    saved = telegram_auth.BOT_TOKEN
+    telegram_auth.BOT_TOKEN = BOT_TOKEN
+    try:
+        signed = {telegram_auth.INIT_DATA_HEADER: _init_data(42)}
+        assert rate_limit.client_key(_request("203.0.113.5", headers=signed)) == "tg:42"
+        forged = {telegram_auth.INIT_DATA_HEADER: _init_data(42, token="123456:other")}
+        assert rate_limit.client_key(_request("203.0.113.5", headers=forged)) == "ip:203.0.113.5"
+        stale = {telegram_auth.INIT_DATA_HEADER: _init_data(42, auth_date=1)}
+        assert rate_limit.client_key(_request("203.0.113.5", headers=stale)) == "ip:203.0.113.5"
+
+        bot = {telegram_auth.BOT_KEY_HEADER: telegram_auth.bot_api_key(BOT_TOKEN)}
+        assert rate_limit.client_key(_request("203.0.113.5", headers=bot)) is None
+        wrong = {telegram_auth.BOT_KEY_HEADER: telegram_auth.bot_api_key("123456:other")}
+        assert rate_limit.client_key(_request("203.0.113.5", headers=wrong)) == "ip:203.0.113.5"
+    finally:
+        telegram_auth.BOT_TOKEN = saved
+
+
+def test_api_returns_429_with_retry_after():
+    """main.app отвечает 429 с Retry-After; чужой X-Forwarded-For и ?telegram_id= лимит не обходят"""
+    from fastapi.testclient import TestClient
+
+    main = load_main("sqlite://")
+    saved = rate_limit.RATE_LIMIT_ENABLED, rate_limit._bucket
+    saved_token = telegram_auth.BOT_TOKEN
+    rate_limit.RATE_LIMIT_ENABLED, rate_limit._bucket = True, _bucket()
+    try:
+        client = TestClient(main.app)
+        _, burst = rate_limit.ROUTE_LIMITS[("GET", "/players")]
+        for i in range(int(burst)):
+            assert client.get("/players").status_code == 200
+        limited = client.get("/players", params={"telegram_id": 7}, headers={"X-Forwarded-For": "1.2.3.4"})
+        assert limited.status_code == 429
+        assert int(limited.headers["Retry-After"]) >= 1
+        # Лимит у каждого маршрута свой; /health без лимита
+        assert client.get("/rooms/").status_code == 200
+        assert all(client.get("/health").status_code == 200 for _ in range(int(burst) + 1))
+
+        # Игроки за одним IP с подписанным initData и бот лимит не делят
+        telegram_auth.BOT_TOKEN = BOT_TOKEN
+        for user_id in (1, 2):
+            headers = {telegram_auth.INIT_DATA_HEADER: _init_data(user_id)}
+            assert client.get("/players", headers=headers).status_code == 200
+        bot = {telegram_auth.BOT_KEY_HEADER: telegram_auth.bot_api_key(BOT_TOKEN)}
+        assert all(client.get("/players", headers=bot).status_code == 200 for _ in range(int(burst) + 1))
+    finally:
+        rate_limit.RATE_LIMIT_ENABLED, rate_limit._bucket = saved
+        telegram_auth.BOT_TOKEN = saved_token
+    print("✅ 429 и Retry-After на уровне приложения")
+
+
+if __name__ == "__main__":
+    test_burst_then_retry_after()
+    test_state_shared_between_instances()
+    test_check_is_fast()
+    test_client_ip_trusts_only_proxies()
+    test_key_from_verified_identity()
+    test_api_returns_429_with_retry_after()
+    print("🎉 Проверки ограничителя пройдены")
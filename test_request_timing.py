@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тестирование заголовка Server-Timing (SQL-запросы, Glicko-2, сериализация)
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault(
+    "DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "badminton_main_test.db")
+)
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+
+
+def _timing(resp):
+    entries = {}
+    for part in resp.headers["server-timing"].split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        entries[name] = dict(p.split("=", 1) for p in params)
+    return entries
+
+
+def test_game_reports_db_and_glicko_time():
+    """POST /games показывает запросы к БД и время Glicko-2"""
+    resp = client.post("/games", json={
+        "team1_telegram_ids": [8001, 8002], "team2_telegram_ids": [8003, 8004], "score1": 21, "score2": 18,
+    })
+    assert resp.status_code == 200
+    timing = _timing(resp)
+    assert "glicko" in timing and "serialize" in timing and "total" in timing
+    queries = int(timing["db"]["desc"].strip('"').split()[0])
+    assert queries > 0
+    print(f"✅ /games: {queries} SQL-запросов, glicko={timing['glicko']['dur']} мс")
+
+
+def test_health_has_no_queries():
+    """/health не ходит в БД"""
+    timing = _timing(client.get("/health"))
+    assert timing["db"]["desc"] == '"0 queries"'
+
+
+if __name__ == "__main__":
+    test_game_reports_db_and_glicko_time()
+    test_health_has_no_queries()
+    print("🎉 Проверки Server-Timing пройдены")
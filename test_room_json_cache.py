@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест кэша JSON-фрагментов комнат в api/index.py
+"""
+
+import contextlib
+import io
+import json
+
+from testkit import call, load_api
+
+
+def expected_list(api):
+    rooms = [room.to_dict(api.players_db) for room in api.open_rooms.values()]
+    return json.dumps(rooms, ensure_ascii=False).encode("utf-8")
+
+
+def test_room_list_matches_fresh_json():
+    """Склеенный из фрагментов список совпадает с обычной сериализацией после изменений"""
+    print("🧪 Тестируем кэш JSON комнат...")
+    api = load_api()
+    with contextlib.redirect_stdout(io.StringIO()):
+        call(api, "POST", "/rooms/", {"name": "Корт 1", "creator_telegram_id": 1})
+        call(api, "POST", "/rooms/", {"name": "Корт 2", "creator_telegram_id": 2})
+        assert call(api, "GET", "/rooms/", decode=False)[1] == expected_list(api)
+
+        # Вход в комнату сбрасывает её фрагмент
+        call(api, "POST", "/rooms/1/join", {"telegram_id": 3, "first_name": "Вера"})
+        assert call(api, "GET", "/rooms/", decode=False)[1] == expected_list(api)
+
+        # Новое имя игрока видно во всех его комнатах
+        call(api, "POST", "/rooms/2/join", {"telegram_id": 3, "first_name": "Вера Н."})
+        body = call(api, "GET", "/rooms/", decode=False)[1]
+        assert body == expected_list(api)
+        assert body.decode("utf-8").count("Вера Н.") == 2
+
+        call(api, "POST", "/rooms/1/leave", {"telegram_id": 3})
+        assert call(api, "GET", "/rooms/1", decode=False)[1] == json.dumps(
+            api.rooms_db[1].to_dict(api.players_db), ensure_ascii=False
+        ).encode("utf-8")
+
+        call(api, "DELETE", "/rooms/2")
+        assert call(api, "GET", "/rooms/", decode=False)[1] == expected_list(api)
+        assert 2 not in api._room_json
+    print("✅ Кэш JSON комнат согласован")
+
+
+if __name__ == "__main__":
+    test_room_list_matches_fresh_json()
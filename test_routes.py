@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест таблицы маршрутов (routes.py) и разбора путей в api/index.py
+"""
+
+import contextlib
+import io
+
+from testkit import call, load_api
+from routes import RouteTable
+
+
+def test_typed_params():
+    """Параметры приводятся к типу из шаблона, сегмент не того типа — ValueError, как int() раньше"""
+    print("🧪 Тестируем таблицу маршрутов...")
+    table = RouteTable()
+    table.add("GET", "/rooms/", "rooms")
+    table.add("GET", "/rooms/{room_id:int}", "room")
+    table.add("POST", "/rooms/{room_id:int}/join", "join")
+    table.add("GET", "/players/{telegram_id:int}/games/{kind}", "games")
+
+    assert table.match("GET", "/rooms/") == ("rooms", {})
+    assert table.match("GET", "/rooms/17") == ("room", {"room_id": 17})
+    assert table.match("POST", "/rooms/17/join") == ("join", {"room_id": 17})
+    assert table.match("GET", "/players/5/games/won") == ("games", {"telegram_id": 5, "kind": "won"})
+    try:
+        table.match("GET", "/rooms/abc")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("нечисловой id должен давать ValueError")
+    assert table.match("GET", "/rooms/17/join") is None
+    assert table.match("DELETE", "/rooms/17") is None
+    # Повторный путь берётся из кэша и совпадает с разбором без кэша
+    assert table.match("GET", "/rooms/17") == table.resolve("GET", "/rooms/17") == ("room", {"room_id": 17})
+    print("✅ Маршруты разбираются корректно")
+
+
+def test_handler_dispatch():
+    """404 для неизвестных путей, 500 для нечисловых id — как в прежних цепочках if/elif"""
+    print("🧪 Тестируем диспетчеризацию api/index.py...")
+    api = load_api()
+    with contextlib.redirect_stdout(io.StringIO()):
+        call(api, "POST", "/rooms/", {"name": "Корт", "creator_telegram_id": 1})
+        assert call(api, "GET", "/rooms/1")[1]["name"] == "Корт"
+        assert call(api, "GET", "/rooms/abc") == (500, {"error": "invalid literal for int() with base 10: 'abc'"})
+        assert call(api, "POST", "/rooms/1/unknown", {}) == (404, {"error": "Endpoint not found"})
+        # Завершение игры доступно (раньше его перекрывала ветка удаления комнаты)
+        assert call(api, "DELETE", "/rooms/99/finish-game", {}) == (404, {"error": "Комната не найдена"})
+    print("✅ Диспетчеризация работает")
+
+
+if __name__ == "__main__":
+    test_typed_params()
+    test_handler_dispatch()
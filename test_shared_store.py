@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест общего состояния in-memory API между воркерами (shared_store.py)
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import threading
+
+import shared_store
+from testkit import API_VERCEL_SPEC as _spec, ROOT, FakeRequest, call as call_handler
+
+def start_worker(db_path):
+    """Отдельный экземпляр api_vercel.py — как второй процесс gunicorn"""
+    default_path, shared_store.SHARED_STATE_DB = shared_store.SHARED_STATE_DB, db_path
+    module = importlib.util.module_from_spec(_spec)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _spec.loader.exec_module(module)
+    finally:
+        shared_store.SHARED_STATE_DB = default_path
+    return module
+
+
+def call(worker, method, path, body=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = worker.handler(FakeRequest(method, path, body))
+    return result["statusCode"], json.loads(result["body"])
+
+
+def test_workers_see_same_rooms():
+    """Комната, созданная в одном воркере, видна и в другом"""
+    print("🧪 Тестируем общее состояние воркеров...")
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "state.db")
+        worker1 = start_worker(db_path)
+        worker2 = start_worker(db_path)
+
+        status, room = call(worker1, "POST", "/rooms/", {"name": "Корт", "creator_telegram_id": 7})
+        assert status == 200 and room["id"] == 1
+
+        status, rooms = call(worker2, "GET", "/rooms/")
+        assert [r["id"] for r in rooms] == [1]
+
+        # Повторная комната того же создателя отклоняется и во втором воркере
+        status, _ = call(worker2, "POST", "/rooms/", {"name": "Ещё", "creator_telegram_id": 7})
+        assert status == 400
+
+        # Счётчик общий: номера комнат не повторяются
+        status, room = call(worker2, "POST", "/rooms/", {"name": "Корт 2", "creator_telegram_id": 8})
+        assert room["id"] == 2
+        status, rooms = call(worker1, "GET", "/rooms/")
+        assert [r["id"] for r in rooms] == [1, 2]
+
+        call(worker1, "POST", "/tournament/start")
+        status, data = call(worker2, "GET", "/tournament/1")
+        assert data["tournament"]["status"] == "active"
+    print("✅ Воркеры видят одно состояние")
+
+
+def test_deleted_records_reach_other_workers():
+    """Удаление записи доходит до других копий в памяти"""
+    print("🧪 Тестируем удаление записей...")
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "state.db")
+        store1 = shared_store.SQLiteStore(db_path)
+        store2 = shared_store.SQLiteStore(db_path)
+
+        with store1.write():
+            store1.table("rooms")[1] = {"id": 1}
+            store1.mark("rooms", 1)
+        with store2.read():
+            assert store2.table("rooms") == {1: {"id": 1}}
+
+        with store1.write():
+            del store1.table("rooms")[1]
+            store1.mark("rooms", 1)
+        with store2.read():
+            assert store2.table("rooms") == {}
+
+        # Без изменений повторное чтение не обращается к таблицам
+        assert store2.refresh() is False
+    print("✅ Удаление видно во всех воркерах")
+
+
+def test_threaded_server_sends_outside_store():
+    """api.py держит хранилище только на время маршрута: ответ пишется после выхода"""
+    print("🧪 Тестируем границы транзакции в api.py...")
+    spec = importlib.util.spec_from_file_location("api_threaded", os.path.join(ROOT, "api.py"))
+    api = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(api)
+    inside = []
+    store = api.store
+
+    @contextlib.contextmanager
+    def tracked(access):
+        inside.append(True)
+        try:
+            with access():
+                yield
+        finally:
+            inside.pop()
+
+    class TrackedStore:
+        def __getattr__(self, name):
+            return getattr(store, name)
+
+        def read(self):
+            return tracked(store.read)
+
+        def write(self):
+            return tracked(store.write)
+
+    sent = []
+    original_send = api.handler._send
+
+    def send(self, status, body=b''):
+        sent.append(bool(inside))
+        original_send(self, status, body)
+
+    api.store = TrackedStore()
+    api.handler._send = send
+    with contextlib.redirect_stdout(io.StringIO()):
+        status, room = call_handler(api, "POST", "/rooms/", {"name": "Корт", "creator_telegram_id": 7})
+        assert status == 200 and room["id"] == 1
+        status, rooms = call_handler(api, "GET", "/rooms/")
+        assert [r["id"] for r in rooms] == [1]
+        status, error = call_handler(api, "GET", "/nowhere")
+        assert status == 404 and "error" in error
+    assert sent == [False, False, False]
+    print("✅ Сокет не занимает хранилище")
+
+
+
+def test_reads_run_together_writes_wait():
+    """Чтения не ждут друг друга, запись ждёт окончания текущих чтений"""
+    print("🧪 Тестируем параллельные чтения...")
+    store = shared_store.MemoryStore()
+    entered, release = threading.Event(), threading.Event()
+    events = []
+
+    def long_read():
+        with store.read():
+            entered.set()
+            release.wait(5)
+            events.append("read done")
+
+    def write():
+        with store.write():
+            events.append("write")
+
+    reader = threading.Thread(target=long_read)
+    reader.start()
+    assert entered.wait(5)
+    with store.read():
+        events.append("second read")
+    writer = threading.Thread(target=write)
+    writer.start()
+    writer.join(0.2)
+    assert writer.is_alive()
+    release.set()
+    reader.join()
+    writer.join(5)
+    assert events == ["second read", "read done", "write"]
+    print("✅ Чтения параллельны")
+
+
+def test_rating_change_keys_survive_storage():
+    """Ключи rating_changes игр турнира остаются int после JSON в SQLite и снимке"""
+    print("🧪 Тестируем ключи rating_changes...")
+    game = {"room_id": 1, "rating_changes": {7: {"old_rating": 1500, "new_rating": 1516}}}
+    with tempfile.TemporaryDirectory() as directory:
+        writer = shared_store.SQLiteStore(os.path.join(directory, "state.db"))
+        reader = shared_store.SQLiteStore(os.path.join(directory, "state.db"))
+        with writer.write():
+            writer.table("tournament_games")[1] = [game]
+            writer.mark("tournament_games", 1)
+        with reader.read():
+            assert reader.table("tournament_games")[1] == [game]
+
+        path = os.path.join(directory, "snapshot.json")
+        snapshot = shared_store.SnapshotStore(path, flush_every=1)
+        with snapshot.write():
+            snapshot.table("tournament_games")[1] = [game]
+            snapshot.mark("tournament_games", 1)
+        assert shared_store.SnapshotStore(path).table("tournament_games")[1] == [game]
+    print("✅ Ключи остаются числами")
+
+
+if __name__ == "__main__":
+    test_workers_see_same_rooms()
+    test_deleted_records_reach_other_workers()
+    test_threaded_server_sends_outside_store()
+    test_reads_run_together_writes_wait()
+    test_rating_change_keys_survive_storage()
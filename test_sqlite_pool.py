@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест пула соединений SQLite (sqlite_pool.py) и main_simple.py поверх него
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from sqlite_pool import AsyncSQLite, SQLitePool
+from testkit import load_main_simple
+
+
+def test_connection_settings_and_reuse():
+    """Соединение на поток, WAL и настройки применены, незафиксированное откатывается"""
+    print("🧪 Тестируем пул соединений SQLite...")
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLitePool(os.path.join(directory, "pool.db"), mmap_size=1 << 20, busy_timeout_ms=1234)
+        conn = db.acquire()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+        assert conn.execute("PRAGMA mmap_size").fetchone()[0] == 1 << 20
+        assert db.acquire() is conn
+
+        others = []
+        thread = threading.Thread(target=lambda: others.append(db.acquire()))
+        thread.start()
+        thread.join()
+        assert others[0] is not conn
+
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+        db.release(conn)
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        db.close_all()
+    print("✅ Соединения переиспользуются")
+
+
+def test_reader_not_blocked_by_writer():
+    """В WAL чтение идёт, пока другой поток держит незавершённую запись"""
+    print("🧪 Тестируем чтение во время записи...")
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLitePool(os.path.join(directory, "pool.db"), busy_timeout_ms=100)
+        conn = db.acquire()
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+        conn.commit()
+
+        writing = threading.Event()
+        finish = threading.Event()
+
+        def writer():
+            writer_conn = db.acquire()
+            writer_conn.execute("INSERT INTO t VALUES (2)")
+            writing.set()
+            finish.wait(5)
+            writer_conn.commit()
+            db.release(writer_conn)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        writing.wait(5)
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+        finish.set()
+        thread.join()
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 2
+        db.close_all()
+    print("✅ Читатели не ждут писателя")
+
+
+def test_reads_do_not_queue_behind_slow_write():
+    """AsyncSQLite: чтения идут в своих потоках, пока писатель занят медленной записью"""
+    print("🧪 Тестируем асинхронный слой SQLite...")
+
+    def slow_write(conn):
+        conn.execute("INSERT INTO t VALUES (2)")
+        time.sleep(0.5)
+        conn.commit()
+        return time.perf_counter()
+
+    def count(conn):
+        return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], time.perf_counter()
+
+    async def scenario(sql):
+        write = asyncio.ensure_future(sql.write(slow_write))
+        await asyncio.sleep(0.05)
+        reads = await asyncio.gather(*(sql.read(count) for _ in range(20)))
+        written_at = await write
+        return reads, written_at
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLitePool(os.path.join(directory, "async.db"))
+        conn = db.acquire()
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+        conn.commit()
+        sql = AsyncSQLite(db, read_threads=4)
+
+        reads, written_at = asyncio.run(scenario(sql))
+        # Все чтения закончились раньше записи и видели зафиксированное состояние
+        assert all(rows == 1 and done_at < written_at for rows, done_at in reads)
+        assert asyncio.run(sql.read(count))[0] == 2
+        sql.close()
+    print("✅ Чтения не ждут запись")
+
+
+def test_main_simple_endpoints():
+    """Эндпоинты main_simple.py работают на общем соединении"""
+    print("🧪 Тестируем main_simple.py на пуле...")
+    from fastapi.testclient import TestClient
+
+    with tempfile.TemporaryDirectory() as directory:
+        module = load_main_simple(os.path.join(directory, "simple.db"))
+
+        client = TestClient(module.app)
+        assert client.post("/players/", json={"telegram_id": 1, "first_name": "Анна", "last_name": "К"}).status_code == 200
+        assert client.post("/players/", json={"telegram_id": 1, "first_name": "Анна", "last_name": "К"}).status_code == 400
+        room = client.post("/rooms/", json={"name": "Корт", "creator_id": 1}).json()
+        assert client.post("/rooms/", json={"name": "Ещё", "creator_id": 1}).status_code == 400
+        rooms = client.get("/rooms/").json()
+        assert rooms["total"] == 1 and rooms["rooms"][0]["member_count"] == 1
+        game = client.post("/games/", json={"room_id": room["id"], "score_team1": 21, "score_team2": 15}).json()
+        assert game["winner_team"] == 1
+        # Ни один запрос не оставил открытую транзакцию на переиспользуемых соединениях
+        assert module.db._connections and not any(conn.in_transaction for conn in module.db._connections)
+        module.sql.close()
+    print("✅ main_simple.py работает")
+
+
+if __name__ == "__main__":
+    test_connection_settings_and_reuse()
+    test_reader_not_blocked_by_writer()
+    test_reads_do_not_queue_behind_slow_write()
+    test_main_simple_endpoints()
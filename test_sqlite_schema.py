@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест миграций схемы main_simple.py: индексы, member_count и планы запросов
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from testkit import load_main_simple
+
+# Схема до миграций — как её создавала прежняя версия init_db
+LEGACY_SCHEMA = """
+    CREATE TABLE rooms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, creator_id INTEGER NOT NULL,
+        max_players INTEGER DEFAULT 4, is_active BOOLEAN DEFAULT 1, is_game_started BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE room_members (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, room_id INTEGER NOT NULL, player_id INTEGER NOT NULL,
+        joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, is_leader BOOLEAN DEFAULT 0
+    );
+    INSERT INTO rooms (name, creator_id) VALUES ('Корт 1', 1), ('Корт 2', 2);
+    INSERT INTO room_members (room_id, player_id, is_leader) VALUES (1, 1, 1), (1, 3, 0), (2, 2, 1);
+"""
+
+# Игры комнаты: эндпоинта в main_simple.py пока нет, запрос проверяет idx_games_room
+ROOM_GAMES_SQL = "SELECT id, score_team1, score_team2, winner_team FROM games WHERE room_id = ?"
+
+
+def plan(conn, query, params):
+    rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_legacy_database_migrates():
+    """Старая база получает индексы и заполненный member_count, триггеры его поддерживают"""
+    print("🧪 Тестируем миграции схемы SQLite...")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "legacy.db")
+        legacy = sqlite3.connect(path)
+        legacy.executescript(LEGACY_SCHEMA)
+        legacy.close()
+
+        module = load_main_simple(path)
+        conn = module.db.acquire()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(module.MIGRATIONS)
+        counts = dict(conn.execute("SELECT id, member_count FROM rooms"))
+        assert counts == {1: 2, 2: 1}
+
+        conn.execute("INSERT INTO room_members (room_id, player_id) VALUES (2, 4)")
+        conn.execute("DELETE FROM room_members WHERE room_id = 1 AND player_id = 3")
+        conn.commit()
+        assert dict(conn.execute("SELECT id, member_count FROM rooms")) == {1: 1, 2: 2}
+
+        # Повторный старт ничего не применяет заново
+        module.sql.close()
+        module = load_main_simple(path)
+        assert dict(module.db.acquire().execute("SELECT id, member_count FROM rooms")) == {1: 1, 2: 2}
+        module.sql.close()
+    print("✅ Миграции применены")
+
+
+def test_query_plans_use_indexes():
+    """Горячие запросы идут по индексам, без полного просмотра таблиц"""
+    print("🧪 Тестируем планы запросов...")
+    with tempfile.TemporaryDirectory() as directory:
+        module = load_main_simple(os.path.join(directory, "plans.db"))
+        conn = module.db.acquire()
+        expected = [
+            (module.ROOMS_LIST_SQL, (), "USING INDEX idx_rooms_active_creator (is_active=?)"),
+            (module.ACTIVE_ROOM_BY_CREATOR_SQL, (1,), "idx_rooms_active_creator (is_active=? AND creator_id=?)"),
+            (module.MEMBERSHIP_SQL, (1, 1), "idx_room_members_room_player (room_id=? AND player_id=?)"),
+            (module.ROOM_CAPACITY_SQL, (1,), "USING INTEGER PRIMARY KEY (rowid=?)"),
+            (ROOM_GAMES_SQL, (1,), "USING INDEX idx_games_room (room_id=?)"),
+        ]
+        for query, params, fragment in expected:
+            query_plan = plan(conn, query, params)
+            assert fragment in query_plan, query_plan
+            assert "SCAN" not in query_plan, query_plan
+        module.sql.close()
+    print("✅ Планы запросов используют индексы")
+
+
+if __name__ == "__main__":
+    test_legacy_database_migrates()
+    test_query_plans_use_indexes()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест колоночного журнала игр турнира (tournament_log.py)
+"""
+
+import contextlib
+import io
+import json
+import threading
+import time
+
+from testkit import call, load_api
+from tournament_log import TournamentLog
+
+
+def make_log():
+    log = TournamentLog(5)
+    log.append(1, "2025-01-01T10:00:00.123456", [1, 2], [3, 4], 21, 15,
+               {1: (1500, 1510), 2: (1500, 1508), 3: (1500, 1492), 4: (1500, 1490)})
+    log.append(2, "2025-01-01T10:30:00", [1], [3], 18, 21, {1: (1510, 1500), 3: (1492, 1503)})
+    # Игрок 99 не зарегистрирован — рейтинг не менялся
+    log.append(3, "2025-01-01T11:00:00", [2], [99], 21, 21, {2: (1508, 1508)})
+    return log
+
+
+def test_totals_and_pages():
+    """Итоги игроков считаются при добавлении, журнал отдаётся страницами"""
+    print("🧪 Тестируем итоги и страницы журнала...")
+    log = make_log()
+
+    totals = {player["telegram_id"]: player for player in log.summary()}
+    assert totals[1]["games"] == 2 and totals[1]["wins"] == 1 and totals[1]["losses"] == 1
+    assert totals[1]["rating_change"] == 0 and totals[1]["rating"] == 1500
+    assert totals[3]["points_for"] == 15 + 21 and totals[3]["points_against"] == 21 + 18
+    assert totals[99]["draws"] == 1 and totals[99]["rating"] is None
+    assert log.summary()[0]["telegram_id"] == 2
+
+    first, second = log.page(0, 2)
+    assert first["tournament_id"] == 5 and "id" not in first
+    assert first["room_id"] == 1 and first["team1"] == [1, 2] and first["team2"] == [3, 4]
+    assert first["timestamp"] == "2025-01-01T10:00:00.123456"
+    assert first["rating_changes"][4] == {
+        "old_rating": 1500, "new_rating": 1490, "rating_change": -10, "team": 2, "won": False,
+    }
+    assert second["rating_changes"][3]["won"] is True
+    assert [game["room_id"] for game in log.page(2, 10)] == [3]
+    assert 99 not in log.page(2, 1)[0]["rating_changes"]
+    print("✅ Итоги и страницы корректны")
+
+
+def test_state_roundtrip():
+    """Снимок журнала восстанавливается вместе с итогами"""
+    print("🧪 Тестируем снимок журнала турнира...")
+    log = make_log()
+    restored = TournamentLog.from_state(json.loads(json.dumps(log.to_state())), 5)
+    assert restored.page(0, 10) == log.page(0, 10)
+    assert restored.summary() == log.summary()
+
+    # Снимки прежней версии хранили рейтинги как float
+    state = log.to_state()
+    state["old_ratings"] = [None if value is None else float(value) for value in state["old_ratings"]]
+    state["new_ratings"] = [None if value is None else float(value) for value in state["new_ratings"]]
+    old = TournamentLog.from_state(state, 5).page(0, 1)[0]["rating_changes"][1]
+    assert old == {"old_rating": 1500, "new_rating": 1510, "rating_change": 10, "team": 1, "won": True}
+    assert all(type(value) is int for value in old.values() if not isinstance(value, bool))
+    print("✅ Снимок восстановлен")
+
+
+def test_tournament_endpoint_pages():
+    """Данные турнира отдаются с итогами и страницей игр"""
+    print("🧪 Тестируем данные турнира в API...")
+    api = load_api()
+    with contextlib.redirect_stdout(io.StringIO()):
+        call(api, "DELETE", "/tournament/start")
+        for game in range(5):
+            api.tournament_games[1].append(game, "2025-01-01T10:00:00", [1], [2], 21, game, {})
+        _, data = call(api, "DELETE", "/tournament/1?offset=3&limit=2")
+    assert data["games_total"] == 5
+    assert [game["room_id"] for game in data["games"]] == [3, 4]
+    assert all(game["tournament_id"] == 1 for game in data["games"])
+    assert data["next_offset"] is None
+    assert {player["telegram_id"]: player["wins"] for player in data["players"]} == {1: 5, 2: 0}
+
+    # Ответ держит копию записи турнира: конец турнира до сериализации её не меняет
+    response = api.handler.get_tournament_data(None, 1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        call(api, "DELETE", "/tournament/end")
+    assert response["tournament"]["status"] == "active" and "end_time" not in response["tournament"]
+    print("✅ Страницы турнира работают")
+
+
+def test_finish_game_races_tournament_end():
+    """Конец турнира во время подсчёта рейтинга ждёт finish_game, игра попадает в турнир"""
+    print("🧪 Тестируем завершение игры одновременно с концом турнира...")
+    api = load_api()
+    entered = threading.Event()
+    original = api.calculate_rating_changes
+
+    def slow_rating_changes(room, score_data):
+        entered.set()
+        time.sleep(0.2)
+        return original(room, score_data)
+
+    api.calculate_rating_changes = slow_rating_changes
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        call(api, "POST", "/rooms/", {"name": "Корт", "creator_telegram_id": 1})
+        call(api, "POST", "/rooms/1/join", {"telegram_id": 2, "first_name": "Борис"})
+        call(api, "DELETE", "/tournament/start")
+        finish = threading.Thread(target=lambda: results.setdefault("finish", call(
+            api, "DELETE", "/rooms/1/finish-game", {"team1": [1], "team2": [2], "score1": 21, "score2": 15},
+        )))
+        finish.start()
+        assert entered.wait(5)
+        results["end"] = call(api, "DELETE", "/tournament/end")
+        finish.join()
+        _, data = call(api, "DELETE", "/tournament/1")
+    assert results["finish"][0] == 200, results["finish"]
+    assert results["end"][1]["tournament_id"] == 1
+    assert data["games_total"] == 1
+    print("✅ Игра записана в турнир")
+
+
+def test_invalid_score_leaves_ratings():
+    """Нецелый счёт отклоняется до изменения рейтингов и журнала"""
+    print("🧪 Тестируем проверку счёта...")
+    api = load_api()
+    with contextlib.redirect_stdout(io.StringIO()):
+        call(api, "POST", "/rooms/", {"name": "Корт", "creator_telegram_id": 1})
+        call(api, "POST", "/rooms/1/join", {"telegram_id": 2, "first_name": "Борис"})
+        call(api, "DELETE", "/tournament/start")
+        for score in ("21", 21.5, None, True):
+            status, error = call(api, "DELETE", "/rooms/1/finish-game",
+                                 {"team1": [1], "team2": [2], "score1": score, "score2": 15})
+            assert status == 400 and "error" in error
+        assert [api.players_db[pid].rating for pid in (1, 2)] == [1500, 1500]
+        assert len(api.tournament_games[1]) == 0
+        status, result = call(api, "DELETE", "/rooms/1/finish-game",
+                              {"team1": [1], "team2": [2], "score1": 21, "score2": 15})
+        _, data = call(api, "DELETE", "/tournament/1")
+    assert status == 200
+    game = data["games"][0]
+    assert game["tournament_id"] == 1 and game["score1"] == 21
+    assert all(type(change["new_rating"]) is int for change in game["rating_changes"].values())
+    assert all(type(player["rating"]) is int for player in data["players"])
+    print("✅ Неверный счёт не меняет рейтинги")
+
+
+if __name__ == "__main__":
+    test_totals_and_pages()
+    test_state_roundtrip()
+    test_tournament_endpoint_pages()
+    test_finish_game_races_tournament_end()
+    test_invalid_score_leaves_ratings()
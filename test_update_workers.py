@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест параллельной обработки обновлений бота (update_workers.py)
+"""
+
+import queue
+import threading
+import time
+
+from prometheus_client import REGISTRY
+
+from update_workers import UpdateDispatcher
+
+
+def message(update_id, chat_id, text="/start"):
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}, "text": text}}
+
+
+def test_slow_chat_does_not_block_others_and_order_is_kept():
+    """Медленный обработчик одного чата не задерживает другие; в чате порядок сохраняется"""
+    print("🧪 Тестируем пул обработчиков обновлений...")
+    done = []
+    lock = threading.Lock()
+
+    def handler(update):
+        if update["message"]["text"] == "/end_tournament":
+            time.sleep(0.5)
+        with lock:
+            done.append((update["message"]["chat"]["id"], update["update_id"], time.perf_counter()))
+
+    dispatcher = UpdateDispatcher(handler, workers=4, max_pending=100, label=lambda update: "test_order")
+    started = time.perf_counter()
+    dispatcher.submit(message(1, 10, "/end_tournament"))
+    for update_id in range(2, 12):
+        dispatcher.submit(message(update_id, 10 + update_id % 2))
+    dispatcher.close(timeout=5)
+
+    by_chat = {}
+    for chat_id, update_id, finished in done:
+        by_chat.setdefault(chat_id, []).append((update_id, finished))
+    # Чат 11 закончил всё, пока чат 10 ждал медленную команду
+    assert max(finished for _, finished in by_chat[11]) - started < 0.25
+    for updates in by_chat.values():
+        assert [update_id for update_id, _ in updates] == sorted(update_id for update_id, _ in updates)
+    assert len(done) == 11
+    assert REGISTRY.get_sample_value("bot_update_handler_seconds_sum", {"kind": "test_order"}) >= 0.5
+    print("✅ Чаты обрабатываются параллельно и по порядку")
+
+
+def test_queue_is_bounded():
+    """При заполненной очереди submit ждёт, а по таймауту бросает queue.Full"""
+    print("🧪 Тестируем ограничение очереди...")
+    release = threading.Event()
+    dispatcher = UpdateDispatcher(lambda update: release.wait(5), workers=1, max_pending=2)
+    dispatcher.submit(message(1, 1))
+    dispatcher.submit(message(2, 2))
+    try:
+        dispatcher.submit(message(3, 3), timeout=0.1)
+    except queue.Full:
+        pass
+    else:
+        raise AssertionError("очередь переполнена, submit должен ждать")
+    release.set()
+    dispatcher.submit(message(3, 3), timeout=5)
+    dispatcher.close(timeout=5)
+    assert dispatcher.pending() == 0
+    print("✅ Очередь ограничена")
+
+
+if __name__ == "__main__":
+    test_slow_chat_does_not_block_others_and_order_is_kept()
+    test_queue_is_bounded()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Тест тёплого старта api_vercel.py из снимка состояния (SnapshotStore)
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import tempfile
+
+import shared_store
+from testkit import API_VERCEL_SPEC as _spec, FakeRequest
+
+
+def start_instance(snapshot_path):
+    """Новый инстанс api_vercel.py — как холодный старт функции на Vercel"""
+    default_path, shared_store.WARM_STATE_FILE = shared_store.WARM_STATE_FILE, snapshot_path
+    module = importlib.util.module_from_spec(_spec)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _spec.loader.exec_module(module)
+    finally:
+        shared_store.WARM_STATE_FILE = default_path
+    return module
+
+
+def call(instance, method, path, body=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = instance.handler(FakeRequest(method, path, body))
+    return result["statusCode"], json.loads(result["body"]), result["headers"]
+
+
+def test_instance_starts_warm():
+    """Второй инстанс поднимает комнаты, игроков и счётчики из снимка первого"""
+    print("🧪 Тестируем тёплый старт из снимка...")
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "state.json")
+        first = start_instance(snapshot_path)
+        assert isinstance(first.store, shared_store.SnapshotStore)
+
+        _, _, headers = call(first, "GET", "/rooms/")
+        assert "state;dur=" in headers["Server-Timing"]
+        call(first, "POST", "/rooms/", {"name": "Корт", "creator_telegram_id": 7})
+        call(first, "POST", "/players/", {"telegram_id": 8, "first_name": "Вера"})
+        _, _, headers = call(first, "GET", "/rooms/")
+        assert "Server-Timing" not in headers
+
+        # Изменения копятся пачкой, снимок пишется по порогу или по времени
+        assert first.store.pending > 0 and not os.path.exists(snapshot_path)
+        first.store.flush()
+        assert first.store.pending == 0 and os.path.exists(snapshot_path)
+
+        second = start_instance(snapshot_path)
+        status, rooms, _ = call(second, "GET", "/rooms/")
+        assert status == 200 and [room["creator_id"] for room in rooms] == [7]
+        assert second.COLD_START["state"] > 0 and "reindex" in second.COLD_START
+
+        # Индексы и счётчики восстановлены: повторная комната того же создателя запрещена,
+        # новая комната получает следующий номер
+        assert call(second, "POST", "/rooms/", {"name": "Ещё", "creator_telegram_id": 7})[0] == 400
+        _, room, _ = call(second, "POST", "/rooms/", {"name": "Корт 2", "creator_telegram_id": 9})
+        assert room["id"] == 2
+        assert call(second, "GET", "/players/8")[1]["first_name"] == "Вера"
+        second.store.flush()
+    print("✅ Инстанс стартует со снимком")
+
+
+def test_flush_after_batch():
+    """Снимок записывается сам, когда набралась пачка изменений"""
+    print("🧪 Тестируем запись снимка пачками...")
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, "state.json")
+        instance = start_instance(snapshot_path)
+        instance.store.flush_every = 5
+        for telegram_id in range(1, 4):
+            call(instance, "POST", "/players/", {"telegram_id": telegram_id, "first_name": "Игрок"})
+        assert not os.path.exists(snapshot_path)
+        for telegram_id in range(4, 6):
+            call(instance, "POST", "/players/", {"telegram_id": telegram_id, "first_name": "Игрок"})
+        assert instance.store.flushes == 1
+        with open(snapshot_path, encoding="utf-8") as snapshot:
+            assert len(json.load(snapshot)["players"]) == 5
+    print("✅ Пачка записана одним снимком")
+
+
+if __name__ == "__main__":
+    test_instance_starts_warm()
+    test_flush_after_batch()
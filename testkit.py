@@ -0,0 +1,139 @@
+"""
+Общие помощники тестов и бенчмарков.
+
+Тесты и бенчмарки не импортируют друг друга: всё, что им нужно обоим
+(свежие копии модулей, вызов обработчика без сокета, фоновый сервер),
+лежит здесь.
+"""
+
+import contextlib
+import http.server
+import importlib.util
+import io
+import json
+import os
+import threading
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+API_INDEX_SPEC = importlib.util.spec_from_file_location("api_index", os.path.join(ROOT, "api", "index.py"))
+API_VERCEL_SPEC = importlib.util.spec_from_file_location("api_vercel_worker", os.path.join(ROOT, "api_vercel.py"))
+
+
+def load_api():
+    """Свежий экземпляр модуля api/index.py (с пустым хранилищем)"""
+    module = importlib.util.module_from_spec(API_INDEX_SPEC)
+    API_INDEX_SPEC.loader.exec_module(module)
+    return module
+
+
+def call(api, method, path, body=None, decode=True):
+    """Вызывает обработчик без сокета и возвращает (статус, JSON-ответ или байты при decode=False)"""
+    raw = json.dumps(body or {}).encode("utf-8")
+
+    class _Call(api.handler):
+        def __init__(self):
+            self.path = path
+            self.headers = {"Content-Length": str(len(raw))}
+            self.rfile = io.BytesIO(raw)
+            self.wfile = io.BytesIO()
+            self.status = 200
+
+        def send_response(self, code, message=None):
+            self.status = code
+
+        def send_header(self, keyword, value):
+            pass
+
+        def end_headers(self):
+            pass
+
+        def log_message(self, format, *args):
+            pass
+
+    req = _Call()
+    getattr(req, f"do_{method}")()
+    if not decode:
+        return req.status, req.wfile.getvalue()
+    return req.status, json.loads(req.wfile.getvalue().decode("utf-8"))
+
+
+class FakeRequest:
+    """Запрос для handler(request) из api_vercel.py"""
+
+    def __init__(self, method, path, body=None):
+        self.method = method
+        self.path = path
+        self.body = json.dumps(body) if body is not None else ""
+
+
+def load_main(database_url):
+    """Свежая копия main.py поверх заданной базы (не трогает уже импортированный main)"""
+    saved = {name: os.environ.get(name) for name in ("DATABASE_URL", "RATE_LIMIT_ENABLED")}
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    try:
+        spec = importlib.util.spec_from_file_location("main_sqlite_test", os.path.join(ROOT, "main.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return module
+
+
+
+def load_main_simple(database_path):
+    """Свежая копия main_simple.py поверх файла базы (сообщения миграций не печатаются)"""
+    saved = os.environ.get("SQLITE_DATABASE")
+    os.environ["SQLITE_DATABASE"] = database_path
+    try:
+        spec = importlib.util.spec_from_file_location("main_simple_test", os.path.join(ROOT, "main_simple.py"))
+        module = importlib.util.module_from_spec(spec)
+        with contextlib.redirect_stdout(io.StringIO()):
+            spec.loader.exec_module(module)
+    finally:
+        if saved is None:
+            os.environ.pop("SQLITE_DATABASE", None)
+        else:
+            os.environ["SQLITE_DATABASE"] = saved
+    return module
+
+@contextlib.contextmanager
+def serve(server_class, handler):
+    """Сервер на свободном порту в фоновом потоке"""
+    server = server_class(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class CountingHandler(http.server.BaseHTTPRequestHandler):
+    """Отвечает {"ok": true} по HTTP/1.1 и запоминает клиентские порты (= соединения)"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = set()
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        CountingHandler.connections.add(self.client_address[1])
+        body = json.dumps({"ok": True}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, format, *args):
+        pass
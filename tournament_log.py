@@ -0,0 +1,198 @@
+"""
+Журнал игр турнира в колоночном виде и накопительная статистика игроков.
+
+Каждое поле игры хранится в отдельном array (номер комнаты, время, счёт),
+участники всех игр — в общих колонках слотов (id игрока, команда, рейтинг
+до и после) со смещениями начала каждой игры. Итоги по игрокам обновляются
+при добавлении игры, поэтому сводка турнира не проходит по всем играм,
+а сами игры отдаются страницами в прежнем формате ответа API.
+
+Колонки принимают только целые числа: счёт и составы команд проверяются
+до подсчёта рейтинга (valid_game), а не в append.
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+# Рейтинг в слоте, когда игрока нет в хранилище и рейтинг не менялся
+NO_RATING = -(2 ** 63)
+_SCORE_MAX = 2 ** 31 - 1
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def valid_game(team1, team2, score1, score2) -> bool:
+    """Счёт — неотрицательные целые, команды — списки целых telegram_id"""
+    return (
+        all(_is_int(score) and 0 <= score <= _SCORE_MAX for score in (score1, score2))
+        and all(isinstance(team, list) and all(_is_int(player_id) for player_id in team)
+                for team in (team1, team2))
+    )
+
+
+def _to_micros(timestamp: str) -> int:
+    return (datetime.fromisoformat(timestamp) - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(micros: int) -> str:
+    return (_EPOCH + micros * _MICROSECOND).isoformat()
+
+
+class PlayerTotals:
+    """Итоги игрока в турнире"""
+
+    __slots__ = ("telegram_id", "games", "wins", "losses", "draws",
+                 "points_for", "points_against", "rating_change", "rating")
+
+    def __init__(self, telegram_id: int):
+        self.telegram_id = telegram_id
+        self.games = 0
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.points_for = 0
+        self.points_against = 0
+        self.rating_change = 0
+        self.rating = None
+
+    def to_dict(self) -> dict:
+        return {
+            "telegram_id": self.telegram_id,
+            "games": self.games,
+            "wins": self.wins,
+            "losses": self.losses,
+            "draws": self.draws,
+            "points_for": self.points_for,
+            "points_against": self.points_against,
+            "rating_change": self.rating_change,
+            "rating": self.rating,
+        }
+
+
+class TournamentLog:
+    """Колоночный журнал игр одного турнира"""
+
+    def __init__(self, tournament_id: Optional[int] = None):
+        self.tournament_id = tournament_id
+        # Колонки игр
+        self.room_ids = array("q")
+        self.timestamps = array("q")   # микросекунды от 1970-01-01
+        self.scores1 = array("i")
+        self.scores2 = array("i")
+        # Колонки слотов участников; игра i занимает слоты offsets[i]:offsets[i + 1]
+        self.offsets = array("I", [0])
+        self.player_ids = array("q")
+        self.teams = array("b")
+        self.old_ratings = array("q")  # NO_RATING — игрока нет в хранилище, рейтинг не менялся
+        self.new_ratings = array("q")
+        self.totals: Dict[int, PlayerTotals] = {}
+
+    def __len__(self) -> int:
+        return len(self.room_ids)
+
+    def append(self, room_id: int, timestamp: str, team1: Iterable[int], team2: Iterable[int],
+               score1: int, score2: int, ratings: Dict[int, Tuple[int, int]]) -> int:
+        """Добавляет игру. ratings: telegram_id -> (рейтинг до, рейтинг после). Возвращает id игры"""
+        self.room_ids.append(room_id)
+        self.timestamps.append(_to_micros(timestamp))
+        self.scores1.append(score1)
+        self.scores2.append(score2)
+        for team, players in ((1, team1), (2, team2)):
+            for player_id in players:
+                old_rating, new_rating = ratings.get(player_id, (NO_RATING, NO_RATING))
+                self.player_ids.append(player_id)
+                self.teams.append(team)
+                self.old_ratings.append(old_rating)
+                self.new_ratings.append(new_rating)
+        self.offsets.append(len(self.player_ids))
+        self._add_totals(len(self) - 1)
+        return len(self)
+
+    def _add_totals(self, index: int) -> None:
+        score1, score2 = self.scores1[index], self.scores2[index]
+        for slot in range(self.offsets[index], self.offsets[index + 1]):
+            player_id = self.player_ids[slot]
+            totals = self.totals.get(player_id)
+            if totals is None:
+                totals = self.totals[player_id] = PlayerTotals(player_id)
+            own, other = (score1, score2) if self.teams[slot] == 1 else (score2, score1)
+            totals.games += 1
+            totals.points_for += own
+            totals.points_against += other
+            if own > other:
+                totals.wins += 1
+            elif own < other:
+                totals.losses += 1
+            else:
+                totals.draws += 1
+            if self.new_ratings[slot] != NO_RATING:
+                totals.rating_change += self.new_ratings[slot] - self.old_ratings[slot]
+                totals.rating = self.new_ratings[slot]
+
+    def game(self, index: int) -> dict:
+        """Игра в прежнем формате ответа API (с rating_changes)"""
+        score1, score2 = self.scores1[index], self.scores2[index]
+        teams: Dict[int, List[int]] = {1: [], 2: []}
+        rating_changes = {}
+        for slot in range(self.offsets[index], self.offsets[index + 1]):
+            player_id, team = self.player_ids[slot], self.teams[slot]
+            teams[team].append(player_id)
+            if self.new_ratings[slot] != NO_RATING:
+                old_rating, new_rating = self.old_ratings[slot], self.new_ratings[slot]
+                rating_changes[player_id] = {
+                    "old_rating": old_rating,
+                    "new_rating": new_rating,
+                    "rating_change": new_rating - old_rating,
+                    "team": team,
+                    "won": score1 > score2 if team == 1 else score2 > score1,
+                }
+        return {
+            "tournament_id": self.tournament_id,
+            "room_id": self.room_ids[index],
+            "timestamp": _from_micros(self.timestamps[index]),
+            "team1": teams[1],
+            "team2": teams[2],
+            "score1": score1,
+            "score2": score2,
+            "rating_changes": rating_changes,
+        }
+
+    def page(self, offset: int, limit: int) -> List[dict]:
+        end = min(len(self), offset + limit)
+        return [self.game(index) for index in range(max(offset, 0), end)]
+
+    def summary(self) -> List[dict]:
+        """Итоги игроков, лучшие по изменению рейтинга первыми"""
+        ranked = sorted(self.totals.values(), key=lambda totals: totals.rating_change, reverse=True)
+        return [totals.to_dict() for totals in ranked]
+
+    # ---- снимок ----
+
+    _COLUMNS = ("room_ids", "timestamps", "scores1", "scores2", "offsets",
+                "player_ids", "teams", "old_ratings", "new_ratings")
+
+    def to_state(self) -> dict:
+        # Отсутствующий рейтинг храним как None
+        state = {name: getattr(self, name).tolist() for name in self._COLUMNS}
+        for name in ("old_ratings", "new_ratings"):
+            state[name] = [None if value == NO_RATING else value for value in state[name]]
+        return state
+
+    @classmethod
+    def from_state(cls, state: Optional[dict], tournament_id: Optional[int] = None) -> "TournamentLog":
+        log = cls(tournament_id)
+        if not state:
+            return log
+        for name in cls._COLUMNS:
+            column = getattr(log, name)
+            del column[:]
+            # int(): рейтинги из старых снимков записаны как float
+            column.extend(NO_RATING if value is None else int(value) for value in state[name])
+        for index in range(len(log)):
+            log._add_totals(index)
+        return log
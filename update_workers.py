@@ -0,0 +1,138 @@
+"""
+Параллельная обработка обновлений Telegram для bot_simple_api.py.
+
+Обновления разных чатов обрабатываются пулом потоков одновременно, поэтому
+медленный /end_tournament у админа не задерживает /start остальных. Внутри
+одного чата порядок сохраняется: следующее обновление чата берётся в работу
+только после того, как закончилось предыдущее.
+
+    dispatcher = UpdateDispatcher(process_update, workers=8, max_pending=100)
+    dispatcher.submit(update)   # ждёт, если в очереди уже max_pending обновлений
+    ...
+    dispatcher.close()          # дорабатывает очередь и останавливает потоки
+
+Метрики Prometheus: глубина очереди (bot_update_queue_depth), обновления
+в работе (bot_updates_in_progress) и время обработчика (bot_update_handler_seconds).
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+from prometheus_client import Gauge, Histogram
+
+# Потоков-обработчиков
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "8"))
+# Обновлений в очереди, после которых приём новых ждёт (getUpdates не опрашивается)
+BOT_UPDATE_QUEUE_SIZE = int(os.getenv("BOT_UPDATE_QUEUE_SIZE", "100"))
+
+UPDATE_QUEUE_DEPTH = Gauge(
+    "bot_update_queue_depth",
+    "Обновления Telegram, ожидающие обработчика",
+)
+UPDATES_IN_PROGRESS = Gauge(
+    "bot_updates_in_progress",
+    "Обновления Telegram, обрабатываемые в данный момент",
+)
+UPDATE_HANDLER_LATENCY = Histogram(
+    "bot_update_handler_seconds",
+    "Время обработки обновления Telegram",
+    ["kind"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+def chat_key(update: Dict[str, Any]) -> Hashable:
+    """Чат обновления: сообщения и нажатия кнопок одного чата идут по порядку"""
+    if "message" in update:
+        return update["message"]["chat"]["id"]
+    if "callback_query" in update:
+        message = update["callback_query"].get("message") or {}
+        return message.get("chat", {}).get("id")
+    return None
+
+
+class UpdateDispatcher:
+    """Пул обработчиков с ограниченной очередью и порядком внутри чата"""
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Any], workers: int = BOT_WORKERS,
+                 max_pending: int = BOT_UPDATE_QUEUE_SIZE,
+                 key: Callable[[Dict[str, Any]], Hashable] = chat_key,
+                 label: Callable[[Dict[str, Any]], str] = lambda update: "update"):
+        self.handler = handler
+        self.max_pending = max_pending
+        self.key = key
+        self.label = label
+        self._cond = threading.Condition()
+        # Чат присутствует, пока у него есть ожидающие обновления или одно в работе
+        self._chats: Dict[Hashable, Deque[Dict[str, Any]]] = {}
+        # Чаты, которые можно брать в работу (ни один поток их сейчас не обрабатывает)
+        self._ready: Deque[Hashable] = deque()
+        self._pending = 0
+        self._closed = False
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._work, name=f"bot-update-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, update: Dict[str, Any], timeout: Optional[float] = None) -> None:
+        """Ставит обновление в очередь; при полной очереди ждёт, по таймауту — queue.Full"""
+        key = self.key(update)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending < self.max_pending or self._closed, timeout):
+                raise queue.Full
+            if self._closed:
+                raise RuntimeError("UpdateDispatcher закрыт")
+            self._pending += 1
+            UPDATE_QUEUE_DEPTH.inc()
+            if key in self._chats:
+                self._chats[key].append(update)
+            else:
+                self._chats[key] = deque([update])
+                self._ready.append(key)
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        """Обновлений в очереди и в работе"""
+        with self._cond:
+            return self._pending
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._ready or self._closed)
+                if not self._ready:
+                    return
+                key = self._ready.popleft()
+                update = self._chats[key].popleft()
+            UPDATE_QUEUE_DEPTH.dec()
+            UPDATES_IN_PROGRESS.inc()
+            started = time.perf_counter()
+            try:
+                self.handler(update)
+            except Exception as e:
+                print(f"❌ Ошибка обработчика обновления {update.get('update_id')}: {e}")
+            finally:
+                UPDATES_IN_PROGRESS.dec()
+                UPDATE_HANDLER_LATENCY.labels(kind=self.label(update)).observe(time.perf_counter() - started)
+                with self._cond:
+                    self._pending -= 1
+                    if self._chats[key]:
+                        self._ready.append(key)
+                    else:
+                        del self._chats[key]
+                    self._cond.notify_all()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Дорабатывает уже принятые обновления и останавливает потоки"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending == 0, timeout)
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)